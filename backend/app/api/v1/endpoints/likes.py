@@ -1,8 +1,9 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_async_db, get_db, get_current_user, get_current_user_async
 from app.models.user import User as UserModel
 from app.models.tweet import Tweet as TweetModel
 from app.schemas.like import Like, LikeWithUser, LikeWithTweet
@@ -16,13 +17,12 @@ router = APIRouter()
 @router.post("/{tweet_id}")
 async def like_tweet(
     tweet_id: int,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user_async)
 ):
-    like = like_service.like_tweet(db, user_id=current_user.id, tweet_id=tweet_id)
+    like = await like_service.like_tweet_async(db, user_id=current_user.id, tweet_id=tweet_id)
+    tweet = await db.get(TweetModel, tweet_id)
     if not like:
-        from app.services.tweet import tweet_service
-        tweet = tweet_service.get(db, tweet_id)
         if not tweet:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -34,11 +34,10 @@ async def like_tweet(
                 detail="Tweet already liked"
             )
     
-    tweet = db.query(TweetModel).filter(TweetModel.id == tweet_id).first()
     if tweet and tweet.author_id != current_user.id:
         # Crear notificación persistente
-        notification_service.create_notification(
-            db,
+        await db.run_sync(
+            notification_service.create_notification,
             user_id=tweet.author_id,
             type="new_like",
             message=f"@{current_user.username} le gustó tu tweet",
@@ -1,8 +1,10 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.conditional import ConditionalGet, read_versions
+from app.core.dependencies import get_async_db, get_db, get_read_db, get_current_user, get_current_user_async
 from app.models.user import User as UserModel
 from app.schemas.message import MessageCreate, Message, Conversation
 from app.services.message import message_service
@@ -12,11 +14,11 @@ router = APIRouter()
 @router.post("/send")
 async def send_message(
     message_data: MessageCreate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user_async)
 ):
     """Enviar un mensaje"""
-    message = message_service.send_message(
+    message = await message_service.send_message_async(
         db,
         sender_id=current_user.id,
         receiver_username=message_data.receiver_username,
@@ -33,7 +35,7 @@ async def send_message(
     from app.core.websocket_manager import manager
     from app.services.user import user_service
     
-    receiver = user_service.get_by_username(db, message_data.receiver_username)
+    receiver = await user_service.get_by_username_async(db, message_data.receiver_username)
     if receiver:
         await manager.send_personal_message({
             "type": "new_message",
@@ -50,10 +52,16 @@ async def send_message(
 
 @router.get("/conversations")
 def get_conversations(
-    db: Session = Depends(get_db),
+    conditional: ConditionalGet = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Obtener todas las conversaciones del usuario"""
+    versions = read_versions(db, [("conversations", current_user.id), "profiles"])
+    not_modified = conditional.not_modified(current_user.id, versions)
+    if not_modified:
+        return not_modified
+    
     conversations = message_service.get_conversations(db, current_user.id)
     
     result = []
@@ -2,48 +2,43 @@ from typing import List
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.conditional import ConditionalGet, read_versions
+from app.core.dependencies import get_db, get_read_db, get_current_user
 from app.models.user import User as UserModel
+from app.schemas.notification import Notification, UnreadCount
 from app.services.notification import notification_service
 
 router = APIRouter()
 
-@router.get("/")
+@router.get("/", response_model=List[Notification])
 def get_notifications(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     unread_only: bool = Query(False),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Obtener notificaciones del usuario"""
-    notifications = notification_service.get_user_notifications(
+    return notification_service.get_user_notifications(
         db, 
         current_user.id, 
         skip, 
         limit,
         unread_only
     )
-    
-    return [
-        {
-            "id": n.id,
-            "type": n.type,
-            "message": n.message,
-            "related_id": n.related_id,
-            "related_username": n.related_username,
-            "is_read": n.is_read,
-            "created_at": n.created_at.isoformat()
-        }
-        for n in notifications
-    ]
 
-@router.get("/unread-count")
+@router.get("/unread-count", response_model=UnreadCount)
 def get_unread_count(
+    conditional: ConditionalGet = Depends(),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Obtener cantidad de notificaciones no leídas"""
+    versions = read_versions(db, [("notifications", current_user.id)])
+    not_modified = conditional.not_modified(current_user.id, versions)
+    if not_modified:
+        return not_modified
+    
     count = notification_service.get_unread_count(db, current_user.id)
     return {"count": count}
 
@@ -1,11 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_db, get_read_db, get_current_user
+from app.core.pagination import NEXT_CURSOR_HEADER, Cursor, get_cursor
 from app.models.user import User as UserModel
-from app.schemas.retweet import RetweetCreate, RetweetWithUser, RetweetWithTweet
-from app.schemas.user import UserPublic
+from app.schemas.retweet import FeedItem, RetweetCreate, RetweetWithUser, RetweetWithTweet
 from app.services.retweet import retweet_service
 
 router = APIRouter()
@@ -57,6 +57,22 @@ def unretweet(
     
     return {"message": "Retweet removed successfully"}
 
+@router.get("/feed", response_model=List[FeedItem])
+def read_feed_with_retweets(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    db: Session = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Feed con los tweets y los retweets del usuario y de los que sigue, mezclados por fecha"""
+    items = retweet_service.get_feed_with_retweets(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    # El orden mezcla ids de tweets y de retweets: cada item trae su propio cursor
+    if items and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = items[-1]["cursor"]
+    return items
+
 @router.get("/{tweet_id}", response_model=List[RetweetWithUser])
 def get_tweet_retweets(
     tweet_id: int,
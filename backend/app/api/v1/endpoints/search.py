@@ -1,13 +1,19 @@
-from typing import List
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_, select
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_read_db, get_current_user
+from app.core.entities import normalize_tag
+from app.core.pagination import (
+    Cursor, RankCursor, get_cursor, get_rank_cursor, keyset_paginate, set_next_cursor, set_next_rank_cursor
+)
 from app.models.user import User as UserModel
 from app.models.tweet import Tweet as TweetModel
-from app.schemas.user import UserPublic
-from app.schemas.tweet import Tweet
+from app.models.hashtag import Hashtag, tweet_hashtags
+from app.schemas.tweet import TweetOut
+from app.services.search import search_service
 from app.services.tweet import tweet_service
 
 router = APIRouter()
@@ -16,7 +22,7 @@ router = APIRouter()
 def search_users(
     q: str = Query(..., min_length=1, description="Búsqueda de usuarios"),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Buscar usuarios por username o nombre completo"""
@@ -43,45 +49,58 @@ def search_users(
         for user in users
     ]
 
-@router.get("/tweets")
+@router.get("/tweets", response_model=List[TweetOut])
 def search_tweets(
-    q: str = Query(..., min_length=1, description="Búsqueda de tweets"),
+    response: Response,
+    q: str = Query(..., min_length=1, description="Búsqueda de tweets (términos, \"frases\", or, -excluir)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[RankCursor] = Depends(get_rank_cursor),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Buscar tweets por contenido"""
-    tweets = (
-        db.query(TweetModel)
-        .filter(TweetModel.content.ilike(f"%{q}%"))
-        .order_by(TweetModel.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    """Buscar tweets por contenido (texto completo, por relevancia y recencia)"""
+    # Todas las páginas de una búsqueda miden la recencia contra el mismo instante
+    as_of = cursor.as_of if cursor is not None else datetime.now(timezone.utc)
+    ranked = search_service.search_tweets(db, q, as_of, limit=limit, cursor=cursor, skip=skip)
     
-    return [tweet_service._enrich_tweet(db, tweet, current_user.id) for tweet in tweets]
+    results = tweet_service.hydrate_ids(db, [tweet_id for tweet_id, _ in ranked], current_user.id)
+    set_next_rank_cursor(response, ranked, limit, as_of)
+    return results
 
-@router.get("/hashtags")
+@router.get("/hashtags", response_model=List[TweetOut])
 def search_hashtags(
+    response: Response,
     q: str = Query(..., min_length=1, description="Búsqueda de hashtags"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Buscar tweets por hashtag"""
-    # Buscar tweets que contengan el hashtag
-    search_term = f"%#{q}%" if not q.startswith('#') else f"%{q}%"
+    """Buscar tweets por hashtag (el tag o un prefijo, con o sin #)"""
+    # Los hashtags ya se extrajeron al crear el tweet (tweet_hashtags), con el
+    # mismo extractor: "#py" encuentra #python pero no "pagina#pyx" ni un
+    # ancla dentro de una URL, que el ILIKE sobre el contenido sí encontraba
+    tag = normalize_tag(q)
+    if not tag:
+        return []
+    tagged = (
+        select(tweet_hashtags.c.tweet_id)
+        .join(Hashtag, Hashtag.id == tweet_hashtags.c.hashtag_id)
+        .where(Hashtag.tag.startswith(tag, autoescape=True))
+    )
     
-    tweets = (
+    query = (
         db.query(TweetModel)
-        .filter(TweetModel.content.ilike(search_term))
-        .order_by(TweetModel.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .options(
+            joinedload(TweetModel.author),
+            joinedload(TweetModel.reply_to).joinedload(TweetModel.author)
+        )
+        .filter(TweetModel.id.in_(tagged))
     )
+    tweets = keyset_paginate(query, TweetModel.created_at, TweetModel.id, cursor, skip, limit).all()
     
-    return [tweet_service._enrich_tweet(db, tweet, current_user.id) for tweet in tweets]
\ No newline at end of file
+    results = tweet_service.hydrate_tweets(db, tweets, current_user.id)
+    set_next_cursor(response, results, limit)
+    return results
\ No newline at end of file
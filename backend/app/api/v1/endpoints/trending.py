@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_current_user
 from app.models.user import User as UserModel
-from app.services.hashtag import hashtag_service
+from app.services.trending import trending_service
 
 router = APIRouter()
 
 @router.get("/hashtags")
 def get_trending_hashtags(
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """Obtener hashtags trending"""
-    return hashtag_service.get_trending(db, limit=limit)
\ No newline at end of file
+    """Obtener hashtags trending (snapshot en memoria, ver TrendingService)"""
+    # El snapshot ya tiene tipos JSON: se serializa directo, sin jsonable_encoder
+    return ORJSONResponse(trending_service.get_trending(limit=limit))
@@ -1,33 +1,49 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.conditional import ConditionalGet
+from app.core.config import settings
+from app.core.dependencies import get_async_db, get_db, get_read_db, get_current_user, get_current_user_async
+from app.core.pagination import Cursor, get_cursor, set_next_cursor
 from app.models.user import User as UserModel
 from app.models.tweet import Tweet as TweetModel
-from app.schemas.tweet import Tweet, TweetCreate, TweetUpdate
+from app.schemas.reply import ThreadResponse
+from app.schemas.tweet import ConversationTweet, TweetBranch, TweetBulkCreate, TweetBulkResult, TweetCreate, TweetOut, TweetUpdate
 from app.services.tweet import tweet_service
 from app.services.notification import notification_service
 from app.models.follow import Follow
 
 router = APIRouter()
 
-@router.post("/", response_model=Tweet)
+@router.post("/", response_model=TweetOut)
 async def create_tweet(
     tweet_in: TweetCreate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user_async)
 ):
-    tweet = tweet_service.create(db, tweet_in=tweet_in, author_id=current_user.id)
-    tweet_data = tweet_service.get(db, tweet.id, current_user.id)
+    tweet = await tweet_service.create_async(db, tweet_in=tweet_in, author_id=current_user.id)
+    tweet_data = await tweet_service.get_async(db, tweet.id, current_user.id)
     
-    # Notificar a los seguidores si no es un reply
+    # Notificar a los seguidores si no es un reply (solo hace falta buscar
+    # entre los conectados por WebSocket, no cargar todos los seguidores)
     if not tweet_in.reply_to_id:
-        follower_ids = [f.follower_id for f in db.query(Follow).filter(Follow.followed_id == current_user.id).all()]
+        from app.core.websocket_manager import manager
+        connected_ids = manager.get_connected_users()
+        follower_ids = []
+        if connected_ids:
+            follower_ids = (await db.scalars(
+                select(Follow.follower_id).where(
+                    Follow.followed_id == current_user.id,
+                    Follow.follower_id.in_(connected_ids)
+                )
+            )).all()
         if follower_ids:
             await notification_service.notify_new_tweet(db, tweet_data, current_user.id, follower_ids)
     else:
-        parent_tweet = db.query(TweetModel).filter(TweetModel.id == tweet_in.reply_to_id).first()
+        parent_tweet = await db.get(TweetModel, tweet_in.reply_to_id)
         if parent_tweet and parent_tweet.author_id != current_user.id:
             await notification_service.notify_new_reply(
                 db, 
@@ -39,32 +55,64 @@ async def create_tweet(
     
     return tweet_data
 
-@router.get("/")
+@router.post("/bulk", response_model=TweetBulkResult)
+def bulk_create_tweets(
+    bulk_in: TweetBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Crear muchos tweets del usuario actual de una vez (migraciones, bots)"""
+    if len(bulk_in.tweets) > settings.bulk_ingest_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many tweets (max {settings.bulk_ingest_max_items})"
+        )
+    
+    return tweet_service.bulk_create(db, bulk_in.tweets, author_id=current_user.id)
+
+@router.get("/", response_model=List[TweetOut])
 def read_tweets(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    tweets = tweet_service.get_all_public(db, skip=skip, limit=limit, current_user_id=current_user.id)
+    tweets = tweet_service.get_all_public(db, skip=skip, limit=limit, current_user_id=current_user.id, cursor=cursor)
+    set_next_cursor(response, tweets, limit)
     return tweets
 
-@router.get("/feed")
+@router.get("/feed", response_model=List[TweetOut])
 def read_feed(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[Cursor] = Depends(get_cursor),
+    conditional: ConditionalGet = Depends(),
+    db: Session = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    tweets = tweet_service.get_feed(db, user_id=current_user.id, skip=skip, limit=limit)
+    tweet_ids = tweet_service.get_feed_ids(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor)
+    not_modified = conditional.not_modified(current_user.id, tweet_service.version_stamp(db, tweet_ids))
+    if not_modified:
+        return not_modified
+    
+    tweets = tweet_service.hydrate_ids(db, tweet_ids, current_user.id)
+    set_next_cursor(response, tweets, limit)
     return tweets
 
-@router.get("/{tweet_id}")
+@router.get("/{tweet_id}", response_model=TweetOut)
 def read_tweet(
     tweet_id: int,
+    conditional: ConditionalGet = Depends(),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
+    not_modified = conditional.not_modified(current_user.id, tweet_service.version_stamp(db, [tweet_id]))
+    if not_modified:
+        return not_modified
+    
     tweet = tweet_service.get(db, tweet_id=tweet_id, current_user_id=current_user.id)
     if not tweet:
         raise HTTPException(
@@ -73,11 +121,13 @@ def read_tweet(
         )
     return tweet
 
-@router.get("/{tweet_id}/replies")
+@router.get("/{tweet_id}/replies", response_model=List[TweetOut])
 def get_tweet_replies(
     tweet_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[Cursor] = Depends(get_cursor),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
@@ -88,16 +138,25 @@ def get_tweet_replies(
             detail="Tweet not found"
         )
     
-    replies = tweet_service.get_replies(db, tweet_id=tweet_id, skip=skip, limit=limit, current_user_id=current_user.id)
+    replies = tweet_service.get_replies(db, tweet_id=tweet_id, skip=skip, limit=limit, current_user_id=current_user.id, cursor=cursor)
+    set_next_cursor(response, replies, limit)
     return replies
 
-@router.get("/{tweet_id}/thread")
+@router.get("/{tweet_id}/thread", response_model=ThreadResponse)
 def get_tweet_thread(
     tweet_id: int,
+    max_depth: int = Query(10, ge=1, le=50),
+    branch_limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    thread = tweet_service.get_thread(db, tweet_id=tweet_id, current_user_id=current_user.id)
+    thread = tweet_service.get_thread(
+        db,
+        tweet_id=tweet_id,
+        current_user_id=current_user.id,
+        max_depth=max_depth,
+        branch_limit=branch_limit
+    )
     
     if not thread:
         raise HTTPException(
@@ -107,14 +166,49 @@ def get_tweet_thread(
     
     return thread
 
-@router.post("/{tweet_id}/reply")
-async def reply_to_tweet(
+@router.get("/{tweet_id}/conversation", response_model=List[ConversationTweet])
+def get_tweet_conversation(
     tweet_id: int,
-    reply_data: TweetCreate,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Toda la conversación del tweet (desde la raíz), en orden de árbol"""
+    tweet = db.query(TweetModel).filter(TweetModel.id == tweet_id).first()
+    if not tweet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+    
+    return tweet_service.get_conversation(db, tweet, skip=skip, limit=limit, current_user_id=current_user.id)
+
+@router.get("/{tweet_id}/branches", response_model=List[TweetBranch])
+def get_tweet_branches(
+    tweet_id: int,
+    limit: int = Query(5, ge=1, le=50),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    parent_tweet = db.query(TweetModel).filter(TweetModel.id == tweet_id).first()
+    """Respuestas directas con más respuestas debajo"""
+    tweet = db.query(TweetModel).filter(TweetModel.id == tweet_id).first()
+    if not tweet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tweet not found"
+        )
+    
+    return tweet_service.get_top_branches(db, tweet, limit=limit, current_user_id=current_user.id)
+
+@router.post("/{tweet_id}/reply", response_model=TweetOut)
+async def reply_to_tweet(
+    tweet_id: int,
+    reply_data: TweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user_async)
+):
+    parent_tweet = await db.get(TweetModel, tweet_id)
     if not parent_tweet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -124,7 +218,7 @@ async def reply_to_tweet(
     reply_data.reply_to_id = tweet_id
     
     try:
-        reply = tweet_service.create(db, tweet_in=reply_data, author_id=current_user.id)
+        reply = await tweet_service.create_async(db, tweet_in=reply_data, author_id=current_user.id)
         
         # Notificar al autor del tweet original
         if parent_tweet.author_id != current_user.id:
@@ -136,14 +230,14 @@ async def reply_to_tweet(
                 reply_data.content
             )
         
-        return tweet_service.get(db, reply.id, current_user.id)
+        return await tweet_service.get_async(db, reply.id, current_user.id)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
-@router.put("/{tweet_id}", response_model=Tweet)
+@router.put("/{tweet_id}", response_model=TweetOut)
 def update_tweet(
     tweet_id: int,
     tweet_in: TweetUpdate,
@@ -181,11 +275,13 @@ def delete_tweet(
     
     return {"message": "Tweet deleted successfully"}
 
-@router.get("/user/{username}")
+@router.get("/user/{username}", response_model=List[TweetOut])
 def read_user_tweets(
     username: str,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[Cursor] = Depends(get_cursor),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
@@ -198,5 +294,6 @@ def read_user_tweets(
             detail="User not found"
         )
     
-    tweets = tweet_service.get_by_user(db, user_id=user.id, skip=skip, limit=limit, current_user_id=current_user.id)
+    tweets = tweet_service.get_by_user(db, user_id=user.id, skip=skip, limit=limit, current_user_id=current_user.id, cursor=cursor)
+    set_next_cursor(response, tweets, limit)
     return tweets
\ No newline at end of file
@@ -1,10 +1,13 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_async_db, get_db, get_current_user, get_current_user_async
 from app.models.user import User as UserModel
 from app.schemas.user import User, UserUpdate, UserPublic
+from app.services.export import export_service, gzip_stream
 from app.services.user import user_service
 from app.services.notification import notification_service
 
@@ -15,9 +18,6 @@ def read_user_me(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    from app.services.user import user_service
-    current_user.followers_count = user_service.get_followers_count(db, current_user.id)
-    current_user.following_count = user_service.get_following_count(db, current_user.id)
     return current_user
 
 @router.put("/me", response_model=User)
@@ -29,6 +29,61 @@ def update_user_me(
     user = user_service.update(db, db_user=current_user, user_in=user_in)
     return user
 
+@router.delete("/me")
+def deactivate_user_me(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Desactivar la cuenta: sus tokens dejan de valer (también los ya cacheados)"""
+    user_service.deactivate(db, db_user=current_user)
+    return {"message": "Account deactivated"}
+
+def _archive_response(request: Request, user: UserModel, sections: List[str], allowed: tuple) -> StreamingResponse:
+    """NDJSON en streaming, comprimido en gzip si el cliente lo acepta"""
+    invalid = [section for section in sections if section not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sections: {', '.join(invalid)}"
+        )
+    
+    body = export_service.stream_archive(user.id, sections)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{user.username}-archive.ndjson"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+@router.get("/me/export")
+def export_my_archive(
+    request: Request,
+    sections: List[str] = Query(list(export_service.SECTIONS)),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Descargar el historial propio (tweets, retweets, likes y mensajes) como NDJSON"""
+    return _archive_response(request, current_user, sections, export_service.SECTIONS)
+
+@router.get("/{username}/export")
+def export_user_archive(
+    username: str,
+    request: Request,
+    sections: List[str] = Query(list(export_service.PUBLIC_SECTIONS)),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """Descargar los tweets y retweets de un usuario como NDJSON"""
+    user = user_service.get_by_username(db, username=username)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    return _archive_response(request, user, sections, export_service.PUBLIC_SECTIONS)
+
 @router.get("/{username}", response_model=UserPublic)
 def read_user(
     username: str,
@@ -41,18 +96,15 @@ def read_user(
             detail="User not found"
         )
     
-    user.followers_count = user_service.get_followers_count(db, user.id)
-    user.following_count = user_service.get_following_count(db, user.id)
-    
     return user
 
 @router.post("/{username}/follow")
 async def follow_user(
     username: str,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserModel = Depends(get_current_user_async)
 ):
-    user_to_follow = user_service.get_by_username(db, username=username)
+    user_to_follow = await user_service.get_by_username_async(db, username=username)
     if not user_to_follow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,7 +117,7 @@ async def follow_user(
             detail="Cannot follow yourself"
         )
     
-    success = user_service.follow_user(db, current_user.id, user_to_follow.id)
+    success = await user_service.follow_user_async(db, current_user.id, user_to_follow.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
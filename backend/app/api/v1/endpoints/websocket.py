@@ -56,7 +56,7 @@ async def websocket_notifications(
     # Importar aquí para evitar problemas circulares
     from jose import jwt, JWTError
     from app.core.config import settings
-    from app.db.session import SessionLocal
+    from app.db.session import AsyncSessionLocal
     from app.services.user import user_service
     from app.core.websocket_manager import manager
     
@@ -75,18 +75,16 @@ async def websocket_notifications(
         await websocket.close(code=1008)
         return
     
-    # Obtener usuario
-    db = SessionLocal()
+    # Obtener usuario (sesión async: no bloquear el event loop de los demás sockets)
     try:
-        user = user_service.get_by_username(db, username=username)
+        async with AsyncSessionLocal() as db:
+            user = await user_service.get_by_username_async(db, username=username)
         print(f"User found: {user.username if user else 'None'}")
     except Exception as e:
         print(f"Error getting user: {e}")
         await websocket.send_json({"type": "error", "message": f"Database error: {str(e)}"})
         await websocket.close(code=1008)
         return
-    finally:
-        db.close()
     
     if user is None:
         await websocket.send_json({"type": "error", "message": "User not found"})
@@ -0,0 +1,242 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Tamaño aproximado en bytes de un valor (dicts, listas y escalares)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class FrequencySketch:
+    """
+    Count-Min Sketch de contadores pequeños (tope 15) para estimar la
+    frecuencia reciente de cada clave. Cada `sample_size` incrementos todos
+    los contadores se dividen por dos, así las claves que dejaron de pedirse
+    pierden peso (envejecimiento de TinyLFU).
+    """
+
+    MAX_COUNT = 15
+    _SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+
+    def __init__(self, expected_entries: int):
+        width = 64
+        while width < expected_entries:
+            width *= 2
+        self._mask = width - 1
+        self._rows = [[0] * width for _ in self._SEEDS]
+        self.sample_size = 10 * width
+        self._additions = 0
+
+    def _indexes(self, key: Hashable) -> List[int]:
+        h = hash(key)
+        return [((h ^ seed) * 0x5BD1E995 >> 7) & self._mask for seed in self._SEEDS]
+
+    def increment(self, key: Hashable):
+        added = False
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < self.MAX_COUNT:
+                row[index] += 1
+                added = True
+        if added:
+            self._additions += 1
+            if self._additions >= self.sample_size:
+                self._reset()
+
+    def frequency(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    def _reset(self):
+        for row in self._rows:
+            for i, count in enumerate(row):
+                row[i] = count >> 1
+        self._additions //= 2
+
+
+class TinyLFUCache:
+    """
+    Cache en proceso con presupuesto de memoria (bytes estimados) y política
+    W-TinyLFU:
+
+    - las entradas nuevas entran a una ventana LRU chica (window_ratio del
+      presupuesto), que absorbe ráfagas de claves nuevas;
+    - al salir de la ventana, una clave solo entra a la zona principal si su
+      frecuencia estimada (FrequencySketch) supera a la de la víctima que
+      tendría que desalojar; si no, se descarta;
+    - la zona principal es un LRU segmentado: "probation" para lo recién
+      admitido y "protected" (80%) para lo que volvió a pedirse.
+
+    Las entradas expiran a los ttl_seconds como red de seguridad: las
+    invalidaciones son locales a cada proceso.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None, window_ratio: float = 0.01, expected_entry_size: int = 1024):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._window_max = max(int(max_bytes * window_ratio), 1)
+        self._main_max = max_bytes - self._window_max
+        self._protected_max = int(self._main_max * 0.8)
+
+        # clave -> (valor, tamaño, expira)
+        self._window: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._probation: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._protected: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._window_bytes = 0
+        self._probation_bytes = 0
+        self._protected_bytes = 0
+
+        self._sketch = FrequencySketch(max(max_bytes // expected_entry_size, 1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._get(key)
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Valores encontrados (las claves ausentes no aparecen)"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._get(key)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def peek_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Como get_many, pero sin contar en las estadísticas ni en la frecuencia/LRU"""
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                for segment in (self._window, self._probation, self._protected):
+                    entry = segment.get(key)
+                    if entry is not None:
+                        if not entry[2] or entry[2] >= now:
+                            found[key] = entry[0]
+                        break
+        return found
+
+    def set(self, key: Hashable, value: Any):
+        size = estimate_size(value)
+        if size > self._main_max:
+            return
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            self._discard(key)
+            self._window[key] = (value, size, expires)
+            self._window_bytes += size
+            self._drain_window()
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if self._discard(key):
+                self.invalidations += 1
+
+    def delete_many(self, keys: Iterable[Hashable]):
+        with self._lock:
+            for key in keys:
+                if self._discard(key):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for segment in (self._window, self._probation, self._protected):
+                segment.clear()
+            self._window_bytes = self._probation_bytes = self._protected_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+            "invalidations": self.invalidations,
+            "entries": len(self._window) + len(self._probation) + len(self._protected),
+            "bytes": self._window_bytes + self._probation_bytes + self._protected_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    # Internos (siempre con el lock tomado)
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        self._sketch.increment(key)
+        for segment in (self._window, self._probation, self._protected):
+            entry = segment.get(key)
+            if entry is None:
+                continue
+            if entry[2] and entry[2] < time.monotonic():
+                self._discard(key)
+                break
+            self.hits += 1
+            if segment is self._probation:
+                self._promote(key, entry)
+            else:
+                segment.move_to_end(key)
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def _discard(self, key: Hashable) -> bool:
+        if key in self._window:
+            self._window_bytes -= self._window.pop(key)[1]
+        elif key in self._probation:
+            self._probation_bytes -= self._probation.pop(key)[1]
+        elif key in self._protected:
+            self._protected_bytes -= self._protected.pop(key)[1]
+        else:
+            return False
+        return True
+
+    def _promote(self, key: Hashable, entry: Tuple[Any, int, float]):
+        """Segundo acceso en probation: pasa a protected (y degrada su LRU si no entra)"""
+        del self._probation[key]
+        self._probation_bytes -= entry[1]
+        self._protected[key] = entry
+        self._protected_bytes += entry[1]
+        while self._protected_bytes > self._protected_max:
+            demoted_key, demoted = self._protected.popitem(last=False)
+            self._protected_bytes -= demoted[1]
+            self._probation[demoted_key] = demoted
+            self._probation_bytes += demoted[1]
+
+    def _main_victim(self) -> Tuple[Hashable, Tuple[Any, int, float], "OrderedDict"]:
+        segment = self._probation if self._probation else self._protected
+        key = next(iter(segment))
+        return key, segment[key], segment
+
+    def _drain_window(self):
+        while self._window_bytes > self._window_max:
+            candidate_key, candidate = self._window.popitem(last=False)
+            self._window_bytes -= candidate[1]
+            self._admit(candidate_key, candidate)
+
+    def _admit(self, key: Hashable, entry: Tuple[Any, int, float]):
+        """Filtro de admisión: el candidato tiene que ser más frecuente que cada víctima"""
+        size = entry[1]
+        while self._probation_bytes + self._protected_bytes + size > self._main_max:
+            victim_key, victim, segment = self._main_victim()
+            if self._sketch.frequency(key) <= self._sketch.frequency(victim_key):
+                self.rejections += 1
+                return
+            del segment[victim_key]
+            if segment is self._probation:
+                self._probation_bytes -= victim[1]
+            else:
+                self._protected_bytes -= victim[1]
+            self.evictions += 1
+        self._probation[key] = entry
+        self._probation_bytes += size
@@ -0,0 +1,73 @@
+import hashlib
+from typing import Any, Hashable, List, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.version_store import version_store
+
+ETAG_HEADER = "ETag"
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag débil a partir de sellos de versión (no del cuerpo renderizado)"""
+    digest = hashlib.sha1(repr((version_store.generation,) + parts).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def read_versions(db: Session, keys: List[Hashable]) -> Optional[List[int]]:
+    """
+    Versiones de unas claves para armar un sello. Sobre una réplica devuelve
+    None si alguna cambió hace menos de read_your_writes_seconds: el cambio
+    podría no haber llegado y el ETag nuevo quedaría pegado a datos viejos.
+    """
+    versions = version_store.get_many(keys)
+    if db.info.get("replica") and version_store.changed_since(versions, settings.read_your_writes_seconds):
+        return None
+    return versions
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil contra un If-None-Match (lista separada por comas o "*")"""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ConditionalGet:
+    """
+    Dependencia para GETs condicionales. El endpoint calcula un sello
+    barato (versiones, IDs) antes de hidratar y llama a not_modified: si el
+    cliente ya tiene esa versión recibe un 304 sin cuerpo; si no, el ETag
+    queda en la respuesta normal.
+
+    Las respuestas dependen del usuario autenticado, así que el usuario
+    debe ser parte del sello y se publican como privadas.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.if_none_match = request.headers.get("if-none-match")
+        self.response = response
+
+    def not_modified(self, *parts: Any) -> Optional[Response]:
+        """Response 304 si el sello coincide con If-None-Match; None para seguir"""
+        if any(part is None for part in parts):
+            return None  # Sello no disponible barato: respuesta completa, sin ETag
+        etag = make_etag(*parts)
+        headers = {
+            ETAG_HEADER: etag,
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization",
+        }
+        self.response.headers.update(headers)
+        if self.if_none_match and etag_matches(self.if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
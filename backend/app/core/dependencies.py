@@ -1,12 +1,15 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import AsyncGenerator, Generator, Optional, Tuple
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core import security
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.read_your_writes import USER_ID_KEY, recent_writes
+from app.db.session import AsyncSessionLocal, SessionLocal, create_replica_session
 from app.services.user import user_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_v1_str}/auth/login")
@@ -18,25 +21,87 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-):
-    credentials_exception = HTTPException(
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> Tuple[str, Optional[float]]:
+    """(username, exp) de un JWT válido"""
     try:
         payload = jwt.decode(
             token, settings.secret_key, algorithms=[settings.algorithm]
         )
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    user = user_service.get_by_username(db, username=username)
+        raise _credentials_exception()
+    return username, payload.get("exp")
+
+def _check_active(user):
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user"
+        )
+    return user
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    # Token visto hace poco: usuario desde el cache, sin decodificar ni consultar
+    user = user_service.get_cached_principal(db, token)
+    if user is None:
+        username, expires_at = _decode_token(token)
+        user = user_service.load_principal(db, token, username, expires_at=expires_at)
+        if user is None:
+            raise _credentials_exception()
+    db.info[USER_ID_KEY] = user.id  # Para read-your-writes
+    return _check_active(user)
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme)
+):
+    """get_current_user para endpoints async, sobre la misma AsyncSession del endpoint"""
+    user = await user_service.get_cached_principal_async(db, token)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        username, expires_at = _decode_token(token)
+        user = await user_service.load_principal_async(db, token, username, expires_at=expires_at)
+        if user is None:
+            raise _credentials_exception()
+    db.info[USER_ID_KEY] = user.id
+    return _check_active(user)
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """Acceso a /metrics: solo con METRICS_TOKEN configurado y enviado en X-Metrics-Token"""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, settings.metrics_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid metrics token")
+
+def get_read_db(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+) -> Generator:
+    """
+    Sesión para endpoints de solo lectura: una réplica, salvo que el usuario
+    haya escrito hace poco (entonces la misma sesión del primario, para que
+    vea lo que acaba de escribir).
+    """
+    if recent_writes.is_recent(current_user.id):
+        yield db
+        return
+    replica = create_replica_session()
+    try:
+        yield replica
+    finally:
+        replica.close()
@@ -0,0 +1,359 @@
+"""
+Índice invertido en memoria para buscar tweets sin ir a la base (backend
+"embedded" de búsqueda, ver app/services/search.py), con puntaje BM25
+dividido por la misma penalización de antigüedad que el backend de la base.
+
+Cada documento tiene un número interno (docnum) correlativo; las listas de
+posteo de cada término son un bytearray de pares (delta de docnum,
+frecuencia) en varint, así que una aparición ocupa 2 bytes casi siempre.
+Como los docnums solo crecen, agregar un tweet es agregar al final de las
+listas de sus términos.
+
+Editar o borrar un tweet no toca las listas: el docnum viejo queda marcado
+como muerto (tombstone) y se saltea al buscar, y la edición entra con un
+docnum nuevo. Las frecuencias de documento (df) cuentan los muertos hasta
+que se reconstruye el índice (como en Lucene hasta un merge).
+
+save() escribe un snapshot que load() abre con mmap: los arrays por
+documento se copian de una vez y las listas de posteo se leen del archivo
+recién cuando se buscan o se modifican.
+"""
+import heapq
+import itertools
+import math
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Longitud máxima registrada de un documento (lengths es array('H'))
+_MAX_LENGTH = 0xFFFF
+
+# Letras y números, sin "_" (como el tokenizador unicode61 de FTS5)
+_TOKEN = re.compile(r"[^\W_]+")
+
+SNAPSHOT_MAGIC = b"TWIX"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sI")
+
+# Una cláusula de búsqueda: términos que tienen que estar todos, y grupos de
+# términos que excluyen el documento si están todos los del grupo
+Clause = Tuple[List[str], List[List[str]]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Términos de un texto: minúsculas y sin diacríticos ("Café" -> "cafe")"""
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(
+            char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char)
+        )
+    return _TOKEN.findall(text)
+
+
+def _append_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_postings(data: bytes) -> Tuple[List[int], List[int]]:
+    """(docnums, frecuencias) de una lista de posteo codificada"""
+    if not data:
+        return [], []
+    if max(data) < 0x80:
+        # Todos los valores entran en un byte (lo común en los términos
+        # frecuentes): deltas y frecuencias alternados, sin recorrer en Python
+        docs = list(itertools.accumulate(data[0::2], initial=-1))
+        del docs[0]
+        return docs, list(data[1::2])
+    docs: List[int] = []
+    freqs: List[int] = []
+    doc = -1
+    value = shift = 0
+    expect_doc = True
+    for byte in data:
+        if byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            continue
+        value |= byte << shift
+        if expect_doc:
+            doc += value
+            docs.append(doc)
+        else:
+            freqs.append(value)
+        expect_doc = not expect_doc
+        value = shift = 0
+    return docs, freqs
+
+
+class InvertedIndex:
+    """
+    Índice invertido de tweets (id, texto, created_at en segundos epoch).
+    No es thread-safe: el backend lo usa detrás de un lock.
+    """
+
+    def __init__(self):
+        self.terms: Dict[str, int] = {}
+        self.postings: List[Optional[bytearray]] = []
+        self.df = array("I")
+        self.last = array("q")
+        self.doc_ids = array("q")
+        self.lengths = array("H")
+        self.created = array("d")
+        self.alive = bytearray()
+        # tweet id -> docnum, solo de los documentos vivos
+        self.docnums: Dict[int, int] = {}
+        self.total_length = 0
+        # Último tweets.id leído de la base (lo maneja el backend, viaja en el snapshot)
+        self.watermark = 0
+        # Última posición aplicada del feed de cambios de otros workers (también viaja en el snapshot)
+        self.changes_position = ""
+        # Listas de posteo que todavía están solo en el snapshot (ver load)
+        self._mapped: Optional[mmap.mmap] = None
+        self._mapped_base = 0
+        self._offsets = array("Q")
+
+    def __len__(self) -> int:
+        return len(self.docnums)
+
+    @property
+    def dead(self) -> int:
+        return len(self.doc_ids) - len(self.docnums)
+
+    def _postings(self, term_id: int) -> bytes:
+        data = self.postings[term_id]
+        if data is not None:
+            return data
+        offsets = self._offsets
+        base = self._mapped_base
+        return self._mapped[base + offsets[term_id]:base + offsets[term_id + 1]]
+
+    def _writable(self, term: str) -> Tuple[int, bytearray]:
+        term_id = self.terms.get(term)
+        if term_id is None:
+            term_id = len(self.postings)
+            self.terms[term] = term_id
+            self.postings.append(bytearray())
+            self.df.append(0)
+            self.last.append(-1)
+        data = self.postings[term_id]
+        if data is None:
+            data = bytearray(self._postings(term_id))
+            self.postings[term_id] = data
+        return term_id, data
+
+    def add(self, tweet_id: int, text: str, created_at: float, replace: bool = True) -> bool:
+        """
+        Indexar un tweet. Si ya estaba se reemplaza (edición), salvo con
+        replace=False; devuelve si se indexó.
+        """
+        if tweet_id in self.docnums:
+            if not replace:
+                return False
+            self.remove(tweet_id)
+        freqs: Dict[str, int] = {}
+        tokens = tokenize(text)
+        for token in tokens:
+            freqs[token] = freqs.get(token, 0) + 1
+
+        docnum = len(self.doc_ids)
+        length = min(len(tokens), _MAX_LENGTH)
+        self.doc_ids.append(tweet_id)
+        self.lengths.append(length)
+        self.created.append(created_at)
+        self.alive.append(1)
+        self.docnums[tweet_id] = docnum
+        self.total_length += length
+
+        df, last = self.df, self.last
+        for term, freq in freqs.items():
+            term_id, data = self._writable(term)
+            _append_varint(data, docnum - last[term_id])
+            _append_varint(data, freq)
+            last[term_id] = docnum
+            df[term_id] += 1
+        return True
+
+    def remove(self, tweet_id: int) -> bool:
+        docnum = self.docnums.pop(tweet_id, None)
+        if docnum is None:
+            return False
+        self.alive[docnum] = 0
+        self.total_length -= self.lengths[docnum]
+        return True
+
+    def _docs_with_all(self, terms: List[str]) -> set:
+        docs: Optional[set] = None
+        for term in terms:
+            term_id = self.terms.get(term)
+            if term_id is None:
+                return set()
+            found = set(decode_postings(self._postings(term_id))[0])
+            docs = found if docs is None else docs & found
+            if not docs:
+                break
+        return docs or set()
+
+    def _score_clause(self, include: List[str], exclude: List[List[str]]) -> Dict[int, float]:
+        """BM25 de los documentos vivos que tienen todos los términos de include"""
+        term_ids = []
+        for term in dict.fromkeys(include):
+            term_id = self.terms.get(term)
+            if term_id is None:
+                return {}
+            term_ids.append(term_id)
+        if not term_ids:
+            return {}
+        df = self.df
+        # De la lista más corta a la más larga: cada intersección achica las siguientes
+        term_ids.sort(key=lambda term_id: df[term_id])
+
+        count = len(self.docnums)
+        average = self.total_length / count or 1.0
+        lengths, alive = self.lengths, self.alive
+        # tf * (k1 + 1) / (tf + k1 * (1 - b + b * largo / promedio))
+        norm = BM25_K1 * (1.0 - BM25_B)
+        slope = BM25_K1 * BM25_B / average
+        scores: Optional[Dict[int, float]] = None
+        for term_id in term_ids:
+            idf = math.log(1.0 + (count - df[term_id] + 0.5) / (df[term_id] + 0.5))
+            docs, freqs = decode_postings(self._postings(term_id))
+            matched: Dict[int, float] = {}
+            if scores is None:
+                for doc, freq in zip(docs, freqs):
+                    if alive[doc]:
+                        matched[doc] = idf * freq * (BM25_K1 + 1.0) / (freq + norm + slope * lengths[doc])
+            else:
+                for doc, freq in zip(docs, freqs):
+                    score = scores.get(doc)
+                    if score is not None:
+                        matched[doc] = score + idf * freq * (BM25_K1 + 1.0) / (freq + norm + slope * lengths[doc])
+            scores = matched
+            if not scores:
+                return scores
+
+        for terms in exclude:
+            for doc in self._docs_with_all(terms):
+                scores.pop(doc, None)
+        return scores
+
+    def search(
+        self, clauses: List[Clause], as_of: float, recency_hours: float, limit: int,
+        cursor: Optional[Tuple[float, int]] = None, skip: int = 0
+    ) -> List[Tuple[int, float]]:
+        """
+        (tweet id, score) de los documentos que cumplen alguna cláusula, de
+        mayor a menor (score, id), debajo de `cursor` si viene. El score es el
+        BM25 de la mejor cláusula dividido por (1 + antigüedad en horas /
+        recency_hours), con la antigüedad medida contra `as_of`.
+        """
+        if not self.docnums:
+            return []
+        if len(clauses) == 1:
+            best = self._score_clause(*clauses[0])
+        else:
+            best: Dict[int, float] = {}
+            for include, exclude in clauses:
+                for doc, score in self._score_clause(include, exclude).items():
+                    if score > best.get(doc, 0.0):
+                        best[doc] = score
+
+        doc_ids, created = self.doc_ids, self.created
+        per_second = 1.0 / (3600.0 * recency_hours)
+        ranked = []
+        for doc, score in best.items():
+            age = as_of - created[doc]
+            ranked.append((score / (1.0 + age * per_second) if age > 0 else score, doc_ids[doc]))
+        if cursor is not None:
+            ranked = [item for item in ranked if item < cursor]
+        else:
+            limit += skip
+        top = heapq.nlargest(limit, ranked)
+        if cursor is None:
+            top = top[skip:]
+        return [(tweet_id, score) for score, tweet_id in top]
+
+    def save(self, path: str):
+        """Escribir un snapshot (en un archivo temporal que después reemplaza a `path`)"""
+        postings_sizes = array("Q", [0])
+        for term_id in range(len(self.postings)):
+            postings_sizes.append(postings_sizes[-1] + len(self._postings(term_id)))
+        terms = "\n".join(self.terms).encode()
+        sections = [
+            ("doc_ids", self.doc_ids), ("lengths", self.lengths), ("created", self.created),
+            ("alive", self.alive), ("df", self.df), ("last", self.last),
+            ("offsets", postings_sizes), ("terms", terms),
+        ]
+        layout = {}
+        offset = 0
+        for name, data in sections:
+            size = len(data) * getattr(data, "itemsize", 1)
+            layout[name] = [offset, size]
+            offset += size
+        layout["postings"] = [offset, postings_sizes[-1]]
+        meta = orjson.dumps({
+            "version": SNAPSHOT_VERSION,
+            "watermark": self.watermark,
+            "changes_position": self.changes_position,
+            "total_length": self.total_length,
+            "sections": layout,
+        })
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as out:
+            out.write(_HEADER.pack(SNAPSHOT_MAGIC, len(meta)))
+            out.write(meta)
+            for _, data in sections:
+                out.write(data)
+            for term_id in range(len(self.postings)):
+                out.write(self._postings(term_id))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "InvertedIndex":
+        """Abrir un snapshot de save(); ValueError si no es un snapshot válido"""
+        with open(path, "rb") as source:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, meta_size = _HEADER.unpack_from(mapped)
+        except struct.error:
+            raise ValueError("Not a search index snapshot")
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a search index snapshot")
+        meta = orjson.loads(mapped[_HEADER.size:_HEADER.size + meta_size])
+        if meta["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported search index snapshot version: {meta['version']}")
+        base = _HEADER.size + meta_size
+        layout = meta["sections"]
+
+        def section(name: str) -> bytes:
+            offset, size = layout[name]
+            return mapped[base + offset:base + offset + size]
+
+        index = cls()
+        for name in ("doc_ids", "lengths", "created", "df", "last", "offsets"):
+            getattr(index, name if name != "offsets" else "_offsets").frombytes(section(name))
+        index.alive = bytearray(section("alive"))
+        terms = section("terms").decode()
+        term_list = terms.split("\n") if terms else []
+        index.terms = dict(zip(term_list, range(len(term_list))))
+        index.postings = [None] * len(term_list)
+        index.total_length = meta["total_length"]
+        index.watermark = meta["watermark"]
+        index.changes_position = meta.get("changes_position", "")
+        alive = index.alive
+        index.docnums = {tweet_id: docnum for docnum, tweet_id in enumerate(index.doc_ids) if alive[docnum]}
+        index._mapped = mapped
+        index._mapped_base = base + layout["postings"][0]
+        return index
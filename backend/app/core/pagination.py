@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+
+# (created_at, id) del último elemento de la página anterior
+Cursor = Tuple[datetime, int]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Cursor opaco (base64 url-safe) a partir de (created_at, id)"""
+    payload = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decodificar un cursor de encode_cursor; ValueError si es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Next-Cursor")
+) -> Optional[Cursor]:
+    """Dependencia: decodificar el parámetro ?cursor= (400 si es inválido)"""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def keyset_paginate(query, created_col, id_col, cursor: Optional[Cursor], skip: int, limit: int, ascending: bool = False):
+    """
+    Ordenar por (created_at, id) y paginar. Con cursor se filtra por
+    comparación de tuplas, que usa los índices compuestos (created_at, id)
+    y cuesta lo mismo en cualquier página; sin cursor se mantiene el
+    offset (skip) clásico por compatibilidad.
+    """
+    if cursor is not None:
+        key = tuple_(created_col, id_col)
+        query = query.filter(key > tuple_(*cursor) if ascending else key < tuple_(*cursor))
+
+    if ascending:
+        query = query.order_by(created_col.asc(), id_col.asc())
+    else:
+        query = query.order_by(created_col.desc(), id_col.desc())
+
+    if cursor is None and skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, items: List[dict], limit: int):
+    """Publicar el cursor de la página siguiente (solo si la página vino llena)"""
+    if items and len(items) >= limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last["created_at"], last["id"])
+
+
+# Resultados por relevancia: (score, id) del último elemento y el instante
+# con el que se calculó la recencia (as_of), fijo para todas las páginas de
+# una búsqueda para que los puntajes no cambien entre una página y otra
+class RankCursor(NamedTuple):
+    score: float
+    id: int
+    as_of: datetime
+
+
+def encode_rank_cursor(score: float, id: int, as_of: datetime) -> str:
+    payload = json.dumps([score, id, as_of.isoformat()], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> RankCursor:
+    """Decodificar un cursor de encode_rank_cursor; ValueError si es inválido"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, id, as_of = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return RankCursor(float(score), int(id), datetime.fromisoformat(as_of))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_rank_cursor(
+    cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en X-Next-Cursor")
+) -> Optional[RankCursor]:
+    """Dependencia: como get_cursor, para resultados ordenados por relevancia"""
+    if not cursor:
+        return None
+    try:
+        return decode_rank_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def set_next_rank_cursor(response: Response, ranked: List[Tuple[int, float]], limit: int, as_of: datetime):
+    """Publicar el cursor de la página siguiente a partir de filas (id, score)"""
+    if ranked and len(ranked) >= limit:
+        id, score = ranked[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_rank_cursor(score, id, as_of)
@@ -0,0 +1,24 @@
+from app.core.config import settings
+
+_client = None
+_binary_client = None
+
+
+def get_redis():
+    """Cliente Redis compartido (se crea la primera vez que se usa)"""
+    global _client
+    if _client is None:
+        import redis
+
+        _client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+    return _client
+
+
+def get_binary_redis():
+    """Cliente Redis sin decodificar respuestas (valores binarios)"""
+    global _binary_client
+    if _binary_client is None:
+        import redis
+
+        _binary_client = redis.Redis.from_url(settings.redis_url)
+    return _binary_client
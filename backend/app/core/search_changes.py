@@ -0,0 +1,88 @@
+"""
+Feed de cambios del índice de búsqueda embebido (EmbeddedSearchBackend):
+las ediciones y borrados que confirma un worker, para que los demás los
+apliquen a su índice. Los tweets nuevos no pasan por acá: cada worker los
+lee de la base por encima de su marca de agua.
+
+Un cambio es ("index", tweet_id, content, created_at en segundos epoch) o
+("remove", tweet_id). Las posiciones son opacas; la última aplicada viaja
+en el snapshot del índice para seguir desde ahí al reiniciar.
+"""
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+import orjson
+
+from app.core.config import require_single_worker, settings
+
+Change = tuple
+
+
+class SearchChangeFeed(ABC):
+
+    @abstractmethod
+    def publish(self, changes: List[Change]):
+        """Publicar cambios ya confirmados en la base"""
+
+    @abstractmethod
+    def position(self) -> str:
+        """Posición actual: read() desde acá devuelve solo lo publicado después"""
+
+    @abstractmethod
+    def read(self, after: str, count: int) -> Tuple[str, List[Change]]:
+        """Hasta `count` publicaciones posteriores a `after`, en orden, y la posición nueva"""
+
+
+class InMemorySearchChangeFeed(SearchChangeFeed):
+    """Un solo worker: sus cambios ya están en su índice y no hay a quién avisar"""
+
+    def publish(self, changes: List[Change]):
+        pass
+
+    def position(self) -> str:
+        return ""
+
+    def read(self, after: str, count: int) -> Tuple[str, List[Change]]:
+        return after, []
+
+
+class RedisSearchChangeFeed(SearchChangeFeed):
+    """
+    Un stream de Redis (XADD / XREAD) recortado a unas max_len publicaciones.
+    Un worker que queda más atrás que eso (o que arranca de un snapshot muy
+    viejo) pierde las intermedias: se repara reconstruyendo el snapshot con
+    python -m app.scripts.build_search_index.
+    """
+
+    KEY = "search:changes"
+
+    def __init__(self, max_len: int):
+        from app.core.redis import get_redis
+
+        self.redis = get_redis()
+        self.max_len = max_len
+
+    def publish(self, changes: List[Change]):
+        if changes:
+            self.redis.xadd(self.KEY, {"changes": orjson.dumps(changes)}, maxlen=self.max_len, approximate=True)
+
+    def position(self) -> str:
+        last = self.redis.xrevrange(self.KEY, count=1)
+        return last[0][0] if last else "0-0"
+
+    def read(self, after: str, count: int) -> Tuple[str, List[Change]]:
+        changes: List[Change] = []
+        for _, entries in self.redis.xread({self.KEY: after or "0-0"}, count=count):
+            for entry_id, fields in entries:
+                changes.extend(tuple(change) for change in orjson.loads(fields["changes"]))
+                after = entry_id
+        return after, changes
+
+
+def create_search_change_feed() -> SearchChangeFeed:
+    if settings.search_changes_backend == "redis":
+        return RedisSearchChangeFeed(settings.search_changes_max_len)
+    if settings.search_changes_backend == "memory":
+        require_single_worker("search_changes_backend", settings.search_changes_backend)
+        return InMemorySearchChangeFeed()
+    raise ValueError(f"Unknown search changes backend: {settings.search_changes_backend}")
@@ -0,0 +1,148 @@
+"""
+Estructuras aproximadas para contar muchos elementos distintos en memoria
+fija: un Count-Min Sketch y una lista de candidatos top-K sobre él.
+
+Las dos se pueden combinar (merge): el sketch de varios procesos sumado
+celda por celda es el sketch del flujo completo, así que cada worker cuenta
+lo suyo y un lector suma los sketches publicados.
+"""
+import hashlib
+import heapq
+import math
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch (Cormode y Muthukrishnan) con contadores float, para
+    poder sumar pesos con decaimiento.
+
+    estimate(x) nunca es menor que el conteo real y, con probabilidad
+    1 - delta, no lo supera en más de epsilon * total, con
+    epsilon = e / width y delta = e^-depth. Los índices salen de blake2b
+    (no de hash(), que cambia entre procesos): 8 bytes independientes por
+    fila. Con doble hashing (h1 + i*h2) dos claves que chocan en dos filas
+    chocan en todas y la cota deja de valer.
+    """
+
+    def __init__(self, width: int, depth: int, counts: Optional[array] = None, total: float = 0.0):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array("d", bytes(8 * width * depth))
+        self.total = total
+
+    @classmethod
+    def for_error(cls, epsilon: float, delta: float) -> "CountMinSketch":
+        """Sketch con error relativo epsilon y probabilidad de falla delta"""
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def memory_bytes(self) -> int:
+        return self.counts.itemsize * len(self.counts)
+
+    def indexes(self, key: str) -> List[int]:
+        """Celdas de `key` (sirven para cualquier sketch de las mismas dimensiones)"""
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * self.depth).digest()
+        width = self.width
+        return [
+            row * width + int.from_bytes(digest[8 * row:8 * row + 8], "little") % width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, count: float = 1.0, indexes: Optional[List[int]] = None) -> float:
+        """Sumar `count` a `key`; devuelve la estimación nueva"""
+        counts = self.counts
+        estimate = math.inf
+        for index in indexes or self.indexes(key):
+            value = counts[index] + count
+            counts[index] = value
+            if value < estimate:
+                estimate = value
+        self.total += count
+        return estimate
+
+    def estimate(self, key: str) -> float:
+        counts = self.counts
+        return min(counts[index] for index in self.indexes(key))
+
+    def scale(self, factor: float):
+        """Multiplicar todos los contadores (renormalizar pesos con decaimiento)"""
+        self.counts = array("d", (value * factor for value in self.counts))
+        self.total *= factor
+
+    def merge(self, other: "CountMinSketch", factor: float = 1.0):
+        """Sumar otro sketch de las mismas dimensiones (multiplicado por `factor`)"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge sketches with different dimensions")
+        counts = self.counts
+        for index, value in enumerate(other.counts):
+            if value:
+                counts[index] += value * factor
+        self.total += other.total * factor
+
+    def copy(self) -> "CountMinSketch":
+        return CountMinSketch(self.width, self.depth, array("d", self.counts), self.total)
+
+
+class TopK:
+    """
+    Los k elementos con mayor estimación vista, sobre un CountMinSketch
+    (variante del Space-Saving que usa el sketch en lugar de heredar el
+    contador del desalojado).
+
+    Un min-heap con entradas perezosas: al subir la estimación de un
+    candidato se apila una entrada nueva y las viejas se descartan al llegar
+    arriba. Las estimaciones solo crecen, así que el mínimo es correcto.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.counts: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def _floor(self) -> Tuple[float, str]:
+        heap = self._heap
+        counts = self.counts
+        while counts.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def offer(self, key: str, estimate: float):
+        counts = self.counts
+        if key not in counts and len(counts) >= self.k:
+            floor_estimate, floor_key = self._floor()
+            if estimate <= floor_estimate:
+                return
+            heapq.heappop(self._heap)
+            del counts[floor_key]
+        counts[key] = estimate
+        heapq.heappush(self._heap, (estimate, key))
+        if len(self._heap) > 4 * self.k:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(estimate, key) for key, estimate in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def scale(self, factor: float):
+        self.counts = {key: estimate * factor for key, estimate in self.counts.items()}
+        self._rebuild()
+
+    def items(self) -> List[Tuple[str, float]]:
+        """Candidatos de mayor a menor estimación"""
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def refill(self, keys: Iterable[str], sketch: CountMinSketch):
+        """Reemplazar los candidatos por los mejores de `keys` según `sketch` (merge)"""
+        self.counts = {}
+        self._heap = []
+        for key in keys:
+            self.offer(key, sketch.estimate(key))
@@ -0,0 +1,269 @@
+import bisect
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import require_single_worker, settings
+
+# (score, tweet_id): score es el timestamp de created_at
+Entry = Tuple[float, int]
+
+
+class TimelineStore(ABC):
+    """
+    Almacén de home timelines materializados: por usuario, una lista acotada
+    de IDs de tweets ordenada por tiempo (más recientes primero al leer).
+
+    Un timeline que no existe todavía no recibe pushes: se reconstruye
+    completo desde la base de datos la primera vez que se lee.
+
+    Un timeline que alguna vez superó max_size queda marcado como recortado
+    (is_trimmed): más allá de su entrada más vieja hay tweets que no están.
+    La marca no depende del tamaño actual, que baja con los remove.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+
+    @abstractmethod
+    def exists(self, user_id: int) -> bool:
+        pass
+
+    @abstractmethod
+    def size(self, user_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def is_trimmed(self, user_id: int) -> bool:
+        """Si el timeline perdió entradas viejas por el tope de max_size"""
+
+    @abstractmethod
+    def replace(self, user_id: int, entries: List[Entry]):
+        """
+        Reemplazar (o crear) el timeline completo de un usuario. Con más de
+        max_size entradas se guardan las más recientes y queda recortado.
+        """
+
+    @abstractmethod
+    def push(self, user_ids: Iterable[int], tweet_id: int, score: float):
+        """Agregar un tweet a los timelines existentes de varios usuarios"""
+
+    @abstractmethod
+    def remove(self, user_ids: Iterable[int], tweet_ids: Iterable[int]):
+        pass
+
+    @abstractmethod
+    def range(self, user_id: int, before: Optional[Entry] = None, offset: int = 0, limit: int = 20) -> List[Entry]:
+        """Entradas más recientes primero, estrictamente anteriores a `before`"""
+
+    @abstractmethod
+    def tweet_ids(self, user_id: int) -> List[int]:
+        pass
+
+    @abstractmethod
+    def delete(self, user_id: int):
+        pass
+
+    @abstractmethod
+    def mark_pulled(self, author_id: int):
+        """Marcar un autor como pull: sus tweets no se empujan, se mezclan al leer"""
+
+    @abstractmethod
+    def filter_pulled(self, author_ids: List[int]) -> Set[int]:
+        """Subconjunto de author_ids marcados como pull"""
+
+
+class InMemoryTimelineStore(TimelineStore):
+    """
+    Implementación en proceso, para tests, desarrollo o un único worker: sin
+    TTL, y los push/remove de un worker no llegan a los demás.
+    """
+
+    def __init__(self, max_size: int):
+        super().__init__(max_size)
+        # user_id -> lista ordenada ascendente de (score, tweet_id)
+        self._timelines: Dict[int, List[Entry]] = {}
+        self._pulled: Set[int] = set()
+        self._trimmed: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def exists(self, user_id: int) -> bool:
+        return user_id in self._timelines
+
+    def size(self, user_id: int) -> int:
+        return len(self._timelines.get(user_id, []))
+
+    def is_trimmed(self, user_id: int) -> bool:
+        return user_id in self._trimmed
+
+    def replace(self, user_id: int, entries: List[Entry]):
+        with self._lock:
+            self._timelines[user_id] = sorted(entries)[-self.max_size:]
+            if len(entries) > self.max_size:
+                self._trimmed.add(user_id)
+            else:
+                self._trimmed.discard(user_id)
+
+    def push(self, user_ids: Iterable[int], tweet_id: int, score: float):
+        entry = (score, tweet_id)
+        with self._lock:
+            for user_id in user_ids:
+                timeline = self._timelines.get(user_id)
+                if timeline is None:
+                    continue
+                position = bisect.bisect_left(timeline, entry)
+                if position < len(timeline) and timeline[position] == entry:
+                    continue
+                timeline.insert(position, entry)
+                if len(timeline) > self.max_size:
+                    del timeline[:len(timeline) - self.max_size]
+                    self._trimmed.add(user_id)
+
+    def remove(self, user_ids: Iterable[int], tweet_ids: Iterable[int]):
+        tweet_ids = set(tweet_ids)
+        with self._lock:
+            for user_id in user_ids:
+                timeline = self._timelines.get(user_id)
+                if timeline is not None:
+                    timeline[:] = [entry for entry in timeline if entry[1] not in tweet_ids]
+
+    def range(self, user_id: int, before: Optional[Entry] = None, offset: int = 0, limit: int = 20) -> List[Entry]:
+        timeline = self._timelines.get(user_id, [])
+        end = bisect.bisect_left(timeline, before) if before is not None else len(timeline)
+        end -= offset
+        start = max(end - limit, 0)
+        if end <= 0:
+            return []
+        return timeline[start:end][::-1]
+
+    def tweet_ids(self, user_id: int) -> List[int]:
+        return [tweet_id for _, tweet_id in self._timelines.get(user_id, [])]
+
+    def delete(self, user_id: int):
+        with self._lock:
+            self._timelines.pop(user_id, None)
+            self._trimmed.discard(user_id)
+
+    def mark_pulled(self, author_id: int):
+        self._pulled.add(author_id)
+
+    def filter_pulled(self, author_ids: List[int]) -> Set[int]:
+        return self._pulled.intersection(author_ids)
+
+
+class RedisTimelineStore(TimelineStore):
+    """
+    Implementación sobre sorted sets de Redis (un ZSET por usuario,
+    score = timestamp de created_at, miembro = ID del tweet). La marca de
+    recortado es otra clave ("timeline:{id}:trimmed") con el mismo TTL.
+    """
+
+    # Solo agrega en timelines que ya existen, y recorta al tamaño máximo
+    _PUSH_SCRIPT = """
+    local cap = tonumber(ARGV[3])
+    local ttl = tonumber(ARGV[4])
+    for _, key in ipairs(KEYS) do
+        if redis.call('EXISTS', key) == 1 then
+            redis.call('ZADD', key, ARGV[1], ARGV[2])
+            if redis.call('ZREMRANGEBYRANK', key, 0, -(cap + 1)) > 0 then
+                redis.call('SET', key .. ':trimmed', 1, 'EX', ttl)
+            end
+        end
+    end
+    """
+
+    # Empates de score: Redis los ordena por miembro como string, así que
+    # se piden algunas entradas de más y se reordenan por (score, id)
+    _TIE_SLACK = 16
+    _PUSH_BATCH = 500
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        super().__init__(max_size)
+        from app.core.redis import get_redis
+
+        self.redis = get_redis()
+        self.ttl_seconds = ttl_seconds
+        self._push = self.redis.register_script(self._PUSH_SCRIPT)
+
+    def _key(self, user_id: int) -> str:
+        return f"timeline:{user_id}"
+
+    def _trimmed_key(self, user_id: int) -> str:
+        return f"{self._key(user_id)}:trimmed"
+
+    def exists(self, user_id: int) -> bool:
+        return bool(self.redis.exists(self._key(user_id)))
+
+    def size(self, user_id: int) -> int:
+        return self.redis.zcard(self._key(user_id))
+
+    def is_trimmed(self, user_id: int) -> bool:
+        return bool(self.redis.exists(self._trimmed_key(user_id)))
+
+    def replace(self, user_id: int, entries: List[Entry]):
+        key = self._key(user_id)
+        trimmed = len(entries) > self.max_size
+        entries = sorted(entries)[-self.max_size:]
+        pipe = self.redis.pipeline()
+        pipe.delete(key, self._trimmed_key(user_id))
+        if entries:
+            pipe.zadd(key, {str(tweet_id): score for score, tweet_id in entries})
+            pipe.expire(key, self.ttl_seconds)
+            if trimmed:
+                pipe.set(self._trimmed_key(user_id), 1, ex=self.ttl_seconds)
+        pipe.execute()
+
+    def push(self, user_ids: Iterable[int], tweet_id: int, score: float):
+        keys = [self._key(user_id) for user_id in user_ids]
+        for i in range(0, len(keys), self._PUSH_BATCH):
+            self._push(keys=keys[i:i + self._PUSH_BATCH], args=[score, tweet_id, self.max_size, self.ttl_seconds])
+
+    def remove(self, user_ids: Iterable[int], tweet_ids: Iterable[int]):
+        members = [str(tweet_id) for tweet_id in tweet_ids]
+        if not members:
+            return
+        pipe = self.redis.pipeline()
+        for user_id in user_ids:
+            pipe.zrem(self._key(user_id), *members)
+        pipe.execute()
+
+    def range(self, user_id: int, before: Optional[Entry] = None, offset: int = 0, limit: int = 20) -> List[Entry]:
+        key = self._key(user_id)
+        max_score = before[0] if before is not None else "+inf"
+        rows = self.redis.zrevrangebyscore(
+            key, max_score, "-inf", start=offset, num=limit + self._TIE_SLACK, withscores=True
+        )
+        entries = [(score, int(member)) for member, score in rows]
+        if before is not None:
+            entries = [entry for entry in entries if entry < before]
+        entries.sort(reverse=True)
+        if entries:
+            pipe = self.redis.pipeline()
+            pipe.expire(key, self.ttl_seconds)
+            pipe.expire(self._trimmed_key(user_id), self.ttl_seconds)
+            pipe.execute()
+        return entries[:limit]
+
+    def tweet_ids(self, user_id: int) -> List[int]:
+        return [int(member) for member in self.redis.zrange(self._key(user_id), 0, -1)]
+
+    def delete(self, user_id: int):
+        self.redis.delete(self._key(user_id), self._trimmed_key(user_id))
+
+    def mark_pulled(self, author_id: int):
+        self.redis.sadd("timeline:pulled_authors", author_id)
+
+    def filter_pulled(self, author_ids: List[int]) -> Set[int]:
+        if not author_ids:
+            return set()
+        flags = self.redis.smismember("timeline:pulled_authors", author_ids)
+        return {author_id for author_id, flag in zip(author_ids, flags) if flag}
+
+
+def create_timeline_store() -> TimelineStore:
+    if settings.timeline_backend == "redis":
+        return RedisTimelineStore(settings.timeline_max_size, settings.timeline_ttl_seconds)
+    if settings.timeline_backend == "memory":
+        require_single_worker("timeline_backend", settings.timeline_backend)
+        return InMemoryTimelineStore(settings.timeline_max_size)
+    raise ValueError(f"Unknown timeline backend: {settings.timeline_backend}")
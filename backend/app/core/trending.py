@@ -0,0 +1,347 @@
+import math
+import struct
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import require_single_worker, settings
+from app.core.sketch import CountMinSketch, TopK
+
+# Trend: {"tag", "count" (usos en la ventana), "tweets_count", "score"}
+Trend = dict
+
+# Tasa mínima (usos por minuto) con la que se compara: evita que un tag sin
+# historia con un par de usos quede arriba de todo
+BASELINE_PRIOR = 0.1
+
+
+def decay_weights(half_life_minutes: float, window_minutes: int) -> List[float]:
+    """Peso de cada minuto por antigüedad (0 = el actual), hasta ~6 vidas medias"""
+    horizon = max(1, min(window_minutes, int(math.ceil(half_life_minutes * 6))))
+    return [0.5 ** (age / half_life_minutes) for age in range(horizon)]
+
+
+def trend_score(velocity: float, baseline: float) -> float:
+    """
+    Cuánto se aparta la tasa reciente (con decaimiento) de la tasa de toda
+    la ventana, en desvíos de un Poisson con esa tasa: un tag que siempre
+    tiene 10 usos por minuto no es tendencia; uno que pasa de 0 a 5, sí.
+    """
+    return (velocity - baseline) / math.sqrt(baseline + BASELINE_PRIOR)
+
+
+class TrendCounter(ABC):
+    """
+    Contadores de uso de hashtags por minuto sobre una ventana deslizante
+    (window_minutes). Los minutos son enteros: int(timestamp // 60).
+
+    Se alimenta con add() y se consulta con top(); advance() descarta los
+    minutos que salieron de la ventana aunque no lleguen tweets nuevos.
+    """
+
+    def __init__(self, window_minutes: int, half_life_minutes: float, min_count: int):
+        self.window_minutes = window_minutes
+        self.min_count = min_count
+        self.weights = decay_weights(half_life_minutes, window_minutes)
+        self.weights_sum = sum(self.weights)
+
+    @abstractmethod
+    def add(self, minute: int, counts: Dict[str, int]):
+        pass
+
+    @abstractmethod
+    def advance(self, minute: int):
+        pass
+
+    @abstractmethod
+    def top(self, minute: int, limit: int) -> List[Trend]:
+        """Tags ordenados por trend_score al minuto `minute`"""
+
+
+class RingTrendCounter(TrendCounter):
+    """
+    Conteo exacto: un ring buffer con un dict tag -> usos por minuto y los
+    totales de la ventana mantenidos al agregar y al descartar minutos. La
+    memoria es proporcional a los tags distintos por minuto.
+
+    Sin locks: lo usa un solo hilo (el de TrendingService), que publica el
+    resultado de top() como snapshot.
+    """
+
+    def __init__(self, window_minutes: int, half_life_minutes: float, min_count: int):
+        super().__init__(window_minutes, half_life_minutes, min_count)
+        self._buckets: List[Optional[Dict[str, int]]] = [None] * window_minutes
+        self._bucket_minutes: List[int] = [-1] * window_minutes
+        self.totals: Dict[str, int] = {}
+        self.minute = -1
+
+    def _evict(self, index: int):
+        bucket = self._buckets[index]
+        if bucket:
+            totals = self.totals
+            for tag, count in bucket.items():
+                remaining = totals[tag] - count
+                if remaining:
+                    totals[tag] = remaining
+                else:
+                    del totals[tag]
+        self._buckets[index] = None
+        self._bucket_minutes[index] = -1
+
+    def advance(self, minute: int):
+        if minute <= self.minute:
+            return
+        # Los minutos entre el último visto y `minute` reciclan su slot
+        first = max(self.minute + 1, minute - self.window_minutes + 1)
+        for current in range(first, minute + 1):
+            index = current % self.window_minutes
+            if self._bucket_minutes[index] != -1:
+                self._evict(index)
+        self.minute = minute
+
+    def add(self, minute: int, counts: Dict[str, int]):
+        if minute > self.minute:
+            self.advance(minute)
+        if minute <= self.minute - self.window_minutes:
+            return  # fuera de la ventana
+        index = minute % self.window_minutes
+        bucket = self._buckets[index]
+        if bucket is None:
+            bucket = self._buckets[index] = {}
+            self._bucket_minutes[index] = minute
+        totals = self.totals
+        for tag, count in counts.items():
+            bucket[tag] = bucket.get(tag, 0) + count
+            totals[tag] = totals.get(tag, 0) + count
+
+    def top(self, minute: int, limit: int) -> List[Trend]:
+        self.advance(minute)
+        # Solo compiten los tags usados dentro del horizonte del decaimiento
+        decayed: Dict[str, float] = {}
+        recent: Dict[str, int] = {}
+        for age, weight in enumerate(self.weights):
+            index = (minute - age) % self.window_minutes
+            if self._bucket_minutes[index] != minute - age:
+                continue
+            for tag, count in self._buckets[index].items():
+                decayed[tag] = decayed.get(tag, 0.0) + count * weight
+                recent[tag] = recent.get(tag, 0) + count
+
+        trends = []
+        for tag, weighted in decayed.items():
+            if recent[tag] < self.min_count:
+                continue
+            total = self.totals[tag]
+            score = trend_score(weighted / self.weights_sum, total / self.window_minutes)
+            trends.append({"tag": tag, "count": total, "tweets_count": total, "score": round(score, 4)})
+        trends.sort(key=lambda trend: (-trend["score"], -trend["count"], trend["tag"]))
+        return trends[:limit]
+
+
+class SketchTrendCounter(TrendCounter):
+    """
+    Conteo aproximado en memoria fija, para tasas de tweets donde un dict
+    por minuto sale caro: dos CountMinSketch con decaimiento exponencial en
+    lugar del ring buffer, y un TopK de candidatos.
+
+    - recent: vida media half_life_minutes (la tasa reciente);
+    - baseline: la tasa de referencia, con vida media window_minutes * ln 2 / 2
+      (la edad media de sus usos es la de una ventana de window_minutes).
+
+    Decaimiento "hacia adelante": un uso en el minuto t suma
+    2^((t - landmark) / vida_media) y al consultar se divide por el peso del
+    minuto actual. Los contadores nunca se actualizan por el paso del tiempo,
+    así que dos sketches se suman celda por celda (llevados al mismo
+    landmark): cada worker publica el suyo y el lector los combina con
+    merge(). El landmark se corre cada tanto para no desbordar los floats.
+
+    Difiere del conteo exacto en que no hay corte duro de ventana: "count"
+    son los usos con el decaimiento del baseline, y min_count se compara con
+    los usos recientes ya decaídos. El error de
+    cada estimación está acotado por el del CountMinSketch (epsilon * total).
+
+    Frente a RingTrendCounter: los tags que de verdad se disparan salen en el
+    mismo orden, pero los puntajes no son comparables (solo sus proporciones)
+    y el resto del top, tags del flujo normal con puntajes cercanos a 0,
+    puede coincidir poco: 3 de 10 en benchmark_trending (ver tests/test_sketch.py).
+    """
+
+    # Correr el landmark cuando los pesos llegan a 2^RENORMALIZE_AFTER
+    RENORMALIZE_AFTER = 64
+
+    def __init__(
+        self, window_minutes: int, half_life_minutes: float, min_count: int,
+        width: int, depth: int, top_k: int
+    ):
+        super().__init__(window_minutes, half_life_minutes, min_count)
+        self.half_life_minutes = half_life_minutes
+        self.baseline_half_life = window_minutes * math.log(2) / 2
+        self.top_k = top_k
+        self.recent = CountMinSketch(width, depth)
+        self.baseline = CountMinSketch(width, depth)
+        self.candidates = TopK(top_k)
+        self.landmark: Optional[int] = None
+        self.minute = -1
+
+    def _weights(self, minute: int) -> Tuple[float, float]:
+        age = minute - self.landmark
+        return 2.0 ** (age / self.half_life_minutes), 2.0 ** (age / self.baseline_half_life)
+
+    def _move_landmark(self, landmark: int):
+        if self.landmark is not None and landmark != self.landmark:
+            age = self.landmark - landmark
+            recent_factor = 2.0 ** (age / self.half_life_minutes)
+            self.recent.scale(recent_factor)
+            self.candidates.scale(recent_factor)
+            self.baseline.scale(2.0 ** (age / self.baseline_half_life))
+        self.landmark = landmark
+
+    def advance(self, minute: int):
+        if self.landmark is None or minute - self.landmark > self.RENORMALIZE_AFTER * self.half_life_minutes:
+            self._move_landmark(minute)
+        self.minute = max(self.minute, minute)
+
+    def add(self, minute: int, counts: Dict[str, int]):
+        self.advance(minute)
+        recent_weight, baseline_weight = self._weights(minute)
+        for tag, count in counts.items():
+            indexes = self.recent.indexes(tag)
+            self.candidates.offer(tag, self.recent.add(tag, count * recent_weight, indexes))
+            self.baseline.add(tag, count * baseline_weight, indexes)
+
+    def top(self, minute: int, limit: int) -> List[Trend]:
+        self.advance(minute)
+        recent_weight, baseline_weight = self._weights(minute)
+        # Con decaimiento continuo la masa de una tasa constante r es
+        # r * vida_media / ln 2 (recent se normaliza con weights_sum, lo mismo
+        # que en el conteo exacto)
+        baseline_norm = self.baseline_half_life / math.log(2)
+        trends = []
+        for tag, _ in self.candidates.items():
+            # La estimación guardada en el candidato es la de su último uso:
+            # después otros tags pudieron sumar en sus celdas
+            recent = self.recent.estimate(tag) / recent_weight
+            if recent < self.min_count:
+                continue
+            # count: usos con el decaimiento del baseline (los viejos se desvanecen)
+            used = self.baseline.estimate(tag) / baseline_weight
+            score = trend_score(recent / self.weights_sum, used / baseline_norm)
+            count = round(used)
+            trends.append({"tag": tag, "count": count, "tweets_count": count, "score": round(score, 4)})
+        trends.sort(key=lambda trend: (-trend["score"], -trend["count"], trend["tag"]))
+        return trends[:limit]
+
+    def merge(self, other: "SketchTrendCounter"):
+        """Sumar los conteos de otro SketchTrendCounter (de otro worker)"""
+        if other.landmark is None:
+            return
+        if self.landmark is None:
+            self.landmark = other.landmark
+        age = other.landmark - self.landmark
+        self.recent.merge(other.recent, 2.0 ** (age / self.half_life_minutes))
+        self.baseline.merge(other.baseline, 2.0 ** (age / self.baseline_half_life))
+        self.candidates.refill(set(self.candidates.counts) | set(other.candidates.counts), self.recent)
+        self.minute = max(self.minute, other.minute)
+
+    def copy(self) -> "SketchTrendCounter":
+        clone = SketchTrendCounter(
+            self.window_minutes, self.half_life_minutes, self.min_count,
+            self.recent.width, self.recent.depth, self.top_k
+        )
+        clone.recent = self.recent.copy()
+        clone.baseline = self.baseline.copy()
+        clone.candidates.refill(self.candidates.counts, clone.recent)
+        clone.landmark = self.landmark
+        clone.minute = self.minute
+        return clone
+
+    def memory_bytes(self) -> int:
+        return self.recent.memory_bytes() + self.baseline.memory_bytes()
+
+    def to_bytes(self) -> bytes:
+        """Estado serializado para publicarlo (ver from_bytes)"""
+        meta = orjson.dumps({
+            "window_minutes": self.window_minutes,
+            "half_life_minutes": self.half_life_minutes,
+            "min_count": self.min_count,
+            "width": self.recent.width,
+            "depth": self.recent.depth,
+            "top_k": self.top_k,
+            "landmark": self.landmark,
+            "minute": self.minute,
+            "totals": [self.recent.total, self.baseline.total],
+            "candidates": list(self.candidates.counts),
+        })
+        return (
+            struct.pack("<I", len(meta)) + meta
+            + self.recent.counts.tobytes() + self.baseline.counts.tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SketchTrendCounter":
+        (meta_size,) = struct.unpack_from("<I", data)
+        meta = orjson.loads(data[4:4 + meta_size])
+        counter = cls(
+            meta["window_minutes"], meta["half_life_minutes"], meta["min_count"],
+            meta["width"], meta["depth"], meta["top_k"]
+        )
+        cells = meta["width"] * meta["depth"]
+        offset = 4 + meta_size
+        recent = array("d")
+        recent.frombytes(data[offset:offset + 8 * cells])
+        baseline = array("d")
+        baseline.frombytes(data[offset + 8 * cells:offset + 16 * cells])
+        counter.recent = CountMinSketch(meta["width"], meta["depth"], recent, meta["totals"][0])
+        counter.baseline = CountMinSketch(meta["width"], meta["depth"], baseline, meta["totals"][1])
+        counter.candidates.refill(meta["candidates"], counter.recent)
+        counter.landmark = meta["landmark"]
+        counter.minute = meta["minute"]
+        return counter
+
+
+class SketchStore:
+    """
+    Dónde publica cada worker su SketchTrendCounter serializado para que los
+    demás lo combinen. En memoria no se comparte nada: un solo worker (con
+    varios, cada uno vería las tendencias de solo su parte de los tweets).
+    """
+
+    def publish(self, worker_id: str, data: bytes):
+        pass
+
+    def load_others(self, worker_id: str) -> List[bytes]:
+        return []
+
+
+class RedisSketchStore(SketchStore):
+    """Una clave por worker con TTL: los workers que mueren dejan de contar solos"""
+
+    PREFIX = "trending:sketch:"
+
+    def __init__(self, ttl_seconds: float):
+        from app.core.redis import get_binary_redis
+
+        self.redis = get_binary_redis()
+        self.ttl_ms = int(ttl_seconds * 1000)
+
+    def publish(self, worker_id: str, data: bytes):
+        self.redis.set(self.PREFIX + worker_id, data, px=self.ttl_ms)
+
+    def load_others(self, worker_id: str) -> List[bytes]:
+        own = (self.PREFIX + worker_id).encode()
+        keys = [key for key in self.redis.scan_iter(match=self.PREFIX + "*", count=100) if key != own]
+        if not keys:
+            return []
+        return [data for data in self.redis.mget(keys) if data is not None]
+
+
+def create_sketch_store() -> SketchStore:
+    if settings.trending_sketch_store == "redis":
+        # Varias vueltas del hilo de publicación antes de dar a un worker por muerto
+        return RedisSketchStore(settings.trending_poll_seconds * 6)
+    if settings.trending_sketch_store == "memory":
+        require_single_worker("trending_sketch_store", settings.trending_sketch_store)
+        return SketchStore()
+    raise ValueError(f"Unknown trending sketch store: {settings.trending_sketch_store}")
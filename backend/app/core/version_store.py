@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Hashable, Iterable, List
+
+from app.core.config import require_single_worker, settings
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class VersionStore(ABC):
+    """
+    Versión por recurso (un tweet, las notificaciones de un usuario...): el
+    momento del último cambio en milisegundos, forzado a crecer en cada
+    cambio. Sirve para armar ETags sin volver a renderizar la respuesta y
+    para saber si un cambio es tan reciente que una réplica podría no
+    tenerlo todavía (changed_since).
+
+    `generation` identifica el contenido del store: si se pierde (reinicio
+    del proceso, Redis vaciado), cambia y ningún ETag viejo vuelve a
+    coincidir aunque las versiones se repitan.
+    """
+
+    generation: str = ""
+
+    @abstractmethod
+    def get_many(self, keys: List[Hashable]) -> List[int]:
+        pass
+
+    def get(self, key: Hashable) -> int:
+        return self.get_many([key])[0]
+
+    @abstractmethod
+    def bump_many(self, keys: Iterable[Hashable]):
+        pass
+
+    def bump(self, key: Hashable):
+        self.bump_many([key])
+
+    def changed_since(self, versions: List[int], seconds: float) -> bool:
+        """Si alguna de estas versiones es de hace menos de `seconds`"""
+        horizon = now_ms() - seconds * 1000
+        return any(version > horizon for version in versions)
+
+
+class InMemoryVersionStore(VersionStore):
+    """
+    Implementación en proceso, para un único worker: un cambio atendido por
+    otro worker no movería estas versiones y sus ETags darían 304 con datos
+    viejos. Acota la cantidad de claves: al descartar una, sube el piso que
+    se devuelve para claves desconocidas, así una clave olvidada nunca vuelve
+    a una versión ya publicada.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.generation = uuid.uuid4().hex[:8]
+        self.max_keys = max_keys
+        self._versions: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._last = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[Hashable]) -> List[int]:
+        versions = self._versions
+        floor = self._floor
+        return [versions.get(key, floor) for key in keys]
+
+    def _next(self) -> int:
+        self._last = max(self._last + 1, now_ms())
+        return self._last
+
+    def bump_many(self, keys: Iterable[Hashable]):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._next()
+                self._versions.move_to_end(key)
+            while len(self._versions) > self.max_keys:
+                self._versions.popitem(last=False)
+                self._floor = self._next()
+
+
+class RedisVersionStore(VersionStore):
+    """Versiones compartidas entre workers: un entero por clave, sin TTL"""
+
+    _GENERATION_KEY = "version:generation"
+
+    # max(anterior + 1, ahora): crece aunque dos workers cambien en el mismo ms
+    _BUMP_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    for _, key in ipairs(KEYS) do
+        local version = tonumber(redis.call('GET', key) or '0') + 1
+        if version < now then
+            version = now
+        end
+        redis.call('SET', key, version)
+    end
+    """
+
+    def __init__(self):
+        from app.core.redis import get_redis
+
+        self.redis = get_redis()
+        self.redis.set(self._GENERATION_KEY, uuid.uuid4().hex[:8], nx=True)
+        self._bump = self.redis.register_script(self._BUMP_SCRIPT)
+        self.generation = self.redis.get(self._GENERATION_KEY)
+        if isinstance(self.generation, bytes):
+            self.generation = self.generation.decode()
+
+    def _key(self, key: Hashable) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return "version:" + ":".join(str(part) for part in parts)
+
+    def get_many(self, keys: List[Hashable]) -> List[int]:
+        if not keys:
+            return []
+        return [int(value or 0) for value in self.redis.mget([self._key(key) for key in keys])]
+
+    def bump_many(self, keys: Iterable[Hashable]):
+        keys = [self._key(key) for key in keys]
+        if keys:
+            self._bump(keys=keys, args=[now_ms()])
+
+
+def create_version_store() -> VersionStore:
+    if settings.version_store_backend == "redis":
+        return RedisVersionStore()
+    if settings.version_store_backend == "memory":
+        require_single_worker("version_store_backend", settings.version_store_backend)
+        return InMemoryVersionStore()
+    raise ValueError(f"Unknown version store backend: {settings.version_store_backend}")
+
+
+version_store = create_version_store()
@@ -1,3 +1,12 @@
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql.functions import now
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # CURRENT_TIMESTAMP de SQLite no tiene fracción de segundo ni el formato con
+    # el que SQLAlchemy guarda los datetime: así los cursores (created_at, id)
+    # también comparan bien en SQLite (desarrollo/tests)
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
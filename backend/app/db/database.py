@@ -1,7 +1,68 @@
+from typing import Any, Dict
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from app.core.config import settings
+from app.db.pool import instrumented_pool_class
 
+def async_database_url(database_url: str) -> URL:
+    """La misma base con driver async: asyncpg para Postgres, aiosqlite para SQLite"""
+    url = make_url(database_url)
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        # asyncpg no entiende sslmode/channel_binding de libpq (URLs de Neon/Render)
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if url.drivername == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+def engine_options(url: URL, is_async: bool = False) -> Dict[str, Any]:
+    """
+    Opciones de pool según Settings. Con db_pgbouncer el pooling lo hace
+    PgBouncer: NullPool y, en asyncpg, sin cache de prepared statements
+    (en modo transaction cada statement puede ir a otra conexión del servidor).
+    """
+    if settings.db_pgbouncer:
+        options: Dict[str, Any] = {"poolclass": NullPool}
+        if is_async and url.get_backend_name() == "postgresql":
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+
+    if url.get_backend_name() == "sqlite" and (is_async or url.database in (None, "", ":memory:")):
+        # SQLite (desarrollo): el pool por defecto de SQLAlchemy. En memoria es
+        # una sola conexión, y aiosqlite abre un hilo por conexión que un pool
+        # mantendría vivo al salir del proceso
+        return {}
+
+    return {
+        "poolclass": instrumented_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+_sync_url = make_url(settings.database_url)
 engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True
-)
\ No newline at end of file
+    _sync_url,
+    **engine_options(_sync_url)
+)
+
+# Réplicas de lectura (ver app/db/read_your_writes.py)
+replica_engines = [
+    create_engine(make_url(url), **engine_options(make_url(url)))
+    for url in settings.database_replica_urls
+]
+
+# Para los endpoints async: las queries no bloquean el event loop (ni los WebSockets)
+_async_url = async_database_url(settings.database_url)
+async_engine = create_async_engine(
+    _async_url,
+    **engine_options(_async_url, is_async=True)
+)
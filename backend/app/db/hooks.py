@@ -0,0 +1,36 @@
+"""
+Hooks después del commit (invalidar caches, marcar read-your-writes,
+registrar trending). Suelen ir a Redis con un cliente síncrono: en una
+Session común corren dentro del commit, como cualquier listener de
+"after_commit"; en una AsyncSession el commit corre en el event loop, así
+que se difieren y AsyncSessionLocal (ver app.db.session) los corre en el
+threadpool cuando termina el commit.
+"""
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+DEFER_KEY = "defer_after_commit"
+DEFERRED_KEY = "deferred_after_commit"
+
+Hook = Callable[[Session], None]
+
+
+def after_commit(hook: Hook) -> Hook:
+    """Decorador: registrar hook(session) para después de cada commit"""
+
+    @event.listens_for(Session, "after_commit")
+    def _after_commit(session: Session):
+        if session.info.get(DEFER_KEY):
+            session.info.setdefault(DEFERRED_KEY, []).append(hook)
+        else:
+            hook(session)
+
+    return hook
+
+
+def run_deferred(session: Session):
+    """Correr (fuera del event loop) los hooks que difirió el último commit"""
+    for hook in session.info.pop(DEFERRED_KEY, []):
+        hook(session)
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Tiempos de espera al pedir una conexión al pool (checkout)"""
+
+    def __init__(self, samples: int = 1024):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=samples)  # Últimas esperas, para los percentiles
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self._waits.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+        percentile = lambda p: waits[min(int(len(waits) * p), len(waits) - 1)] if waits else 0.0
+        to_ms = lambda seconds: round(seconds * 1000, 3)
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": to_ms(self.wait_seconds_total / self.checkouts) if self.checkouts else 0.0,
+            "wait_ms_p95": to_ms(percentile(0.95)),
+            "wait_ms_p99": to_ms(percentile(0.99)),
+            "wait_ms_max": to_ms(self.wait_seconds_max),
+        }
+
+
+class _TimedCheckout:
+    """Mixin sobre un pool de SQLAlchemy que mide cuánto tarda cada checkout"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+
+def instrumented_pool_class(base: Type[Pool]) -> Type[Pool]:
+    """
+    Subclase de `base` con métricas de checkout. Las métricas van en la clase
+    (no en la instancia) para sobrevivir a engine.dispose(), que recrea el pool.
+    """
+    return type(f"Instrumented{base.__name__}", (_TimedCheckout, base), {"metrics": PoolMetrics()})
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    """Gauges del pool (tamaño, en uso, overflow) más las esperas medidas"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        status.update({
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.stats())
+    return status
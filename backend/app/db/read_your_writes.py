@@ -0,0 +1,102 @@
+"""
+Read-your-writes con réplicas: después de que un usuario confirma una
+escritura, sus lecturas vuelven al primario durante
+settings.read_your_writes_seconds (más que el lag normal de las réplicas).
+
+Las sesiones marcan info["user_id"] (lo hace get_current_user); los eventos
+de abajo detectan si la transacción escribió y, al hacer commit, registran
+la escritura del usuario.
+
+La marca tiene que llegar a todos los workers: con más de uno,
+read_your_writes_backend="redis" ("memory" solo sirve con un worker, y
+create_recent_writes lo rechaza si WEB_CONCURRENCY > 1).
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import require_single_worker, settings
+from app.db.hooks import after_commit
+
+USER_ID_KEY = "user_id"
+WROTE_KEY = "wrote"
+
+
+class RecentWrites:
+    """Última escritura confirmada por usuario, en proceso (un solo worker)"""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._written_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int):
+        now = time.monotonic()
+        with self._lock:
+            self._written_at[user_id] = now
+            if len(self._written_at) > 10000:
+                # Podar marcas vencidas para que no crezca sin límite
+                self._written_at = {
+                    uid: at for uid, at in self._written_at.items() if now - at < self.window_seconds
+                }
+
+    def is_recent(self, user_id: int) -> bool:
+        written_at = self._written_at.get(user_id)
+        return written_at is not None and time.monotonic() - written_at < self.window_seconds
+
+
+class RedisRecentWrites(RecentWrites):
+    """Marcas compartidas entre workers: una clave con TTL por usuario"""
+
+    def __init__(self, window_seconds: float):
+        super().__init__(window_seconds)
+        from app.core.redis import get_redis
+
+        self.redis = get_redis()
+
+    def _key(self, user_id: int) -> str:
+        return f"recent_write:{user_id}"
+
+    def mark(self, user_id: int):
+        self.redis.set(self._key(user_id), 1, px=int(self.window_seconds * 1000))
+
+    def is_recent(self, user_id: int) -> bool:
+        return bool(self.redis.exists(self._key(user_id)))
+
+
+def create_recent_writes() -> RecentWrites:
+    if settings.read_your_writes_backend == "redis":
+        return RedisRecentWrites(settings.read_your_writes_seconds)
+    if settings.read_your_writes_backend == "memory":
+        require_single_worker("read_your_writes_backend", settings.read_your_writes_backend)
+        return RecentWrites(settings.read_your_writes_seconds)
+    raise ValueError(f"Unknown read-your-writes backend: {settings.read_your_writes_backend}")
+
+
+recent_writes = create_recent_writes()
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_flush(session: Session, flush_context):
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_write(orm_execute_state):
+    # UPDATE/DELETE masivos (contadores) no pasan por el flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info[WROTE_KEY] = True
+
+
+@after_commit
+def _mark_recent_write(session: Session):
+    if session.info.pop(WROTE_KEY, False) and session.info.get(USER_ID_KEY) is not None:
+        recent_writes.mark(session.info[USER_ID_KEY])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write_flag(session: Session):
+    session.info.pop(WROTE_KEY, None)
@@ -0,0 +1,80 @@
+"""
+Índice de texto completo de tweets.content, creado con DDL idempotente al
+iniciar (create_all no lo conoce):
+
+- PostgreSQL: columna generada tweets.search_vector (tsvector, STORED) con
+  índice GIN. La mantiene la base en cada INSERT/UPDATE, también en la
+  ingesta masiva con Core. Agregarla a una tabla existente la reescribe:
+  en una base grande conviene correr este DDL en una ventana de
+  mantenimiento antes de desplegar.
+- SQLite (desarrollo/tests): tabla FTS5 de contenido externo tweets_fts
+  con triggers de insert/update/delete; si se acaba de crear se reconstruye
+  desde tweets.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+SEARCH_VECTOR_COLUMN = "search_vector"
+FTS_TABLE = "tweets_fts"
+
+_SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tweets BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tweets BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON tweets BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+
+
+def _ensure_postgresql(conn):
+    # La configuración va literal: la expresión de una columna generada tiene
+    # que ser inmutable (to_tsvector(regconfig, text) lo es)
+    config = settings.search_text_config.replace("'", "''")
+    conn.execute(text(
+        f"ALTER TABLE tweets ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{config}'::regconfig, coalesce(content, ''))) STORED"
+    ))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_tweets_{SEARCH_VECTOR_COLUMN} ON tweets USING GIN ({SEARCH_VECTOR_COLUMN})"
+    ))
+
+
+def _ensure_sqlite(conn):
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+    if not exists:
+        # remove_diacritics 2: "cafe" encuentra "café"
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"content, content='tweets', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+    for trigger in _SQLITE_TRIGGERS:
+        conn.execute(text(trigger))
+    if not exists:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def ensure_search_index(engine: Engine):
+    """Crear el índice de búsqueda si falta (no hace nada si ya existe)"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            _ensure_postgresql(conn)
+        elif dialect == "sqlite":
+            _ensure_sqlite(conn)
+        else:
+            print(f"Búsqueda de texto completo no disponible para {dialect}")
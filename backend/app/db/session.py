@@ -1,4 +1,39 @@
-from sqlalchemy.orm import sessionmaker
-from app.db.database import engine
+import itertools
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from app.db.database import async_engine, engine, replica_engines
+from app.db.hooks import DEFER_KEY, run_deferred
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Solo lectura: cada sesión va a la réplica siguiente (round robin)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+_next_replica = itertools.cycle(replica_engines)
+
+def create_replica_session() -> Session:
+    """Sesión sobre una réplica (o el primario si no hay réplicas configuradas)"""
+    if not replica_engines:
+        return SessionLocal()
+    db = ReplicaSessionLocal(bind=next(_next_replica))
+    db.info["replica"] = True
+    return db
+
+class DeferredHooksAsyncSession(AsyncSession):
+    """
+    AsyncSession cuyos hooks after_commit (app.db.hooks) no corren dentro del
+    commit, en el event loop, sino al terminar commit(), en el threadpool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sync_session.info[DEFER_KEY] = True
+
+    async def commit(self):
+        await super().commit()
+        await run_in_threadpool(run_deferred, self.sync_session)
+
+# expire_on_commit=False: en async no hay lazy loads, los objetos siguen legibles después del commit
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=DeferredHooksAsyncSession, autoflush=False, expire_on_commit=False
+)
@@ -0,0 +1,30 @@
+from typing import Callable
+
+from sqlalchemy import Table
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+
+def insert_for_dialect(dialect: str) -> Callable:
+    """
+    insert() con soporte de ON CONFLICT (on_conflict_do_update/do_nothing)
+    de un dialecto: PostgreSQL en producción, SQLite en desarrollo/tests.
+    Ambos exponen la misma API. ValueError para cualquier otro.
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"ON CONFLICT not supported for dialect: {dialect}")
+    return insert
+
+
+# Se resuelve al importar: con una base sin ON CONFLICT la app no arranca
+_insert = insert_for_dialect(make_url(settings.database_url).get_backend_name())
+
+
+def dialect_insert(table: Table):
+    """INSERT de `table` con ON CONFLICT para el dialecto de DATABASE_URL"""
+    return _insert(table)
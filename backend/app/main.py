@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api.v1.api import api_router
+from app.core.conditional import ETAG_HEADER
 from app.core.config import settings
+from app.core.dependencies import require_metrics_token
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.db.database import engine
+from app.db.search_index import ensure_search_index
 from app.models import user, tweet, follow, like, hashtag, mention, message, notification
 import os
 
@@ -15,11 +20,14 @@ hashtag.Base.metadata.create_all(bind=engine)
 mention.Base.metadata.create_all(bind=engine)
 message.Base.metadata.create_all(bind=engine)
 notification.Base.metadata.create_all(bind=engine)
+# Índice de texto completo (columna generada + GIN, o FTS5 en SQLite)
+ensure_search_index(engine)
 
 app = FastAPI(
     title=settings.project_name,
     version="1.0.0",
-    openapi_url=f"{settings.api_v1_str}/openapi.json"
+    openapi_url=f"{settings.api_v1_str}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # CORS - Actualizado para producción
@@ -31,11 +39,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
 # API Router
 app.include_router(api_router, prefix=settings.api_v1_str)
 
+@app.on_event("startup")
+def start_background_jobs():
+    from app.services.search import search_service
+    from app.services.trending import trending_service
+    trending_service.start()
+    search_service.start()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    from app.services.search import search_service
+    from app.services.trending import trending_service
+    trending_service.stop()
+    search_service.stop()
+
 @app.get("/")
 def read_root():
     return {
@@ -48,5 +71,28 @@ def read_root():
 def health_check():
     return {"status": "healthy", "environment": os.getenv("ENVIRONMENT", "production")}
 
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    from app.db.database import async_engine, replica_engines
+    from app.db.pool import pool_status
+    from app.services.search import search_service
+    from app.services.trending import trending_service
+    from app.services.tweet import tweet_service
+    from app.services.user import user_service
+    return {
+        "tweet_cache": tweet_service.cache.stats(),
+        "principal_cache": user_service.principal_cache.stats(),
+        "db_pool": {
+            "sync": pool_status(engine),
+            "async": pool_status(async_engine.sync_engine),
+            "replicas": [pool_status(replica) for replica in replica_engines]
+        },
+        "trending": {
+            "watermark": trending_service.watermark,
+            "snapshot_at": trending_service.snapshot_at
+        },
+        "search": search_service.stats()
+    }
+
 print(f"Starting {settings.project_name} in {settings.environment} environment")
 print(f"Database URL: {settings.database_url}")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -12,7 +12,11 @@ class Follow(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Constraint para evitar seguimientos duplicados
-    __table_args__ = (UniqueConstraint('follower_id', 'followed_id', name='unique_follow'),)
+    # (el índice por followed_id sirve para listar/contar seguidores)
+    __table_args__ = (
+        UniqueConstraint('follower_id', 'followed_id', name='unique_follow'),
+        Index('ix_follows_followed_id', 'followed_id'),
+    )
     
     # Relaciones
     follower = relationship("User", foreign_keys=[follower_id], back_populates="following")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -11,6 +11,9 @@ class Mention(Base):
     mentioned_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Una mención por usuario y tweet (los inserts usan ON CONFLICT DO NOTHING)
+    __table_args__ = (UniqueConstraint('tweet_id', 'mentioned_user_id', name='unique_mention'),)
+    
     # Relaciones
     tweet = relationship("Tweet", back_populates="mentions")
     mentioned_user = relationship("User", back_populates="mentions_received")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -14,6 +14,26 @@ class Tweet(Base):
     reply_to_id = Column(Integer, ForeignKey("tweets.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Contadores desnormalizados (se mantienen con UPDATE x = x + 1, ver reconcile_counters)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    retweets_count = Column(Integer, nullable=False, default=0, server_default="0")
+    replies_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Árbol de respuestas materializado: raíz de la conversación, profundidad y
+    # camino de IDs de ancho fijo ("0000000001.0000000007"), que ordena en
+    # profundidad y permite pedir un subárbol con un LIKE 'camino.%'
+    root_id = Column(Integer, nullable=True)
+    depth = Column(Integer, nullable=False, default=0, server_default="0")
+    path = Column(String, nullable=True)
+    
+    # Índices compuestos para la paginación por cursor (created_at, id)
+    __table_args__ = (
+        Index("ix_tweets_created_at_id", "created_at", "id"),
+        Index("ix_tweets_author_id_created_at_id", "author_id", "created_at", "id"),
+        Index("ix_tweets_reply_to_id_created_at_id", "reply_to_id", "created_at", "id"),
+        Index("ix_tweets_root_id_path", "root_id", "path", postgresql_ops={"path": "text_pattern_ops"}),
+    )
+    
     # Relaciones
     author = relationship("User", back_populates="tweets")
     likes = relationship("Like", back_populates="tweet", cascade="all, delete-orphan")
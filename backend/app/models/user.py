@@ -16,6 +16,10 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Contadores desnormalizados (se mantienen en follow/unfollow, ver reconcile_follow_counts)
+    followers_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relaciones
     tweets = relationship("Tweet", back_populates="author")
     followers = relationship("Follow", foreign_keys="Follow.followed_id", back_populates="followed")
@@ -13,4 +13,19 @@ class NotificationInDB(BaseModel):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class Notification(BaseModel):
+    id: int
+    type: str
+    message: str
+    related_id: Optional[int] = None
+    related_username: Optional[str] = None
+    is_read: bool
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class UnreadCount(BaseModel):
+    count: int
@@ -1,9 +1,13 @@
 from pydantic import BaseModel
-from typing import List
-from app.schemas.tweet import TweetWithReplyTo
+from typing import List, Optional
+from app.schemas.tweet import ThreadNode, TweetOut
 
 class ThreadResponse(BaseModel):
     """Respuesta para un thread completo"""
-    main_tweet: TweetWithReplyTo
-    replies: List[TweetWithReplyTo]
-    total_replies: int
\ No newline at end of file
+    parent_chain: List[TweetOut]
+    main_tweet: TweetOut
+    replies: List[ThreadNode]
+    total_replies: int
+    total_subtree_replies: int
+    has_more_replies: bool
+    replies_cursor: Optional[str] = None
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, validator
 from datetime import datetime
 from typing import Optional
+from app.schemas.tweet import TweetOut
 from app.schemas.user import UserPublic
 
 class RetweetBase(BaseModel):
@@ -46,4 +47,14 @@ class TweetForRetweet(BaseModel):
         from_attributes = True
 
 # Actualizar forward reference
-RetweetWithTweet.model_rebuild()
\ No newline at end of file
+RetweetWithTweet.model_rebuild()
+
+# Item de GET /retweets/feed: un tweet o el retweet de un tweet, con el
+# cursor para pedir la página siguiente desde él
+class FeedItem(BaseModel):
+    type: str  # "tweet" o "retweet"
+    tweet: TweetOut
+    created_at: datetime
+    cursor: str
+    retweet_author: Optional[UserPublic] = None
+    retweet_comment: Optional[str] = None
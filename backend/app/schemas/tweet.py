@@ -1,5 +1,5 @@
-from pydantic import BaseModel, validator
-from typing import Optional, List
+from pydantic import BaseModel, TypeAdapter, validator
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 from app.schemas.user import UserPublic
 
@@ -62,6 +62,51 @@ class TweetSimple(BaseModel):
 class TweetWithThread(TweetWithReplyTo):
     replies: List['TweetWithReplyTo'] = []  # Respuestas a este tweet
 
+# Ingesta masiva: los items se validan uno por uno en el servicio, así uno
+# inválido se informa en "errors" sin rechazar todo el lote
+class TweetBulkCreate(BaseModel):
+    tweets: List[Dict[str, Any]]
+
+class TweetBulkError(BaseModel):
+    index: int
+    error: str
+
+class TweetBulkResult(BaseModel):
+    created: int
+    ids: List[Optional[int]]  # ID creado por item (None si falló)
+    errors: List[TweetBulkError]
+    elapsed_ms: float
+    tweets_per_second: float
+
+# Tweets hidratados (TweetService.hydrate_ids): el tweet respondido viaja
+# como un snippet con su autor
+class TweetReplySnippet(BaseModel):
+    id: int
+    content: str
+    author: UserPublic
+    created_at: datetime
+
+class TweetOut(Tweet):
+    reply_to: Optional[TweetReplySnippet] = None
+
+class ConversationTweet(TweetOut):
+    depth: int = 0
+
+class TweetBranch(BaseModel):
+    tweet: TweetOut
+    branch_replies: int
+
+# Nodo del árbol de GET /tweets/{id}/thread
+class ThreadNode(TweetOut):
+    nested_replies: List['ThreadNode'] = []
+    has_more_replies: bool = False
+    replies_cursor: Optional[str] = None
+
 # Resolver forward references
 TweetWithReplyTo.model_rebuild()
-TweetWithThread.model_rebuild()
\ No newline at end of file
+TweetWithThread.model_rebuild()
+ThreadNode.model_rebuild()
+# Validadores/serializadores compilados una vez (fuera de las rutas, que
+# compilan su response_model solas)
+tweet_adapter = TypeAdapter(TweetOut)
+tweet_list_adapter = TypeAdapter(List[TweetOut])
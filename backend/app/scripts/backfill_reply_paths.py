@@ -0,0 +1,100 @@
+"""
+Completar root_id, depth y path en tweets creados antes del árbol materializado.
+
+Avanza por niveles siguiendo reply_to_id: primero las raíces (sin padre),
+después las respuestas cuyo padre ya tiene camino, y así hasta que no quedan
+filas pendientes. Cada nivel se procesa en bloques de IDs con un UPDATE
+masivo por clave primaria y un commit por bloque, así que se puede cortar y
+volver a lanzar: solo toca filas con path NULL.
+
+Uso:
+    python -m app.scripts.backfill_reply_paths [--chunk-size 1000]
+"""
+import argparse
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session, aliased
+
+from app.db.session import SessionLocal
+# Registrar todos los modelos (relaciones por nombre), como hace main.py
+from app.models import user, tweet, follow, like, retweet, hashtag, mention, message, notification  # noqa: F401
+from app.models.tweet import Tweet
+from app.services.tweet import tweet_service
+
+
+def backfill_roots(db: Session, chunk_size: int) -> int:
+    total = 0
+    while True:
+        ids = [
+            row[0] for row in
+            db.query(Tweet.id)
+            .filter(Tweet.reply_to_id.is_(None), Tweet.path.is_(None))
+            .order_by(Tweet.id)
+            .limit(chunk_size)
+            .all()
+        ]
+        if not ids:
+            return total
+        db.execute(update(Tweet), [
+            {"id": tweet_id, "root_id": tweet_id, "depth": 0, "path": tweet_service.path_segment(tweet_id)}
+            for tweet_id in ids
+        ])
+        db.commit()
+        total += len(ids)
+
+
+def backfill_replies(db: Session, chunk_size: int) -> int:
+    """
+    Respuestas pendientes cuyo padre ya tiene camino. Cada bloque habilita
+    a los hijos del siguiente nivel, así que se repite hasta vaciar la cola.
+    """
+    parent = aliased(Tweet)
+    total = 0
+    while True:
+        rows = (
+            db.query(Tweet.id, parent.root_id, parent.depth, parent.path)
+            .join(parent, parent.id == Tweet.reply_to_id)
+            .filter(Tweet.path.is_(None), parent.path.isnot(None))
+            .order_by(Tweet.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return total
+        db.execute(update(Tweet), [
+            {
+                "id": tweet_id,
+                "root_id": root_id,
+                "depth": depth + 1,
+                "path": f"{path}.{tweet_service.path_segment(tweet_id)}",
+            }
+            for tweet_id, root_id, depth, path in rows
+        ])
+        db.commit()
+        total += len(rows)
+
+
+def backfill(db: Session, chunk_size: int = 1000) -> int:
+    roots = backfill_roots(db, chunk_size)
+    print(f"Raíces: {roots}")
+    replies = backfill_replies(db, chunk_size)
+    print(f"Respuestas: {replies}")
+    return roots + replies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de root_id/depth/path de tweets")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        total = backfill(db, chunk_size=args.chunk_size)
+    finally:
+        db.close()
+
+    print(f"Tweets actualizados: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Medir el costo de autenticar una request (get_current_user) con y sin el
+cache de usuarios por token.
+
+Cada iteración abre una sesión nueva, como una request: "sin cache" vacía
+el cache antes de cada llamada (decodificar el JWT + SELECT del usuario),
+"con cache" lo deja caliente. Usa la base de datos configurada y crea el
+usuario de prueba si no existe.
+
+Uso:
+    python -m app.scripts.benchmark_auth [--iterations 2000] [--username bench_auth]
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from app.core.dependencies import get_current_user
+from app.core.security import create_access_token
+from app.db.database import engine
+from app.db.session import SessionLocal
+# Registrar todos los modelos (relaciones por nombre), como hace main.py
+from app.models import user, tweet, follow, like, retweet, hashtag, mention, message, notification  # noqa: F401
+from app.schemas.user import UserCreate
+from app.services.user import user_service
+
+
+def run(token: str, iterations: int, warm: bool) -> dict:
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        user_service.principal_cache.clear()
+        elapsed = 0.0
+        for _ in range(iterations):
+            if not warm:
+                user_service.principal_cache.clear()
+            db = SessionLocal()
+            try:
+                start = time.perf_counter()
+                user = get_current_user(db=db, token=token)
+                user.id  # El endpoint siempre lee el usuario
+                elapsed += time.perf_counter() - start
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    return {
+        "us_per_request": elapsed / iterations * 1e6,
+        "queries_per_request": len(statements) / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de get_current_user")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--username", default="bench_auth")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if user_service.get_by_username(db, args.username) is None:
+            user_service.create(db, UserCreate(
+                username=args.username,
+                email=f"{args.username}@example.com",
+                password="benchmark"
+            ))
+    finally:
+        db.close()
+    token = create_access_token(args.username)
+
+    for label, warm in (("sin cache", False), ("con cache", True)):
+        result = run(token, args.iterations, warm)
+        print(
+            f"{label:10s} {result['us_per_request']:8.1f} us/request  "
+            f"{result['queries_per_request']:.2f} queries/request"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Throughput de la extracción de entidades sobre un corpus sintético de
+tweets (por defecto 1M):
+
+- dos re.findall sin precompilar (#(\\w+) y @(\\w+)), como hacían
+  extract_hashtags/extract_mentions: dos pasadas y sin límites;
+- app.core.entities.hashtags_and_mentions: una pasada (findall), sin
+  repetidos; es lo que usa la creación de tweets;
+- app.core.entities.extract_entities: una pasada, hashtags, menciones,
+  URLs y cashtags con posiciones.
+
+Los tweets mezclan texto con acentos y CJK, hashtags, menciones, URLs con
+ancla, emails y cashtags; se generan por bloques con semilla fija y solo
+se mide la extracción. También cuenta lo que las regex viejas encontraban
+de más (emails como menciones, anclas de URLs como hashtags).
+
+Uso:
+    python -m app.scripts.benchmark_entities [--tweets 1000000] [--chunk 10000]
+"""
+import argparse
+import random
+import re
+import time
+from typing import List
+
+from app.core.entities import HASHTAG, MENTION, extract_entities, hashtags_and_mentions
+
+WORDS = [
+    "hola", "mundo", "café", "mañana", "partido", "release", "deploy", "niño",
+    "東京", "ラーメン", "música", "the", "a", "de", "que", "por", "fin", "hoy",
+]
+TAGS = ["python", "FastAPI", "fútbol", "日本", "dev", "news", "ia", "tag2024"]
+USERS = ["alice", "bob", "carlos_99", "dana", "Eve"]
+
+
+def make_tweet(rng: random.Random) -> str:
+    parts = [rng.choice(WORDS) for _ in range(rng.randint(4, 14))]
+    for _ in range(rng.randint(0, 3)):
+        parts.insert(rng.randrange(len(parts) + 1), "#" + rng.choice(TAGS))
+    for _ in range(rng.randint(0, 2)):
+        parts.insert(rng.randrange(len(parts) + 1), "@" + rng.choice(USERS))
+    roll = rng.random()
+    if roll < 0.3:
+        parts.append(f"https://example.com/post/{rng.randint(1, 10 ** 6)}#comentarios")
+    elif roll < 0.4:
+        parts.append(f"escribime a {rng.choice(USERS).lower()}@mail.com")
+    elif roll < 0.5:
+        parts.append(f"${rng.choice(['AAPL', 'TSLA', 'BRK.A'])}")
+    return " ".join(parts)
+
+
+def old_extract(text: str):
+    hashtags = [tag.lower() for tag in re.findall(r'#(\w+)', text)]
+    mentions = [username.lower() for username in re.findall(r'@(\w+)', text)]
+    return hashtags, mentions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extracción de entidades")
+    parser.add_argument("--tweets", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    timings = {"old": 0.0, "single": 0.0, "new": 0.0}
+    entities = {"old": 0, "single": 0, "new": 0}
+    spurious = 0
+    total_chars = 0
+    done = 0
+    while done < args.tweets:
+        size = min(args.chunk, args.tweets - done)
+        chunk: List[str] = [make_tweet(rng) for _ in range(size)]
+        total_chars += sum(len(text) for text in chunk)
+
+        start = time.perf_counter()
+        old = [old_extract(text) for text in chunk]
+        timings["old"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        single = [hashtags_and_mentions(text) for text in chunk]
+        timings["single"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = [extract_entities(text) for text in chunk]
+        timings["new"] += time.perf_counter() - start
+
+        for (hashtags, mentions), (distinct_hashtags, distinct_mentions), found in zip(old, single, new):
+            entities["old"] += len(hashtags) + len(mentions)
+            entities["single"] += len(distinct_hashtags) + len(distinct_mentions)
+            entities["new"] += len(found)
+            kept = sum(1 for entity in found if entity.kind in (HASHTAG, MENTION))
+            spurious += len(hashtags) + len(mentions) - kept
+        done += size
+
+    print(f"{args.tweets} tweets, {total_chars / args.tweets:.0f} caracteres de promedio")
+    variants = (
+        ("2x re.findall (#, @)", "old"),
+        ("hashtags_and_mentions", "single"),
+        ("extract_entities", "new"),
+    )
+    for label, key in variants:
+        seconds = timings[key]
+        print(
+            f"  {label:<22} {args.tweets / seconds:11.0f} tweets/s"
+            f"  {total_chars / seconds / 1e6:7.1f} M caracteres/s"
+            f"  {entities[key]} entidades"
+        )
+    print(f"  hashtags/menciones de más con las regex viejas (emails, anclas): {spurious}")
+
+
+if __name__ == "__main__":
+    main()
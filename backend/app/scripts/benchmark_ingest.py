@@ -0,0 +1,96 @@
+"""
+Comparar la creación de tweets uno por uno (TweetService.create, lo que
+hace POST /tweets/) con la ingesta masiva (TweetService.bulk_create, lo que
+hace POST /tweets/bulk): tweets por segundo, statements y commits.
+
+Cada tweet lleva dos hashtags (uno compartido por todos) y una mención.
+Usa la base de datos configurada y crea los usuarios de prueba si no
+existen; los tweets creados quedan en la base.
+
+Uso:
+    python -m app.scripts.benchmark_ingest [--tweets 2000] [--username bench_ingest]
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from app.db.database import engine
+from app.db.session import SessionLocal
+# Registrar todos los modelos (relaciones por nombre), como hace main.py
+from app.models import user, tweet, follow, like, retweet, hashtag, mention, message, notification  # noqa: F401
+from app.schemas.tweet import TweetCreate
+from app.schemas.user import UserCreate
+from app.services.tweet import tweet_service
+from app.services.user import user_service
+
+
+def get_or_create_user(db, username: str):
+    user = user_service.get_by_username(db, username=username)
+    if user is None:
+        user = user_service.create(db, UserCreate(
+            username=username, email=f"{username}@example.com", password="benchmark"
+        ))
+    return user
+
+
+def run(label: str, ingest) -> dict:
+    counts = {"statements": 0, "commits": 0}
+
+    def count_statement(conn, cursor, statement, *args):
+        counts["statements"] += 1
+
+    def count_commit(conn):
+        counts["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    event.listen(engine, "commit", count_commit)
+    try:
+        start = time.perf_counter()
+        created = ingest()
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+        event.remove(engine, "commit", count_commit)
+
+    return {"label": label, "tweets": created, "seconds": elapsed, **counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta de tweets")
+    parser.add_argument("--tweets", type=int, default=2000)
+    parser.add_argument("--username", default="bench_ingest")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        author = get_or_create_user(db, args.username)
+        get_or_create_user(db, f"{args.username}_mentioned")
+        items = [
+            TweetCreate(content=f"Tweet {i} #bench #tag{i % 50} @{args.username}_mentioned")
+            for i in range(args.tweets)
+        ]
+
+        def one_by_one():
+            for tweet_in in items:
+                tweet_service.create(db, tweet_in, author_id=author.id)
+            return len(items)
+
+        def bulk():
+            return tweet_service.bulk_create(db, items, author_id=author.id)["created"]
+
+        results = [run("uno por uno (create)", one_by_one), run("masivo (bulk_create)", bulk)]
+    finally:
+        db.close()
+
+    print(f"{args.tweets} tweets por variante")
+    for result in results:
+        print(
+            f"  {result['label']:<22} {result['tweets'] / result['seconds']:9.1f} tweets/s"
+            f"  {result['statements'] / result['tweets']:6.2f} statements/tweet"
+            f"  {result['commits']} commits"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Índice de búsqueda embebido (InvertedIndex): tweets indexados por segundo,
+memoria, bytes por aparición, latencia de búsqueda y tiempo de escritura y
+carga del snapshot.
+
+El corpus es sintético: tweets de 4 a 30 palabras de un vocabulario con
+distribución Zipf, con fechas repartidas en `--hours` horas. No necesita
+base de datos.
+
+Chequeos (sale con código 1 si alguno falla):
+- los resultados (ids y puntajes) coinciden con un BM25 calculado por fuerza
+  bruta sobre los textos;
+- recorrer los resultados con el cursor (score, id) da la misma lista que
+  pedirlos de una vez;
+- los tweets borrados no aparecen y los editados se encuentran por el texto
+  nuevo y no por el viejo;
+- el índice cargado del snapshot da los mismos resultados.
+
+Uso:
+    python -m app.scripts.benchmark_search [--tweets 200000] [--vocabulary 50000]
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.core.inverted_index import BM25_B, BM25_K1, InvertedIndex, tokenize
+
+NOW = 1_760_000_000.0
+RECENCY_HOURS = 72.0
+
+QUERIES = {
+    "término raro": [(["w4000"], [])],
+    "término común": [(["w1"], [])],
+    "dos términos": [(["w3", "w40"], [])],
+    "or": [(["w20", "w21"], []), (["w300"], [])],
+    "exclusión": [(["w5"], [["w2"]])],
+}
+
+
+def make_corpus(tweets: int, vocabulary: int, hours: int, zipf: float, seed: int):
+    rng = random.Random(seed)
+    words = [f"w{rank}" for rank in range(vocabulary)]
+    weights = list(itertools.accumulate(1 / (rank + 1) ** zipf for rank in range(vocabulary)))
+    corpus = []
+    for tweet_id in range(1, tweets + 1):
+        text = " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(4, 30)))
+        corpus.append((tweet_id, text, NOW - rng.random() * hours * 3600))
+    return corpus
+
+
+def brute_force(docs, clauses, limit, dead=()):
+    """
+    Mismo puntaje que InvertedIndex.search, recorriendo todos los textos
+    (`dead`: textos borrados o reemplazados, que siguen contando en df)
+    """
+    average = sum(len(tokens) for tokens, _ in docs.values()) / len(docs)
+    df = {}
+    for tokens in itertools.chain((tokens for tokens, _ in docs.values()), dead):
+        for term in set(tokens):
+            df[term] = df.get(term, 0) + 1
+    ranked = []
+    for tweet_id, (tokens, created_at) in docs.items():
+        best = 0.0
+        for include, exclude in clauses:
+            if not all(term in tokens for term in include):
+                continue
+            if any(all(term in tokens for term in group) for group in exclude):
+                continue
+            score = 0.0
+            for term in dict.fromkeys(include):
+                idf = math.log(1.0 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                freq = tokens.count(term)
+                score += idf * freq * (BM25_K1 + 1.0) / (
+                    freq + BM25_K1 * (1.0 - BM25_B + BM25_B * len(tokens) / average)
+                )
+            best = max(best, score)
+        if best:
+            age = max(0.0, NOW - created_at) / 3600.0
+            ranked.append((best / (1.0 + age / RECENCY_HOURS), tweet_id))
+    return [(tweet_id, score) for score, tweet_id in sorted(ranked, reverse=True)[:limit]]
+
+
+def same(a, b) -> bool:
+    return [tweet_id for tweet_id, _ in a] == [tweet_id for tweet_id, _ in b] and all(
+        abs(x - y) < 1e-9 for (_, x), (_, y) in zip(a, b)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice de búsqueda embebido")
+    parser.add_argument("--tweets", type=int, default=200_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--hours", type=int, default=24 * 7)
+    parser.add_argument("--zipf", type=float, default=1.0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.tweets, args.vocabulary, args.hours, args.zipf, args.seed)
+    failures = []
+
+    def check(ok: bool, message: str):
+        print(f"  [{'ok' if ok else 'FALLA'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    def search(index, clauses, limit=args.limit, cursor=None):
+        return index.search(clauses, NOW, RECENCY_HOURS, limit, cursor)
+
+    def build():
+        index = InvertedIndex()
+        for tweet_id, text, created_at in corpus:
+            index.add(tweet_id, text, created_at)
+        return index
+
+    start = time.perf_counter()
+    index = build()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    kept = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    postings = sum(index.df)
+    posting_bytes = sum(len(data) for data in index.postings)
+    print(f"{len(corpus)} tweets, {len(index.terms)} términos, {postings} apariciones")
+    print(
+        f"  indexado: {len(corpus) / seconds:.0f} tweets/s, {memory / 1024 / 1024:.1f} MiB,"
+        f" {posting_bytes / postings:.2f} bytes por aparición"
+    )
+
+    for label, clauses in QUERIES.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            search(index, clauses)
+            timings.append(time.perf_counter() - start)
+        matches = len(search(index, clauses, limit=len(corpus)))
+        print(f"  {label:<14} {statistics.median(timings) * 1000:8.2f} ms  ({matches} resultados)")
+
+    print("Chequeos")
+    docs = {tweet_id: (tokenize(text), created_at) for tweet_id, text, created_at in corpus}
+    check(
+        all(same(search(index, clauses), brute_force(docs, clauses, args.limit)) for clauses in QUERIES.values()),
+        "mismos resultados que BM25 por fuerza bruta"
+    )
+
+    clauses = QUERIES["dos términos"]
+    full = search(index, clauses, limit=len(corpus))
+    paged, cursor = [], None
+    while True:
+        page = search(index, clauses, limit=7, cursor=cursor)
+        paged += page
+        if len(page) < 7:
+            break
+        cursor = (page[-1][1], page[-1][0])
+    check(paged == full, f"paginar con cursor == todo de una vez ({len(full)} resultados)")
+
+    top = [tweet_id for tweet_id, _ in search(index, QUERIES["término común"])]
+    dead = []
+    for tweet_id in top[:5]:
+        index.remove(tweet_id)
+        dead.append(docs.pop(tweet_id)[0])
+    edited = top[5]
+    index.add(edited, "zzeditado", docs[edited][1])
+    dead.append(docs[edited][0])
+    docs[edited] = (["zzeditado"], docs[edited][1])
+    after = search(index, QUERIES["término común"])
+    check(not set(top[:6]) & {tweet_id for tweet_id, _ in after}, "borrados y editados salen de los resultados")
+    check([tweet_id for tweet_id, _ in search(index, [(["zzeditado"], [])])] == [edited], "el editado se encuentra por el texto nuevo")
+    check(same(after, brute_force(docs, QUERIES["término común"], args.limit, dead)), "BM25 por fuerza bruta después de borrar y editar")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.idx")
+        start = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - start
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        loaded = InvertedIndex.load(path)
+        load_seconds = time.perf_counter() - start
+        print(f"  snapshot: {size / 1024 / 1024:.1f} MiB, escrito en {saved * 1000:.0f} ms, cargado en {load_seconds * 1000:.0f} ms")
+        check(
+            all(same(search(loaded, clauses), search(index, clauses)) for clauses in QUERIES.values()),
+            "el snapshot cargado da los mismos resultados"
+        )
+        loaded.add(len(corpus) + 1, "w4000 nuevo", NOW)
+        check(search(loaded, QUERIES["término raro"])[0][0] == len(corpus) + 1, "el snapshot cargado acepta tweets nuevos")
+        del loaded
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Medir cuánto cuesta convertir una página de tweets hidratados en el cuerpo
+JSON de la respuesta, con las variantes que tiene FastAPI:
+
+- jsonable_encoder + JSONResponse (ruta sin response_model);
+- response_model (validación/serialización de pydantic-core) + JSONResponse;
+- response_model + ORJSONResponse (la clase por defecto de la app);
+- TypeAdapter precompilado: validate_python + dump_json directo a bytes.
+
+La página es sintética (mismas claves y tipos que hydrate_ids, con
+reply_to en la mitad de los tweets), así que no necesita base de datos.
+
+Uso:
+    python -m app.scripts.benchmark_serialization [--page-size 100] [--iterations 500]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.schemas.tweet import TweetOut, tweet_list_adapter
+
+
+def make_page(page_size: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    page = []
+    for i in range(page_size):
+        author = {
+            "id": i % 7 + 1,
+            "username": f"user{i % 7}",
+            "full_name": f"Usuario {i % 7}",
+            "bio": "Escribo tweets de prueba para el benchmark",
+            "avatar_url": f"https://example.com/avatars/{i % 7}.png",
+            "followers_count": 1200 + i,
+            "following_count": 300,
+        }
+        tweet = {
+            "id": 10000 - i,
+            "content": f"Tweet número {i} con #hashtag y @mencion " + "x" * 120,
+            "image_url": None,
+            "author_id": author["id"],
+            "reply_to_id": 9000 - i if i % 2 else None,
+            "created_at": now - timedelta(minutes=i),
+            "author": author,
+            "likes_count": i * 3,
+            "retweets_count": i,
+            "replies_count": i % 5,
+            "is_liked_by_user": i % 3 == 0,
+            "is_retweeted_by_user": False,
+        }
+        if tweet["reply_to_id"]:
+            tweet["reply_to"] = {
+                "id": tweet["reply_to_id"],
+                "content": "El tweet original",
+                "author": dict(author),
+                "created_at": now - timedelta(hours=1),
+            }
+        page.append(tweet)
+    return page
+
+
+def measure(render, iterations: int) -> float:
+    render()  # Calentar
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de páginas de tweets")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    page = make_page(args.page_size)
+    field = create_response_field(name="Response_read_feed", type_=List[TweetOut])
+    loop = asyncio.new_event_loop()
+
+    def response_model(response_class):
+        content = loop.run_until_complete(serialize_response(field=field, response_content=page))
+        return response_class(content).body
+
+    variants = {
+        "jsonable_encoder + JSONResponse": lambda: JSONResponse(jsonable_encoder(page)).body,
+        "response_model + JSONResponse": lambda: response_model(JSONResponse),
+        "response_model + ORJSONResponse": lambda: response_model(ORJSONResponse),
+        "TypeAdapter.dump_json": lambda: tweet_list_adapter.dump_json(tweet_list_adapter.validate_python(page)),
+    }
+
+    print(f"Página de {args.page_size} tweets, {args.iterations} iteraciones")
+    baseline = None
+    for name, render in variants.items():
+        us = measure(render, args.iterations)
+        baseline = baseline or us
+        print(f"  {name:<34} {us:9.1f} us/página  ({baseline / us:4.1f}x)")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
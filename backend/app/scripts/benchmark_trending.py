@@ -0,0 +1,186 @@
+"""
+Contadores de trending exactos (RingTrendCounter) contra aproximados
+(SketchTrendCounter): usos por segundo, memoria, y los chequeos de error del
+Count-Min Sketch y del top-K.
+
+El flujo es sintético: usos de hashtags con distribución Zipf repartidos en
+`--minutes` minutos, más una ráfaga de un tag nuevo en los últimos minutos.
+No necesita base de datos.
+
+Chequeos (sale con código 1 si alguno falla):
+- cota del CountMinSketch sobre el flujo crudo: estimate >= real siempre y
+  estimate - real <= epsilon * N salvo en a lo sumo una fracción delta de
+  los tags (con margen);
+- el top-K de candidatos contiene los `--check-top` tags más usados;
+- merge: el flujo repartido en `--shards` SketchTrendCounter (uno por
+  worker) serializados y combinados da los mismos contadores y puntajes
+  que un solo sketch;
+- la ráfaga aparece primera en los dos contadores.
+
+Uso:
+    python -m app.scripts.benchmark_trending [--events 1000000] [--tags 100000]
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from app.core.sketch import CountMinSketch
+from app.core.trending import RingTrendCounter, SketchTrendCounter
+
+START_MINUTE = 28_000_000  # un minuto cualquiera (int(timestamp // 60))
+HALF_LIFE = 15
+MIN_COUNT = 2
+
+
+def make_stream(events: int, tags: int, minutes: int, zipf: float, seed: int):
+    """Lista de (minuto, tag): Zipf sobre `tags` tags, con una ráfaga de #burst al final"""
+    rng = random.Random(seed)
+    names = [f"tag{rank}" for rank in range(tags)]
+    weights = list(itertools.accumulate(1 / (rank + 1) ** zipf for rank in range(tags)))
+    chosen = rng.choices(names, cum_weights=weights, k=events)
+    per_minute = events / minutes
+    stream = [(START_MINUTE + int(i / per_minute), tag) for i, tag in enumerate(chosen)]
+    last = START_MINUTE + minutes - 1
+    # Ráfaga: un tag sin historia que en los últimos 10 minutos iguala al 3er tag más usado
+    burst = int(per_minute / sum(1 / (rank + 1) ** zipf for rank in range(tags)) / 3)
+    for minute in range(last - 9, last + 1):
+        stream += [(minute, "burst")] * burst
+    stream.sort(key=lambda event: event[0])
+    return stream
+
+
+def feed(counter, stream):
+    for minute, tag in stream:
+        counter.add(minute, {tag: 1})
+    return counter
+
+
+def measure(build, stream):
+    start = time.perf_counter()
+    counter = feed(build(), stream)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = feed(build(), stream)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return counter, seconds, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de contadores de trending")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=100_000)
+    parser.add_argument("--minutes", type=int, default=24 * 60)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--width", type=int, default=2048)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--top-k", type=int, default=200)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--check-top", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # La ventana es el período del flujo: la tasa de referencia es la real
+    window = args.minutes
+    stream = make_stream(args.events, args.tags, args.minutes, args.zipf, args.seed)
+    now = stream[-1][0]
+    failures = []
+
+    def check(ok: bool, message: str):
+        print(f"  [{'ok' if ok else 'FALLA'}] {message}")
+        if not ok:
+            failures.append(message)
+
+    exact, exact_seconds, exact_memory = measure(
+        lambda: RingTrendCounter(window, HALF_LIFE, MIN_COUNT), stream
+    )
+    sketch, sketch_seconds, sketch_memory = measure(
+        lambda: SketchTrendCounter(window, HALF_LIFE, MIN_COUNT, args.width, args.depth, args.top_k), stream
+    )
+    distinct = len(exact.totals)
+    print(f"{len(stream)} usos, {distinct} tags distintos, {args.minutes} minutos")
+    for label, seconds, memory in (
+        ("exacto (RingTrendCounter)", exact_seconds, exact_memory),
+        ("sketch (SketchTrendCounter)", sketch_seconds, sketch_memory),
+    ):
+        print(f"  {label:<28} {len(stream) / seconds:10.0f} usos/s  {memory / 1024 / 1024:7.2f} MiB")
+
+    exact_top = exact.top(now, 10)
+    sketch_top = sketch.top(now, 10)
+    print("  top 5 exacto:", [trend["tag"] for trend in exact_top[:5]])
+    print("  top 5 sketch:", [trend["tag"] for trend in sketch_top[:5]])
+    overlap = len({t["tag"] for t in exact_top} & {t["tag"] for t in sketch_top})
+    print(f"  coincidencia del top 10: {overlap}/10")
+
+    print("Chequeos")
+    check(exact_top[0]["tag"] == "burst" and sketch_top[0]["tag"] == "burst", "la ráfaga es la primera tendencia")
+
+    # Cota del Count-Min Sketch sobre los conteos crudos
+    true_counts = Counter(tag for _, tag in stream)
+    raw = CountMinSketch(args.width, args.depth)
+    for _, tag in stream:
+        raw.add(tag)
+    bound = raw.epsilon * raw.total
+    errors = [raw.estimate(tag) - count for tag, count in true_counts.items()]
+    over_bound = sum(1 for error in errors if error > bound) / len(errors)
+    print(
+        f"  epsilon={raw.epsilon:.5f} delta={raw.delta:.4f} cota={bound:.0f}"
+        f"  error medio={sum(errors) / len(errors):.1f} máximo={max(errors):.0f}"
+    )
+    check(min(errors) >= 0, "el sketch nunca subestima")
+    check(over_bound <= 2 * raw.delta, f"tags sobre la cota: {over_bound:.4%} (delta={raw.delta:.2%})")
+
+    top_candidates = set()
+    topk_sketch = SketchTrendCounter(window, HALF_LIFE, MIN_COUNT, args.width, args.depth, args.top_k)
+    topk_sketch.advance(START_MINUTE)
+    for _, tag in stream:
+        # Todo en el mismo minuto: sin decaimiento, el top-K es el de los conteos crudos
+        topk_sketch.add(START_MINUTE, {tag: 1})
+    top_candidates = set(topk_sketch.candidates.counts)
+    heavy = [tag for tag, _ in true_counts.most_common(args.check_top)]
+    recall = sum(1 for tag in heavy if tag in top_candidates) / len(heavy)
+    check(recall == 1.0, f"el top-{args.top_k} contiene los {args.check_top} tags más usados (recall {recall:.0%})")
+
+    # Merge entre "workers": cada shard serializado como lo publica SketchTrendingService
+    shards = [
+        SketchTrendCounter(window, HALF_LIFE, MIN_COUNT, args.width, args.depth, args.top_k)
+        for _ in range(args.shards)
+    ]
+    for i, (minute, tag) in enumerate(stream):
+        shards[i % args.shards].add(minute, {tag: 1})
+    start = time.perf_counter()
+    merged = SketchTrendCounter.from_bytes(shards[0].to_bytes())
+    for shard in shards[1:]:
+        merged.merge(SketchTrendCounter.from_bytes(shard.to_bytes()))
+    merge_ms = (time.perf_counter() - start) * 1000
+    merged.advance(sketch.minute)
+    scale = 2.0 ** ((merged.landmark - sketch.landmark) / HALF_LIFE)
+    drift = max(
+        abs(a * scale - b) / max(1.0, abs(b)) for a, b in zip(merged.recent.counts, sketch.recent.counts)
+    )
+    print(f"  merge de {args.shards} sketches serializados: {merge_ms:.1f} ms, {len(shards[0].to_bytes())} bytes c/u")
+    check(drift < 1e-9, f"merge == sketch único (diferencia relativa máxima {drift:.2e})")
+    # Los contadores combinados son exactos; los candidatos (unión de los top-K
+    # de cada worker) pueden diferir en los tags de puntaje parecido
+    merged_top = merged.top(now, 10)
+    single_scores = {trend["tag"]: trend["score"] for trend in sketch_top}
+    common = [trend for trend in merged_top if trend["tag"] in single_scores]
+    print(f"  coincidencia del top 10 combinado con el de un solo sketch: {len(common)}/10")
+    check(merged_top[0]["tag"] == "burst", "la ráfaga es la primera tendencia en el sketch combinado")
+    check(
+        all(abs(trend["score"] - single_scores[trend["tag"]]) < 1e-3 for trend in common),
+        "mismos puntajes combinados que con un solo sketch"
+    )
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
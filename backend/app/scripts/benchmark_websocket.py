@@ -0,0 +1,114 @@
+"""
+Latencia de un WebSocket (/ws/notifications, ping -> pong) mientras otros
+clientes escriben en paralelo (POST /tweets y /likes, endpoints async).
+
+Levanta la app con uvicorn en este proceso, contra la base de datos
+configurada, y mide el ida y vuelta del ping primero en reposo y después
+con --writers clientes escribiendo sin pausa. Si el event loop queda
+bloqueado por queries síncronas, el pong espera detrás de ellas.
+
+Uso:
+    python -m app.scripts.benchmark_websocket [--writers 20] [--duration 10] [--port 8765]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+from typing import List
+
+import httpx
+import uvicorn
+import websockets
+
+PASSWORD = "benchmark"
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config("app.main:app", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def register(client: httpx.AsyncClient, username: str) -> str:
+    await client.post("/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": PASSWORD
+    })
+    response = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+    return response.json()["access_token"]
+
+
+async def measure_pings(ws_url: str, duration: float, interval: float = 0.02) -> List[float]:
+    latencies = []
+    async with websockets.connect(ws_url) as ws:
+        await ws.recv()  # Bienvenida
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            await ws.send("ping")
+            await ws.recv()
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(interval)
+    return latencies
+
+
+async def writer(client: httpx.AsyncClient, token: str, stop: asyncio.Event, counter: List[int]):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        response = await client.post("/tweets/", json={"content": "benchmark"}, headers=headers)
+        if response.status_code == 200:
+            await client.post(f"/likes/{response.json()['id']}", headers=headers)
+            counter[0] += 2
+
+
+def summary(label: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    percentile = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+    print(
+        f"{label:10s} n={len(latencies):5d}  p50={statistics.median(latencies):7.2f} ms  "
+        f"p95={percentile(0.95):7.2f} ms  p99={percentile(0.99):7.2f} ms  max={latencies[-1]:7.2f} ms"
+    )
+
+
+async def run(port: int, writers: int, duration: float):
+    base_url = f"http://127.0.0.1:{port}/api/v1"
+    prefix = uuid.uuid4().hex[:6]
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        reader_token = await register(client, f"ws_{prefix}")
+        tokens = [await register(client, f"w{i}_{prefix}") for i in range(writers)]
+        ws_url = f"ws://127.0.0.1:{port}/api/v1/ws/notifications?token={reader_token}"
+
+        summary("reposo", await measure_pings(ws_url, duration))
+
+        stop = asyncio.Event()
+        counter = [0]
+        tasks = [asyncio.create_task(writer(client, token, stop, counter)) for token in tokens]
+        await asyncio.sleep(0.5)  # Que arranquen las escrituras
+        latencies = await measure_pings(ws_url, duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+        summary("escrituras", latencies)
+        print(f"escrituras/s: {counter[0] / (duration + 0.5):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de WebSocket con escrituras concurrentes")
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    try:
+        asyncio.run(run(args.port, args.writers, args.duration))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Reconstruir desde la base el snapshot del índice de búsqueda embebido
+(SEARCH_BACKEND=embedded, ver EmbeddedSearchBackend).
+
+El índice nuevo no tiene los documentos muertos que dejan las ediciones y
+los borrados. Los workers lo toman al reiniciar y aplican los cambios del
+feed (SEARCH_CHANGES_BACKEND) publicados después de empezar la lectura; se
+puede correr con la aplicación andando (el snapshot se reemplaza de forma
+atómica).
+
+Uso:
+    python -m app.scripts.build_search_index [--path /var/lib/twitter/search.idx]
+"""
+import argparse
+import time
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+# Registrar todos los modelos (relaciones por nombre), como hace main.py
+from app.models import user, tweet, follow, like, retweet, hashtag, mention, message, notification  # noqa: F401
+from app.core.search_changes import create_search_change_feed
+from app.services.search import EmbeddedSearchBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el snapshot del índice de búsqueda")
+    parser.add_argument("--path", default=settings.search_snapshot_path)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("--path o SEARCH_SNAPSHOT_PATH es obligatorio")
+
+    backend = EmbeddedSearchBackend(args.path, create_search_change_feed())
+    # Lo publicado antes de leer ya está en la base
+    backend.index.changes_position = backend.changes.position()
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        read = backend.sync(db)
+    finally:
+        db.close()
+    indexed = time.perf_counter()
+    backend.save_snapshot()
+    saved = time.perf_counter()
+
+    index = backend.index
+    print(
+        f"Tweets indexados: {read} ({len(index.terms)} términos) en {indexed - start:.1f} s;"
+        f" snapshot {args.path} escrito en {saved - indexed:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Recalcular los contadores desnormalizados de tweets (likes, retweets, replies).
+
+Recorre la tabla tweets por bloques de IDs, compara los contadores guardados
+con los reales (queries agrupadas por tweet_id) e informa el drift. Sin
+--dry-run corrige solo las filas con drift, con un UPDATE que recalcula el
+valor con una subquery en la misma sentencia, para no pisar likes/retweets
+concurrentes con un valor leído antes.
+
+Uso:
+    python -m app.scripts.reconcile_counters [--chunk-size 1000] [--dry-run]
+"""
+import argparse
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+# Registrar todos los modelos (relaciones por nombre), como hace main.py
+from app.models import user, tweet, follow, like, retweet, hashtag, mention, message, notification  # noqa: F401
+from app.models.like import Like
+from app.models.retweet import Retweet
+from app.models.tweet import Tweet
+from app.services.like import like_service
+from app.services.retweet import retweet_service
+from app.services.tweet import tweet_service
+
+COUNTERS = ("likes_count", "retweets_count", "replies_count")
+
+
+def _recount_expressions() -> Dict[str, object]:
+    """Subqueries correlacionadas que calculan cada contador real"""
+    replies = Tweet.__table__.alias("replies")
+    return {
+        "likes_count": select(func.count(Like.id)).where(Like.tweet_id == Tweet.id).scalar_subquery(),
+        "retweets_count": select(func.count(Retweet.id)).where(Retweet.tweet_id == Tweet.id).scalar_subquery(),
+        "replies_count": select(func.count(replies.c.id)).where(replies.c.reply_to_id == Tweet.id).scalar_subquery(),
+    }
+
+
+def reconcile_chunk(db: Session, rows: List[tuple], dry_run: bool = False) -> Dict[str, int]:
+    """Comparar un bloque de (id, likes, retweets, replies) con los valores reales"""
+    tweet_ids = [row[0] for row in rows]
+    actual = {
+        "likes_count": like_service.get_likes_counts(db, tweet_ids),
+        "retweets_count": retweet_service.get_retweets_counts(db, tweet_ids),
+        "replies_count": tweet_service.get_replies_counts(db, tweet_ids),
+    }
+
+    drift = {counter: 0 for counter in COUNTERS}
+    drifted_ids = set()
+    for row in rows:
+        tweet_id = row[0]
+        for counter, stored in zip(COUNTERS, row[1:]):
+            real = actual[counter].get(tweet_id, 0)
+            if stored != real:
+                drift[counter] += 1
+                drifted_ids.add(tweet_id)
+                print(f"  tweet {tweet_id}: {counter} {stored} -> {real}")
+
+    if drifted_ids and not dry_run:
+        db.query(Tweet).filter(Tweet.id.in_(drifted_ids)).update(
+            _recount_expressions(), synchronize_session=False
+        )
+        db.commit()
+        tweet_service.invalidate(None, drifted_ids)
+
+    drift["tweets"] = len(drifted_ids)
+    return drift
+
+
+def reconcile(db: Session, chunk_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    totals = {counter: 0 for counter in COUNTERS}
+    totals.update({"tweets": 0, "scanned": 0})
+    last_id = 0
+
+    while True:
+        rows = (
+            db.query(Tweet.id, Tweet.likes_count, Tweet.retweets_count, Tweet.replies_count)
+            .filter(Tweet.id > last_id)
+            .order_by(Tweet.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        drift = reconcile_chunk(db, rows, dry_run=dry_run)
+        for key, value in drift.items():
+            totals[key] += value
+        totals["scanned"] += len(rows)
+        last_id = rows[-1][0]
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliar contadores de tweets")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Solo informar el drift, sin corregir")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        totals = reconcile(db, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    action = "detectados" if args.dry_run else "corregidos"
+    print(
+        f"Tweets revisados: {totals['scanned']}, con drift ({action}): {totals['tweets']} "
+        f"[likes: {totals['likes_count']}, retweets: {totals['retweets_count']}, "
+        f"replies: {totals['replies_count']}]"
+    )
+
+
+if __name__ == "__main__":
+    main()
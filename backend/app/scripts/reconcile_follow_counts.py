@@ -0,0 +1,128 @@
+"""
+Recalcular los contadores desnormalizados de usuarios (followers, following).
+
+Sirve de backfill (las columnas arrancan en 0 en una base existente) y de
+reparación. Recorre la tabla users por bloques de IDs, compara los
+contadores guardados con los reales (queries agrupadas sobre follows) e
+informa el drift. Sin --dry-run corrige solo las filas con drift, con un
+UPDATE que recalcula el valor con una subquery en la misma sentencia, para
+no pisar follows concurrentes con un valor leído antes.
+
+Uso:
+    python -m app.scripts.reconcile_follow_counts [--chunk-size 1000] [--dry-run]
+"""
+import argparse
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+# Registrar todos los modelos (relaciones por nombre), como hace main.py
+from app.models import user, tweet, follow, like, retweet, hashtag, mention, message, notification  # noqa: F401
+from app.models.follow import Follow
+from app.models.user import User
+from app.services.tweet import tweet_service
+from app.services.user import user_service
+
+# contador -> columna de follows que lo agrupa
+COUNTERS = {
+    "followers_count": Follow.followed_id,
+    "following_count": Follow.follower_id,
+}
+
+
+def _recount_expressions() -> Dict[str, object]:
+    """Subqueries correlacionadas que calculan cada contador real"""
+    return {
+        counter: select(func.count(Follow.id)).where(column == User.id).scalar_subquery()
+        for counter, column in COUNTERS.items()
+    }
+
+
+def _actual_counts(db: Session, user_ids: List[int]) -> Dict[str, Dict[int, int]]:
+    return {
+        counter: dict(
+            db.query(column, func.count(Follow.id))
+            .filter(column.in_(user_ids))
+            .group_by(column)
+            .all()
+        )
+        for counter, column in COUNTERS.items()
+    }
+
+
+def reconcile_chunk(db: Session, rows: List[tuple], dry_run: bool = False) -> Dict[str, int]:
+    """Comparar un bloque de (id, followers, following) con los valores reales"""
+    actual = _actual_counts(db, [row[0] for row in rows])
+
+    drift = {counter: 0 for counter in COUNTERS}
+    drifted_ids = set()
+    for row in rows:
+        user_id = row[0]
+        for counter, stored in zip(COUNTERS, row[1:]):
+            real = actual[counter].get(user_id, 0)
+            if stored != real:
+                drift[counter] += 1
+                drifted_ids.add(user_id)
+                print(f"  user {user_id}: {counter} {stored} -> {real}")
+
+    if drifted_ids and not dry_run:
+        db.query(User).filter(User.id.in_(drifted_ids)).update(
+            _recount_expressions(), synchronize_session=False
+        )
+        db.commit()
+        for user_id in drifted_ids:
+            tweet_service.invalidate_user(user_id)
+            user_service.invalidate_principal(user_id)
+
+    drift["users"] = len(drifted_ids)
+    return drift
+
+
+def reconcile(db: Session, chunk_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    totals = {counter: 0 for counter in COUNTERS}
+    totals.update({"users": 0, "scanned": 0})
+    last_id = 0
+
+    while True:
+        rows = (
+            db.query(User.id, User.followers_count, User.following_count)
+            .filter(User.id > last_id)
+            .order_by(User.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            break
+
+        drift = reconcile_chunk(db, rows, dry_run=dry_run)
+        for key, value in drift.items():
+            totals[key] += value
+        totals["scanned"] += len(rows)
+        last_id = rows[-1][0]
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliar contadores de seguidores")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Solo informar el drift, sin corregir")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        totals = reconcile(db, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    action = "detectados" if args.dry_run else "corregidos"
+    print(
+        f"Usuarios revisados: {totals['scanned']}, con drift ({action}): {totals['users']} "
+        f"[followers: {totals['followers_count']}, following: {totals['following_count']}]"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import zlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List
+
+import orjson
+from sqlalchemy import case, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.like import Like
+from app.models.message import Conversation, Message
+from app.models.retweet import Retweet
+from app.models.tweet import Tweet
+from app.models.user import User
+
+
+class ExportService:
+    """
+    Exportación del historial de un usuario como NDJSON: una línea por
+    registro ({"type": "tweet", ...}), precedida por una línea "user".
+
+    Cada sección es un SELECT de columnas (sin ORM ni hidratación) recorrido
+    con yield_per: en PostgreSQL usa un cursor del lado del servidor, así
+    que la memoria depende del tamaño del lote y no del historial. Se emite
+    un bloque de bytes por lote.
+    """
+
+    SECTIONS = ("tweets", "retweets", "likes", "messages")
+    # Lo que se puede exportar de otro usuario (los likes y DMs son privados)
+    PUBLIC_SECTIONS = ("tweets", "retweets")
+    BATCH_SIZE = 500
+
+    def _tweets_query(self, user_id: int):
+        return (
+            select(
+                Tweet.id, Tweet.content, Tweet.image_url, Tweet.reply_to_id, Tweet.created_at,
+                Tweet.likes_count, Tweet.retweets_count, Tweet.replies_count
+            )
+            .where(Tweet.author_id == user_id)
+            .order_by(Tweet.id)
+        )
+
+    def _retweets_query(self, user_id: int):
+        return (
+            select(Retweet.id, Retweet.tweet_id, Retweet.comment, Retweet.created_at)
+            .where(Retweet.user_id == user_id)
+            .order_by(Retweet.id)
+        )
+
+    def _likes_query(self, user_id: int):
+        return (
+            select(Like.tweet_id, Like.created_at)
+            .where(Like.user_id == user_id)
+            .order_by(Like.id)
+        )
+
+    def _messages_query(self, user_id: int):
+        other = aliased(User)
+        other_id = case((Conversation.user1_id == user_id, Conversation.user2_id), else_=Conversation.user1_id)
+        return (
+            select(
+                Message.id, Message.conversation_id, other.username.label("with_username"),
+                Message.sender_id, Message.content, Message.is_read, Message.created_at
+            )
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .join(other, other.id == other_id)
+            .where(or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id))
+            .order_by(Message.id)
+        )
+
+    def iter_ndjson(self, db: Session, user: User, sections: Iterable[str]) -> Iterator[bytes]:
+        """Bloques NDJSON del historial de `user` (una línea por registro)"""
+        yield orjson.dumps({
+            "type": "user",
+            "id": user.id,
+            "username": user.username,
+            "full_name": user.full_name,
+            "bio": user.bio,
+            "created_at": user.created_at,
+            "exported_at": datetime.now(timezone.utc),
+        }) + b"\n"
+
+        for section in sections:
+            record_type = section[:-1]  # "tweets" -> "tweet"
+            statement = getattr(self, f"_{section}_query")(user.id)
+            result = db.execute(statement.execution_options(yield_per=self.BATCH_SIZE))
+            for rows in result.partitions():
+                yield b"".join(
+                    orjson.dumps({"type": record_type, **row._mapping}) + b"\n"
+                    for row in rows
+                )
+
+    def stream_archive(self, user_id: int, sections: List[str]) -> Iterator[bytes]:
+        """
+        Como iter_ndjson, con su propia sesión: el cuerpo se genera después de
+        que el endpoint devuelve, cuando la sesión de la request ya puede
+        estar cerrada. Lee de una réplica salvo que el usuario acabe de
+        escribir (read-your-writes).
+        """
+        from app.db.read_your_writes import recent_writes
+        from app.db.session import SessionLocal, create_replica_session
+
+        db = SessionLocal() if recent_writes.is_recent(user_id) else create_replica_session()
+        try:
+            user = db.get(User, user_id)
+            if user is not None:
+                yield from self.iter_ndjson(db, user, sections)
+        finally:
+            db.close()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprimir en gzip a medida que llegan los bloques (sin juntar el cuerpo)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+export_service = ExportService()
@@ -1,95 +1,99 @@
-import re
-from typing import List
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.models.hashtag import Hashtag
-from app.models.tweet import Tweet
+from app.core.entities import HASHTAG, MENTION, entity_values, hashtags_and_mentions
+from app.db.upsert import dialect_insert
+from app.models.hashtag import Hashtag, tweet_hashtags
+from app.services.trending import trending_service
 
 class HashtagService:
+    # La extracción vive en app.core.entities (una sola pasada, con límites
+    # correctos); estos métodos la exponen para quien ya usa el servicio
+    
     def extract_hashtags(self, text: str) -> List[str]:
         """Extraer hashtags de un texto"""
-        # Regex para encontrar hashtags
-        hashtag_pattern = r'#(\w+)'
-        hashtags = re.findall(hashtag_pattern, text)
-        return [tag.lower() for tag in hashtags]
+        return entity_values(text)[HASHTAG]
     
     def extract_mentions(self, text: str) -> List[str]:
         """Extraer menciones (@username) de un texto"""
-        mention_pattern = r'@(\w+)'
-        mentions = re.findall(mention_pattern, text)
-        return [username.lower() for username in mentions]
+        return entity_values(text)[MENTION]
     
-    def get_or_create_hashtag(self, db: Session, tag: str) -> Hashtag:
-        """Obtener o crear un hashtag"""
-        tag = tag.lower()
-        hashtag = db.query(Hashtag).filter(Hashtag.tag == tag).first()
-        
-        if not hashtag:
-            hashtag = Hashtag(tag=tag, count=1)
-            db.add(hashtag)
-            db.commit()
-            db.refresh(hashtag)
-        else:
-            hashtag.count += 1
-            db.add(hashtag)
-            db.commit()
-        
-        return hashtag
+    def extract_entities(self, text: str) -> Tuple[List[str], List[str]]:
+        """Hashtags y menciones de un texto, sin repetidos y en orden de aparición"""
+        return hashtags_and_mentions(text)
     
-    def process_tweet_hashtags(self, db: Session, tweet: Tweet, content: str):
-        """Procesar y asociar hashtags a un tweet"""
-        hashtags = self.extract_hashtags(content)
+    def process_tweets(self, db: Session, tweets: Iterable[Tuple[int, int, str]]):
+        """
+        Hashtags y menciones de tweets nuevos (tweet_id, author_id, content)
+        dentro de la transacción del llamador (sin commit): un upsert de
+        hashtags, un INSERT de asociaciones y uno de menciones para todos.
+        """
+        tag_counts: Dict[str, int] = {}
+        tweet_tags = []
+        mentions = []
+        for tweet_id, author_id, content in tweets:
+            hashtags, usernames = self.extract_entities(content)
+            for tag in hashtags:
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+            tweet_tags += [(tweet_id, tag) for tag in hashtags]
+            mentions += [(tweet_id, author_id, username) for username in usernames]
         
-        for tag in hashtags:
-            hashtag = self.get_or_create_hashtag(db, tag)
-            if hashtag not in tweet.hashtags:
-                tweet.hashtags.append(hashtag)
-        
-        db.commit()
+        trending_service.track(db, tag_counts)
+        tag_ids = self.upsert_hashtags(db, tag_counts)
+        self.link_hashtags(db, [(tweet_id, tag_ids[tag]) for tweet_id, tag in tweet_tags])
+        self.add_mentions(db, mentions)
     
-    def process_tweet_mentions(self, db: Session, tweet: Tweet, content: str):
-        """Procesar y crear menciones en un tweet"""
-        from app.models.mention import Mention
-        from app.models.user import User
-        
-        usernames = self.extract_mentions(content)
-        
-        for username in usernames:
-            user = db.query(User).filter(User.username == username).first()
-            if user and user.id != tweet.author_id:
-                # Verificar que no exista ya la mención
-                existing = db.query(Mention).filter(
-                    Mention.tweet_id == tweet.id,
-                    Mention.mentioned_user_id == user.id
-                ).first()
-                
-                if not existing:
-                    mention = Mention(
-                        tweet_id=tweet.id,
-                        mentioned_user_id=user.id
-                    )
-                    db.add(mention)
-        
-        db.commit()
+    def upsert_hashtags(self, db: Session, counts: Dict[str, int]) -> Dict[str, int]:
+        """
+        Crear o sumar usos a varios hashtags con un INSERT ... ON CONFLICT DO
+        UPDATE (sin commit). Devuelve tag -> id. Los tags van ordenados para
+        que dos transacciones concurrentes tomen los locks en el mismo orden.
+        """
+        if not counts:
+            return {}
+        statement = dialect_insert(Hashtag.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Hashtag.tag],
+            set_={"count": Hashtag.count + statement.excluded.count, "updated_at": func.now()}
+        ).returning(Hashtag.id, Hashtag.tag)
+        rows = db.execute(statement, [{"tag": tag, "count": counts[tag]} for tag in sorted(counts)])
+        return {tag: hashtag_id for hashtag_id, tag in rows}
     
-    def get_trending(self, db: Session, limit: int = 10) -> List[dict]:
-        """Obtener hashtags trending"""
-        from datetime import datetime, timedelta
+    def link_hashtags(self, db: Session, pairs: Iterable[Tuple[int, int]]):
+        """Insertar filas (tweet_id, hashtag_id) de tweet_hashtags en un solo INSERT (sin commit)"""
+        rows = [{"tweet_id": tweet_id, "hashtag_id": hashtag_id} for tweet_id, hashtag_id in pairs]
+        if rows:
+            statement = dialect_insert(tweet_hashtags).on_conflict_do_nothing()
+            db.execute(statement, rows)
+    
+    def add_mentions(self, db: Session, mentions: Iterable[Tuple[int, int, str]]):
+        """
+        Crear menciones a partir de (tweet_id, author_id, username), sin
+        commit: los usernames se resuelven juntos (cache + una query IN), los
+        repetidos se descartan en memoria y las filas van en un solo INSERT
+        ... ON CONFLICT DO NOTHING (unique_mention). Se ignoran los usuarios
+        que no existen y las menciones al propio autor.
+        """
+        from app.models.mention import Mention
+        from app.services.user import user_service
         
-        # Hashtags más usados en las últimas 24 horas
-        hashtags = (
-            db.query(Hashtag)
-            .order_by(Hashtag.count.desc())
-            .limit(limit)
-            .all()
-        )
+        mentions = list(mentions)
+        if not mentions:
+            return
+        user_ids = user_service.get_ids_by_usernames(db, {username for _, _, username in mentions})
         
-        return [
-            {
-                "tag": hashtag.tag,
-                "count": hashtag.count,
-                "tweets_count": len(hashtag.tweets)
-            }
-            for hashtag in hashtags
-        ]
+        rows = []
+        seen = set()
+        for tweet_id, author_id, username in mentions:
+            user_id = user_ids.get(username)
+            if user_id is None or user_id == author_id or (tweet_id, user_id) in seen:
+                continue
+            seen.add((tweet_id, user_id))
+            rows.append({"tweet_id": tweet_id, "mentioned_user_id": user_id})
+        if rows:
+            statement = dialect_insert(Mention.__table__).on_conflict_do_nothing(
+                index_elements=["tweet_id", "mentioned_user_id"]
+            )
+            db.execute(statement, rows)
 
 hashtag_service = HashtagService()
\ No newline at end of file
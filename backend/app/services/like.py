@@ -1,9 +1,11 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from sqlalchemy import and_, func, select
 from app.models.like import Like
 from app.models.tweet import Tweet
 from app.models.user import User
+from app.services.tweet import tweet_service
 
 class LikeService:
     def like_tweet(self, db: Session, user_id: int, tweet_id: int) -> Optional[Like]:
@@ -23,10 +25,30 @@ class LikeService:
         # Crear el like
         like = Like(user_id=user_id, tweet_id=tweet_id)
         db.add(like)
+        tweet_service.increment_counter(db, tweet_id, "likes_count")
         db.commit()
         db.refresh(like)
         return like
     
+    async def like_tweet_async(self, db: AsyncSession, user_id: int, tweet_id: int) -> Optional[Like]:
+        """Como like_tweet, sobre una AsyncSession (no bloquea el event loop)"""
+        tweet_exists = await db.scalar(select(Tweet.id).where(Tweet.id == tweet_id))
+        if not tweet_exists:
+            return None
+        
+        existing_like = await db.scalar(
+            select(Like.id).where(and_(Like.user_id == user_id, Like.tweet_id == tweet_id))
+        )
+        if existing_like:
+            return None  # Ya existe el like
+        
+        like = Like(user_id=user_id, tweet_id=tweet_id)
+        db.add(like)
+        await db.run_sync(tweet_service.increment_counter, tweet_id, "likes_count")
+        await db.commit()
+        await db.refresh(like)
+        return like
+    
     def unlike_tweet(self, db: Session, user_id: int, tweet_id: int) -> bool:
         like = db.query(Like).filter(
             and_(Like.user_id == user_id, Like.tweet_id == tweet_id)
@@ -36,6 +58,7 @@ class LikeService:
             return False
         
         db.delete(like)
+        tweet_service.increment_counter(db, tweet_id, "likes_count", -1)
         db.commit()
         return True
     
@@ -67,5 +90,26 @@ class LikeService:
             and_(Like.user_id == user_id, Like.tweet_id == tweet_id)
         ).first()
         return like is not None
+    
+    def get_likes_counts(self, db: Session, tweet_ids: List[int]) -> Dict[int, int]:
+        """Contar likes de varios tweets en una sola query"""
+        if not tweet_ids:
+            return {}
+        rows = (
+            db.query(Like.tweet_id, func.count(Like.id))
+            .filter(Like.tweet_id.in_(tweet_ids))
+            .group_by(Like.tweet_id)
+            .all()
+        )
+        return dict(rows)
+    
+    def get_liked_tweet_ids(self, db: Session, tweet_ids: List[int], user_id: int) -> Set[int]:
+        """IDs de los tweets (de la lista) que el usuario likeó"""
+        if not tweet_ids:
+            return set()
+        rows = db.query(Like.tweet_id).filter(
+            and_(Like.user_id == user_id, Like.tweet_id.in_(tweet_ids))
+        ).all()
+        return {row[0] for row in rows}
 
 like_service = LikeService()
\ No newline at end of file
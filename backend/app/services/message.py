@@ -1,6 +1,8 @@
 from typing import List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, and_
+from app.core.version_store import version_store
 from app.models.message import Message, Conversation
 from app.models.user import User
 from app.schemas.message import MessageCreate
@@ -27,6 +29,7 @@ class MessageService:
             db.add(conversation)
             db.commit()
             db.refresh(conversation)
+            version_store.bump_many([("conversations", user1_id), ("conversations", user2_id)])
         
         return conversation
     
@@ -52,9 +55,14 @@ class MessageService:
         db.add(message)
         db.commit()
         db.refresh(message)
+        version_store.bump_many([("conversations", sender_id), ("conversations", receiver.id)])
         
         return message
     
+    async def send_message_async(self, db: AsyncSession, sender_id: int, receiver_username: str, content: str) -> Optional[Message]:
+        """send_message sobre una AsyncSession (mismo código, sin bloquear el event loop)"""
+        return await db.run_sync(self.send_message, sender_id, receiver_username, content)
+    
     def get_conversations(self, db: Session, user_id: int) -> List[Tuple[Conversation, User, Optional[Message], int]]:
         """Obtener todas las conversaciones de un usuario con info del último mensaje"""
         conversations = db.query(Conversation).filter(
@@ -137,7 +145,7 @@ class MessageService:
             return
         
         # Marcar mensajes del otro usuario como leídos
-        db.query(Message).filter(
+        updated = db.query(Message).filter(
             and_(
                 Message.conversation_id == conversation.id,
                 Message.sender_id == other_user.id,
@@ -146,5 +154,7 @@ class MessageService:
         ).update({"is_read": True})
         
         db.commit()
+        if updated:
+            version_store.bump(("conversations", user_id))
 
 message_service = MessageService()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import List
 from sqlalchemy.orm import Session
+from app.core.version_store import version_store
 from app.models.notification import Notification as NotificationModel
 
 class NotificationService:
@@ -23,6 +24,7 @@ class NotificationService:
         db.add(notification)
         db.commit()
         db.refresh(notification)
+        version_store.bump(("notifications", user_id))
         return notification
     
     def get_user_notifications(
@@ -55,6 +57,7 @@ class NotificationService:
         if notification:
             notification.is_read = True
             db.commit()
+            version_store.bump(("notifications", user_id))
             return True
         return False
     
@@ -65,6 +68,7 @@ class NotificationService:
             NotificationModel.is_read == False
         ).update({"is_read": True})
         db.commit()
+        version_store.bump(("notifications", user_id))
     
     def get_unread_count(self, db: Session, user_id: int) -> int:
         """Contar notificaciones no leídas"""
@@ -1,6 +1,7 @@
 from typing import Optional
 from sqlalchemy.orm import Session
 from app.core.websocket_manager import manager
+from app.schemas.tweet import tweet_adapter
 from datetime import datetime
 
 class NotificationServiceWs:
@@ -8,7 +9,7 @@ class NotificationServiceWs:
         """Notificar a los seguidores sobre un nuevo tweet"""
         message = {
             "type": "new_tweet",
-            "data": tweet_data,
+            "data": tweet_adapter.dump_python(tweet_data, mode="json"),
             "timestamp": datetime.utcnow().isoformat()
         }
         await manager.send_to_users(message, follower_ids)
@@ -1,9 +1,11 @@
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, literal, select, tuple_, union_all
+from app.core.pagination import Cursor, encode_cursor
 from app.models.retweet import Retweet
 from app.models.tweet import Tweet
 from app.models.user import User
+from app.services.tweet import tweet_service
 
 class RetweetService:
     def retweet(self, db: Session, user_id: int, tweet_id: int, comment: Optional[str] = None) -> Optional[Retweet]:
@@ -27,6 +29,7 @@ class RetweetService:
         # Crear el retweet
         retweet = Retweet(user_id=user_id, tweet_id=tweet_id, comment=comment)
         db.add(retweet)
+        tweet_service.increment_counter(db, tweet_id, "retweets_count")
         db.commit()
         db.refresh(retweet)
         return retweet
@@ -40,6 +43,7 @@ class RetweetService:
             return False
         
         db.delete(retweet)
+        tweet_service.increment_counter(db, tweet_id, "retweets_count", -1)
         db.commit()
         return True
     
@@ -75,75 +79,138 @@ class RetweetService:
         ).first()
         return retweet is not None
     
-    def get_feed_with_retweets(self, db: Session, user_id: int, skip: int = 0, limit: int = 20) -> List[dict]:
+    def get_retweets_counts(self, db: Session, tweet_ids: List[int]) -> Dict[int, int]:
+        """Contar retweets de varios tweets en una sola query"""
+        if not tweet_ids:
+            return {}
+        rows = (
+            db.query(Retweet.tweet_id, func.count(Retweet.id))
+            .filter(Retweet.tweet_id.in_(tweet_ids))
+            .group_by(Retweet.tweet_id)
+            .all()
+        )
+        return dict(rows)
+    
+    def get_retweeted_tweet_ids(self, db: Session, tweet_ids: List[int], user_id: int) -> Set[int]:
+        """IDs de los tweets (de la lista) que el usuario retweeteó"""
+        if not tweet_ids:
+            return set()
+        rows = db.query(Retweet.tweet_id).filter(
+            and_(Retweet.user_id == user_id, Retweet.tweet_id.in_(tweet_ids))
+        ).all()
+        return {row[0] for row in rows}
+    
+    def get_feed_with_retweets(self, db: Session, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[dict]:
         """
         Obtener un feed que mezcle tweets originales y retweets
         Retorna una lista de diccionarios con la información necesaria para el frontend
+
+        La mezcla se hace en la base de datos con UNION ALL: cada rama ordena
+        y limita por su cuenta (limit pushdown) y solo se hidrata la página,
+        así que la memoria depende del tamaño de página y no del historial.
+        Cada item trae "cursor" para pedir la página siguiente desde él.
+
+        Los retweets de tweets borrados se descartan en la query; si algo se
+        borra entre la query y la hidratación, se sigue leyendo desde la
+        última fila hasta completar la página (una página corta es el final).
         """
+        if cursor is not None:
+            skip = 0
+
+        feed_items: List[dict] = []
+        while True:
+            wanted = limit - len(feed_items)
+            rows = self._feed_rows(db, user_id, skip, wanted, cursor)
+            feed_items += self._hydrate_feed_rows(db, rows, user_id)
+            if len(rows) < wanted or len(feed_items) >= limit:
+                return feed_items
+            cursor, skip = (rows[-1].created_at, rows[-1].sort_id), 0
+
+    def _feed_rows(self, db: Session, user_id: int, skip: int, limit: int, cursor: Optional[Cursor]) -> list:
+        """Filas (type, item_id, tweet_id, created_at, sort_id) de una página del feed"""
         from app.models.follow import Follow
-        from app.services.like import like_service
-        
+
         # IDs de usuarios seguidos + propio usuario
-        following_ids_query = db.query(Follow.followed_id).filter(Follow.follower_id == user_id)
-        following_ids = [f[0] for f in following_ids_query.all()]
-        following_ids.append(user_id)  # Agregar propio usuario
-        
-        # Obtener tweets originales de usuarios seguidos
+        following_ids = select(Follow.followed_id).where(Follow.follower_id == user_id)
+
+        # Clave de orden única entre las dos tablas: los IDs de tweets van
+        # pares y los de retweets impares, así el cursor sigue siendo (created_at, id)
+        tweet_key = (Tweet.id * 2).label("sort_id")
+        retweet_key = (Retweet.id * 2 + 1).label("sort_id")
+        wanted = skip + limit
+
         original_tweets = (
-            db.query(Tweet)
-            .options(joinedload(Tweet.author))
-            .filter(Tweet.author_id.in_(following_ids))
-            .all()
+            select(
+                literal("tweet").label("type"),
+                Tweet.id.label("item_id"),
+                Tweet.id.label("tweet_id"),
+                Tweet.created_at.label("created_at"),
+                tweet_key,
+            )
+            .where(or_(Tweet.author_id.in_(following_ids), Tweet.author_id == user_id))
         )
-        
-        # Obtener retweets de usuarios seguidos
         retweets = (
-            db.query(Retweet)
-            .options(
-                joinedload(Retweet.tweet).joinedload(Tweet.author),
-                joinedload(Retweet.user)
+            select(
+                literal("retweet").label("type"),
+                Retweet.id.label("item_id"),
+                Retweet.tweet_id.label("tweet_id"),
+                Retweet.created_at.label("created_at"),
+                retweet_key,
             )
-            .filter(Retweet.user_id.in_(following_ids))
-            .all()
+            # Antes del LIMIT: un retweet de un tweet que ya no existe no ocupa lugar en la página
+            .join(Tweet, Tweet.id == Retweet.tweet_id)
+            .where(or_(Retweet.user_id.in_(following_ids), Retweet.user_id == user_id))
         )
-        
-        # Combinar y formatear para el feed
+        if cursor is not None:
+            original_tweets = original_tweets.where(tuple_(Tweet.created_at, Tweet.id * 2) < tuple_(*cursor))
+            retweets = retweets.where(tuple_(Retweet.created_at, Retweet.id * 2 + 1) < tuple_(*cursor))
+
+        branches = [
+            branch.order_by(branch.selected_columns.created_at.desc(), branch.selected_columns.sort_id.desc())
+            .limit(wanted)
+            .subquery()
+            for branch in (original_tweets, retweets)
+        ]
+        feed = union_all(*[select(branch) for branch in branches]).subquery()
+        return db.execute(
+            select(feed)
+            .order_by(feed.c.created_at.desc(), feed.c.sort_id.desc())
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+    def _hydrate_feed_rows(self, db: Session, rows: list, user_id: int) -> List[dict]:
+        # Hidratar solo la página: tweets en lote + autores de los retweets
+        tweet_ids = list(dict.fromkeys(row.tweet_id for row in rows))
+        hydrated = {item["id"]: item for item in tweet_service.hydrate_ids(db, tweet_ids, user_id)}
+
+        retweet_ids = [row.item_id for row in rows if row.type == "retweet"]
+        retweets_by_id = {}
+        if retweet_ids:
+            retweets_by_id = {
+                retweet.id: retweet
+                for retweet in db.query(Retweet).options(joinedload(Retweet.user)).filter(Retweet.id.in_(retweet_ids))
+            }
+
         feed_items = []
-        
-        # Agregar tweets originales
-        for tweet in original_tweets:
-            # Agregar información de likes y retweets
-            tweet.likes_count = like_service.get_likes_count(db, tweet.id)
-            tweet.retweets_count = self.get_retweets_count(db, tweet.id)
-            tweet.is_liked_by_user = like_service.is_liked_by_user(db, tweet.id, user_id)
-            tweet.is_retweeted_by_user = self.is_retweeted_by_user(db, tweet.id, user_id)
-            
-            feed_items.append({
-                'type': 'tweet',
-                'tweet': tweet,
-                'created_at': tweet.created_at
-            })
-        
-        # Agregar retweets
-        for retweet in retweets:
-            # Agregar información de likes y retweets al tweet original
-            retweet.tweet.likes_count = like_service.get_likes_count(db, retweet.tweet.id)
-            retweet.tweet.retweets_count = self.get_retweets_count(db, retweet.tweet.id)
-            retweet.tweet.is_liked_by_user = like_service.is_liked_by_user(db, retweet.tweet.id, user_id)
-            retweet.tweet.is_retweeted_by_user = self.is_retweeted_by_user(db, retweet.tweet.id, user_id)
-            
-            feed_items.append({
-                'type': 'retweet',
-                'tweet': retweet.tweet,
-                'retweet_author': retweet.user,
-                'retweet_comment': retweet.comment,
-                'created_at': retweet.created_at  # Usar fecha del retweet para ordenar
-            })
-        
-        # Ordenar por fecha (más reciente primero)
-        feed_items.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        # Aplicar paginación
-        return feed_items[skip:skip + limit]
+        for row in rows:
+            tweet_data = hydrated.get(row.tweet_id)
+            if tweet_data is None:
+                continue  # Borrado entre la query y la hidratación
+            item = {
+                'type': row.type,
+                'tweet': tweet_data,
+                'created_at': row.created_at,
+                'cursor': encode_cursor(row.created_at, row.sort_id)
+            }
+            if row.type == 'retweet':
+                retweet = retweets_by_id.get(row.item_id)
+                if retweet is None:
+                    continue
+                item['retweet_author'] = retweet.user
+                item['retweet_comment'] = retweet.comment
+            feed_items.append(item)
+
+        return feed_items
 
 retweet_service = RetweetService()
\ No newline at end of file
@@ -0,0 +1,416 @@
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Float, cast, column, func, literal, literal_column, select, table, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.inverted_index import InvertedIndex, tokenize
+from app.core.pagination import RankCursor
+from app.core.search_changes import InMemorySearchChangeFeed, SearchChangeFeed, create_search_change_feed
+from app.db.search_index import FTS_TABLE, SEARCH_VECTOR_COLUMN
+from app.models.tweet import Tweet
+
+# Un término suelto o una frase entre comillas, con "-" adelante para excluir
+_QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"?|(-?)([^\s"]+)')
+_WORD = re.compile(r"\w+")
+
+
+def parse_websearch(q: str) -> List[Tuple[List[str], List[str]]]:
+    """
+    Cláusulas de una búsqueda con la sintaxis de websearch_to_tsquery
+    (términos, "frases", or y -exclusiones): una lista de (frases que tienen
+    que estar, frases excluidas) unidas por or. Se descartan las frases sin
+    ninguna palabra y las cláusulas sin ninguna frase positiva.
+    """
+    clauses: List[Tuple[List[str], List[str]]] = [([], [])]
+    for match in _QUERY_TOKEN.finditer(q):
+        negate = bool(match.group(1) or match.group(3))
+        phrase = match.group(2) if match.group(2) is not None else match.group(4)
+        if match.group(4) is not None and not negate and phrase.lower() == "or":
+            if clauses[-1][0]:
+                clauses.append(([], []))
+            continue
+        if _WORD.search(phrase):
+            clauses[-1][1 if negate else 0].append(phrase)
+    return [clause for clause in clauses if clause[0]]
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """
+    Traducir una búsqueda (ver parse_websearch) a una consulta FTS5 con cada
+    término entre comillas, así la entrada del usuario nunca es sintaxis
+    FTS5. None si no queda ningún término positivo (FTS5 no puede pedir
+    "todo menos X").
+    """
+    def quoted(phrase: str) -> str:
+        return '"' + " ".join(_WORD.findall(phrase)) + '"'
+
+    clauses = [
+        " AND ".join(quoted(phrase) for phrase in include) + "".join(" NOT " + quoted(phrase) for phrase in exclude)
+        for include, exclude in parse_websearch(q)
+    ]
+    return " OR ".join(clauses) or None
+
+
+class SearchBackend(ABC):
+    """
+    Búsqueda de tweets por texto completo. search_tweets devuelve (id,
+    score) de mayor a menor (score, id), con el puntaje de relevancia
+    dividido por (1 + antigüedad / search_recency_hours) medida contra
+    `as_of`: entre dos tweets igual de relevantes gana el más nuevo, y uno
+    de search_recency_hours horas vale la mitad. Con BM25 (SQLite, embedded)
+    el puntaje depende de las estadísticas de todo el corpus: si cambia
+    entre una página y la siguiente, el cursor puede repetir o saltear
+    algún resultado.
+
+    TweetService avisa cada tweet creado, editado o borrado después del
+    commit (index_tweets / remove_tweets); a los backends que leen de la
+    base no les hace falta.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def search_tweets(
+        self, db: Session, q: str, as_of: datetime, limit: int = 20,
+        cursor: Optional[RankCursor] = None, skip: int = 0
+    ) -> List[Tuple[int, float]]:
+        pass
+
+    def index_tweets(self, tweets: Iterable[Tuple[int, str, datetime]], edited: bool = False):
+        """Tweets (id, content, created_at) nuevos o, con `edited`, editados, ya confirmados"""
+
+    def remove_tweets(self, tweet_ids: Iterable[int]):
+        """Tweets borrados, ya confirmados"""
+
+    def start(self):
+        """Arrancar el trabajo en segundo plano del backend, si tiene"""
+
+    def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Búsqueda sobre el índice de la base (ver app/db/search_index.py):
+    websearch_to_tsquery + ts_rank en PostgreSQL, FTS5 + bm25 en SQLite.
+    Con otra base no arranca: el dialecto se valida al crearlo, no en la
+    primera búsqueda.
+    """
+
+    name = "db"
+    dialects = ("postgresql", "sqlite")
+
+    def __init__(self, dialect: Optional[str] = None):
+        dialect = dialect or make_url(settings.database_url).get_backend_name()
+        if dialect not in self.dialects:
+            raise ValueError(f"Full-text search not supported for dialect: {dialect}")
+        self.dialect = dialect
+
+    def _postgresql_scores(self, q: str, as_of: datetime):
+        vector = literal_column(f"tweets.{SEARCH_VECTOR_COLUMN}")
+        query = func.websearch_to_tsquery(cast(settings.search_text_config, REGCONFIG), q)
+        age = func.date_part("epoch", literal(as_of, DateTime(timezone=True)) - Tweet.created_at, type_=Float) / 3600.0
+        recency = 1.0 + func.greatest(0.0, age, type_=Float) / float(settings.search_recency_hours)
+        score = cast(func.ts_rank(vector, query), Float) / recency
+        return select(Tweet.id.label("id"), score.label("score")).where(vector.op("@@")(query))
+
+    def _sqlite_scores(self, q: str, as_of: datetime):
+        match = fts5_query(q)
+        if match is None:
+            return None
+        fts = table(FTS_TABLE, column("rowid"))
+        # bm25() es negativo (menor = más relevante); created_at está en UTC sin zona
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+        age = (func.julianday(as_of, type_=Float) - func.julianday(Tweet.created_at, type_=Float)) * 24.0
+        recency = 1.0 + func.max(0.0, age, type_=Float) / float(settings.search_recency_hours)
+        score = -literal_column(f"bm25({FTS_TABLE})", Float) / recency
+        return (
+            select(Tweet.id.label("id"), score.label("score"))
+            .select_from(fts)
+            .join(Tweet, Tweet.id == fts.c.rowid)
+            .where(literal_column(FTS_TABLE).op("MATCH")(match))
+        )
+
+    def search_tweets(
+        self, db: Session, q: str, as_of: datetime, limit: int = 20,
+        cursor: Optional[RankCursor] = None, skip: int = 0
+    ) -> List[Tuple[int, float]]:
+        if self.dialect == "postgresql":
+            scores = self._postgresql_scores(q, as_of)
+        else:
+            scores = self._sqlite_scores(q, as_of)
+        if scores is None:
+            return []
+
+        scored = scores.subquery()
+        statement = select(scored.c.id, scored.c.score)
+        if cursor is not None:
+            statement = statement.where(tuple_(scored.c.score, scored.c.id) < tuple_(cursor.score, cursor.id))
+        statement = statement.order_by(scored.c.score.desc(), scored.c.id.desc())
+        if cursor is None and skip:
+            statement = statement.offset(skip)
+        return [(id, score) for id, score in db.execute(statement.limit(limit))]
+
+
+def _timestamp(moment: datetime) -> float:
+    # SQLite devuelve created_at sin zona (CURRENT_TIMESTAMP está en UTC)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class EmbeddedSearchBackend(SearchBackend):
+    """
+    Búsqueda con un InvertedIndex en memoria de cada worker (BM25, ver
+    app/core/inverted_index.py), sin queries a la base por búsqueda.
+
+    El índice se mantiene con los avisos de TweetService y con un hilo que
+    lee de la base los tweets por encima de una marca de agua (como
+    TrendingService): así también entran los creados por otros workers y
+    por la ingesta masiva. Las ediciones y borrados no cambian la marca de
+    agua: se publican en un SearchChangeFeed y el mismo hilo aplica los de
+    todos los workers en el orden del feed (también los propios, ya
+    aplicados, para que dos ediciones del mismo tweet terminen igual en
+    todos). Un tweet borrado que todavía sigue en el índice lo descarta
+    hydrate_ids.
+
+    Al iniciar se carga el snapshot de search_snapshot_path si existe y se
+    lee de la base lo posterior a su marca de agua; si no, se indexa toda la
+    tabla. Mientras tanto las búsquedas van a la base y los avisos se
+    guardan para aplicarlos después. El snapshot se reescribe cada
+    search_snapshot_seconds si hubo cambios, y al detenerse.
+    """
+
+    name = "embedded"
+
+    def __init__(self, snapshot_path: str = "", changes: Optional[SearchChangeFeed] = None):
+        self.index = InvertedIndex()
+        self.snapshot_path = snapshot_path
+        self.changes = changes if changes is not None else InMemorySearchChangeFeed()
+        self.ready = False
+        self.snapshot_at: Optional[float] = None
+        self.fallback = DatabaseSearchBackend()
+        # Avisos recibidos antes de terminar de cargar el índice: (_add, tweets) o (_remove, ids)
+        self._pending: List[tuple] = []
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def search_tweets(
+        self, db: Session, q: str, as_of: datetime, limit: int = 20,
+        cursor: Optional[RankCursor] = None, skip: int = 0
+    ) -> List[Tuple[int, float]]:
+        if not self.ready:
+            return self.fallback.search_tweets(db, q, as_of, limit, cursor, skip)
+        clauses = [
+            (
+                [term for phrase in include for term in tokenize(phrase)],
+                [terms for terms in (tokenize(phrase) for phrase in exclude) if terms]
+            )
+            for include, exclude in parse_websearch(q)
+        ]
+        after = (cursor.score, cursor.id) if cursor is not None else None
+        with self._lock:
+            return self.index.search(
+                clauses, as_of.timestamp(), settings.search_recency_hours, limit, after, skip
+            )
+
+    def _add(self, tweets: List[Tuple[int, str, datetime]]):
+        for tweet_id, content, created_at in tweets:
+            self.index.add(tweet_id, content, _timestamp(created_at))
+
+    def _remove(self, tweet_ids: List[int]):
+        for tweet_id in tweet_ids:
+            self.index.remove(tweet_id)
+
+    def index_tweets(self, tweets: Iterable[Tuple[int, str, datetime]], edited: bool = False):
+        tweets = list(tweets)
+        if edited:
+            self.changes.publish([
+                ("index", tweet_id, content, _timestamp(created_at)) for tweet_id, content, created_at in tweets
+            ])
+        with self._lock:
+            if not self.ready:
+                self._pending.append((self._add, tweets))
+                return
+            self._add(tweets)
+            self._dirty = True
+
+    def remove_tweets(self, tweet_ids: Iterable[int]):
+        tweet_ids = list(tweet_ids)
+        self.changes.publish([("remove", tweet_id) for tweet_id in tweet_ids])
+        with self._lock:
+            if not self.ready:
+                self._pending.append((self._remove, tweet_ids))
+                return
+            self._remove(tweet_ids)
+            self._dirty = True
+
+    def sync(self, db: Session) -> int:
+        """Indexar los tweets nuevos de la base; devuelve cuántos se leyeron"""
+        batch_size = settings.search_poll_batch
+        # Un tweet recién confirmado con un id menor que otro ya leído no
+        # queda detrás de la marca de agua (ver TrendingService.poll)
+        horizon = (datetime.now(timezone.utc) - timedelta(seconds=settings.search_settle_seconds)).timestamp()
+        read = 0
+        while True:
+            rows = db.execute(
+                select(Tweet.id, Tweet.content, Tweet.created_at)
+                .where(Tweet.id > self.index.watermark)
+                .order_by(Tweet.id)
+                .limit(batch_size)
+            ).all()
+            settled = []
+            for tweet_id, content, created_at in rows:
+                created_at = _timestamp(created_at)
+                if created_at > horizon:
+                    break
+                settled.append((tweet_id, content, created_at))
+            if not settled:
+                return read
+            with self._lock:
+                for tweet_id, content, created_at in settled:
+                    # Los que ya avisó TweetService pueden tener una edición más nueva
+                    self.index.add(tweet_id, content, created_at, replace=False)
+                self.index.watermark = settled[-1][0]
+                self._dirty = True
+            read += len(settled)
+            if len(settled) < batch_size:
+                return read
+
+    def apply_changes(self) -> int:
+        """Aplicar las ediciones y borrados publicados en el feed; devuelve cuántos"""
+        applied = 0
+        while True:
+            position, changes = self.changes.read(self.index.changes_position, settings.search_poll_batch)
+            if position == self.index.changes_position:
+                return applied
+            with self._lock:
+                for change in changes:
+                    if change[0] == "index":
+                        _, tweet_id, content, created_at = change
+                        self.index.add(tweet_id, content, created_at)
+                    else:
+                        self.index.remove(change[1])
+                self.index.changes_position = position
+                self._dirty = True
+            applied += len(changes)
+
+    def load_snapshot(self) -> bool:
+        """Cargar el snapshot de snapshot_path si existe (antes de marcar el índice listo)"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            index = InvertedIndex.load(self.snapshot_path)
+        except (OSError, ValueError) as e:
+            print(f"Snapshot de búsqueda inválido en {self.snapshot_path}, se reconstruye: {e}")
+            return False
+        with self._lock:
+            self.index = index
+        return True
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            self.index.save(self.snapshot_path)
+            self._dirty = False
+        self.snapshot_at = time.time()
+
+    def load(self, db: Session):
+        """Cargar el índice (snapshot + lo posterior, o la tabla entera) y aplicar los avisos pendientes"""
+        started = time.perf_counter()
+        loaded = self.load_snapshot()
+        if not self.index.changes_position:
+            # Sin posición guardada: lo anterior ya está en lo que se lee de la base
+            self.index.changes_position = self.changes.position()
+        read = self.sync(db)
+        with self._lock:
+            for apply, items in self._pending:
+                apply(items)
+            self._pending = []
+        # Después de los avisos pendientes: el feed también los tiene, en su orden
+        self.apply_changes()
+        with self._lock:
+            self.ready = True
+        print(
+            f"Índice de búsqueda listo: {len(self.index)} tweets ({read} leídos de la base"
+            f"{', resto del snapshot' if loaded else ''}) en {time.perf_counter() - started:.1f} s"
+        )
+
+    def _tick(self):
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            if not self.ready:
+                self.load(db)
+            else:
+                self.sync(db)
+                self.apply_changes()
+        finally:
+            db.close()
+        if self._dirty and self.snapshot_path and (
+            self.snapshot_at is None or time.time() - self.snapshot_at >= settings.search_snapshot_seconds
+        ):
+            self.save_snapshot()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Error actualizando el índice de búsqueda: {e}")
+            self._stop.wait(settings.search_poll_seconds)
+
+    def start(self):
+        """Arrancar el hilo que carga y actualiza el índice (uno por proceso)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.search_poll_seconds + 1)
+            self._thread = None
+        if self.ready and self._dirty:
+            self.save_snapshot()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "ready": self.ready,
+            "tweets": len(self.index),
+            "dead": self.index.dead,
+            "terms": len(self.index.terms),
+            "watermark": self.index.watermark,
+            "changes_position": self.index.changes_position,
+            "snapshot_at": self.snapshot_at
+        }
+
+
+def create_search_backend() -> SearchBackend:
+    if settings.search_backend == "db":
+        return DatabaseSearchBackend()
+    if settings.search_backend == "embedded":
+        return EmbeddedSearchBackend(settings.search_snapshot_path, create_search_change_feed())
+    raise ValueError(f"Unknown search backend: {settings.search_backend}")
+
+
+search_service = create_search_backend()
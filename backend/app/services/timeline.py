@@ -0,0 +1,180 @@
+import heapq
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.pagination import Cursor
+from app.core.timeline_store import create_timeline_store
+from app.models.follow import Follow
+from app.models.tweet import Tweet
+from app.models.user import User
+
+class TimelineService:
+    """
+    Home timelines materializados con fan-out híbrido:
+
+    - push: los tweets de autores con pocos seguidores se agregan al timeline
+      de cada seguidor al crearse (fan-out on write).
+    - pull: los autores que superan settings.fanout_follower_threshold quedan
+      marcados en el store y solo escriben en su propio timeline; sus tweets
+      recientes se mezclan en el feed de cada lector al leer (k-way merge).
+
+    La marca de pull es permanente: así los lectores nunca pierden tweets
+    viejos de un autor que bajó del umbral.
+    """
+
+    def __init__(self):
+        self.store = create_timeline_store()
+
+    def _score(self, created_at: datetime) -> float:
+        return created_at.timestamp()
+
+    def _follower_ids(self, db: Session, author_id: int) -> List[int]:
+        rows = db.query(Follow.follower_id).filter(Follow.followed_id == author_id).all()
+        return [row[0] for row in rows]
+
+    def _following_ids(self, db: Session, user_id: int) -> List[int]:
+        rows = db.query(Follow.followed_id).filter(Follow.follower_id == user_id).all()
+        return [row[0] for row in rows]
+
+    def is_pulled(self, db: Session, author_id: int) -> bool:
+        """Decidir (y recordar) si un autor se sirve por pull en vez de push"""
+        if self.store.filter_pulled([author_id]):
+            return True
+        followers_count = db.query(User.followers_count).filter(User.id == author_id).scalar() or 0
+        if followers_count > settings.fanout_follower_threshold:
+            self.store.mark_pulled(author_id)
+            return True
+        return False
+
+    def push_tweet(self, db: Session, tweet: Tweet):
+        """Agregar un tweet nuevo a los timelines de su autor y (si es push) sus seguidores"""
+        if tweet.reply_to_id:
+            return  # Las respuestas no aparecen en el feed
+        user_ids = [tweet.author_id]
+        if not self.is_pulled(db, tweet.author_id):
+            user_ids += self._follower_ids(db, tweet.author_id)
+        self.store.push(user_ids, tweet.id, self._score(tweet.created_at))
+
+    def push_many(self, db: Session, author_id: int, tweets: List[Tuple[int, datetime]]):
+        """push_tweet para varios tweets originales (id, created_at) de un mismo autor"""
+        if not tweets:
+            return
+        user_ids = [author_id]
+        if not self.is_pulled(db, author_id):
+            user_ids += self._follower_ids(db, author_id)
+        for tweet_id, created_at in tweets:
+            self.store.push(user_ids, tweet_id, self._score(created_at))
+    
+    def remove_tweet(self, db: Session, tweet_id: int, author_id: int):
+        """Quitar un tweet borrado de los timelines donde fue agregado"""
+        user_ids = [author_id]
+        if not self.store.filter_pulled([author_id]):
+            user_ids += self._follower_ids(db, author_id)
+        self.store.remove(user_ids, [tweet_id])
+
+    def remove_author(self, db: Session, user_id: int, author_id: int):
+        """Quitar del timeline de un usuario los tweets de alguien que dejó de seguir"""
+        tweet_ids = self.store.tweet_ids(user_id)
+        if not tweet_ids:
+            return
+        rows = db.query(Tweet.id).filter(Tweet.author_id == author_id, Tweet.id.in_(tweet_ids)).all()
+        self.store.remove([user_id], [row[0] for row in rows])
+
+    def invalidate(self, user_id: int):
+        """Descartar un timeline; se reconstruye en la próxima lectura"""
+        self.store.delete(user_id)
+
+    def feed_query(self, db: Session, user_id: int):
+        """Tweets originales del usuario y de quienes sigue (fuente de verdad del feed)"""
+        following_ids = db.query(Follow.followed_id).filter(Follow.follower_id == user_id)
+        return (
+            db.query(Tweet)
+            .filter(
+                (Tweet.author_id.in_(following_ids)) |
+                (Tweet.author_id == user_id)
+            )
+            .filter(Tweet.reply_to_id.is_(None))
+        )
+
+    def rebuild(self, db: Session, user_id: int, pulled_ids: Optional[List[int]] = None):
+        """
+        Materializar el timeline desde la base de datos (sin los autores
+        pull). Se lee una fila de más: si está, replace lo marca recortado.
+        """
+        query = self.feed_query(db, user_id)
+        if pulled_ids:
+            query = query.filter(Tweet.author_id.notin_(pulled_ids))
+        rows = (
+            query
+            .with_entities(Tweet.id, Tweet.created_at)
+            .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+            .limit(self.store.max_size + 1)
+            .all()
+        )
+        self.store.replace(user_id, [(self._score(created_at), tweet_id) for tweet_id, created_at in rows])
+
+    def _pulled_entries(self, db: Session, author_ids: List[int], cursor: Optional[Cursor], limit: int) -> List[List[Tuple[float, int]]]:
+        """Tweets recientes de los autores pull, como una lista ordenada por autor"""
+        query = (
+            db.query(Tweet.author_id, Tweet.id, Tweet.created_at)
+            .filter(Tweet.author_id.in_(author_ids))
+            .filter(Tweet.reply_to_id.is_(None))
+        )
+        if cursor is not None:
+            query = query.filter(tuple_(Tweet.created_at, Tweet.id) < tuple_(*cursor))
+        rows = query.order_by(Tweet.created_at.desc(), Tweet.id.desc()).limit(limit).all()
+
+        streams = {}
+        for author_id, tweet_id, created_at in rows:
+            streams.setdefault(author_id, []).append((self._score(created_at), tweet_id))
+        return list(streams.values())
+
+    def get_page(self, db: Session, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> Optional[List[int]]:
+        """
+        IDs de una página del feed, más recientes primero. Devuelve None si la
+        página cae fuera de lo materializado (más allá de un timeline
+        recortado a max_size): en ese caso el llamador debe leer desde la
+        base de datos.
+        """
+        pulled_ids = [
+            author_id for author_id in self.store.filter_pulled(self._following_ids(db, user_id))
+            if author_id != user_id
+        ]
+        if not self.store.exists(user_id):
+            if db.info.get("replica"):
+                # Lo materializado dura más que el lag: se arma desde el primario
+                from app.db.session import SessionLocal
+                with SessionLocal() as primary:
+                    self.rebuild(primary, user_id, pulled_ids)
+            else:
+                self.rebuild(db, user_id, pulled_ids)
+
+        before: Optional[Tuple[float, int]] = None
+        if cursor is not None:
+            before = (self._score(cursor[0]), cursor[1])
+            skip = 0
+
+        # Sin cursor, el offset se aplica sobre el resultado ya mezclado
+        wanted = skip + limit
+        pushed = self.store.range(user_id, before=before, limit=wanted)
+        if len(pushed) < wanted and self.store.is_trimmed(user_id):
+            return None
+
+        streams = [pushed]
+        if pulled_ids:
+            streams += self._pulled_entries(db, pulled_ids, cursor, wanted)
+
+        page = []
+        seen = set()
+        for _, tweet_id in heapq.merge(*streams, reverse=True):
+            if tweet_id in seen:
+                continue
+            seen.add(tweet_id)
+            page.append(tweet_id)
+            if len(page) == wanted:
+                break
+        return page[skip:]
+
+timeline_service = TimelineService()
@@ -0,0 +1,238 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.hooks import after_commit
+from app.core.trending import (
+    RingTrendCounter, SketchStore, SketchTrendCounter, Trend, TrendCounter, create_sketch_store
+)
+from app.models.hashtag import Hashtag, tweet_hashtags
+from app.models.tweet import Tweet
+
+# Usos de hashtags de la transacción en curso, a contar después del commit
+PENDING_TRENDING_KEY = "pending_trending"
+
+
+def _minute(moment: datetime) -> int:
+    return int(moment.timestamp() // 60)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite devuelve created_at sin zona (CURRENT_TIMESTAMP está en UTC)
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+class TrendingService:
+    """
+    Hashtags en tendencia servidos desde memoria.
+
+    Un hilo en segundo plano lee los tweets nuevos de la base por encima de
+    una marca de agua (el último tweets.id contado), agrega sus hashtags a
+    un TrendCounter por minuto de created_at y publica un snapshot ya
+    ordenado; GET /trending/hashtags solo corta ese snapshot.
+
+    Cada worker lee la base por su cuenta, así que todos ven todos los
+    tweets (no solo los que crearon) con una query indexada por poll. Un
+    tweet solo se cuenta cuando tiene más de trending_settle_seconds: una
+    transacción que tomó un id menor y confirma después no queda detrás de
+    la marca de agua (se asume que ninguna tarda más que eso).
+    """
+
+    def __init__(self, counter: TrendCounter):
+        self.counter = counter
+        self.watermark: Optional[int] = None
+        self.snapshot: List[Trend] = []
+        self.snapshot_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _initial_watermark(self, db: Session) -> int:
+        """Arrancar desde el primer tweet de la ventana (llena la ventana al iniciar)"""
+        since = datetime.now(timezone.utc) - timedelta(minutes=self.counter.window_minutes)
+        first_id = db.scalar(select(func.min(Tweet.id)).where(Tweet.created_at >= since))
+        if first_id is not None:
+            return first_id - 1
+        return db.scalar(select(func.max(Tweet.id))) or 0
+
+    def poll(self, db: Session) -> int:
+        """Contar los hashtags de los tweets nuevos; devuelve cuántos tweets se leyeron"""
+        if self.watermark is None:
+            self.watermark = self._initial_watermark(db)
+
+        batch_size = settings.trending_poll_batch
+        horizon = datetime.now(timezone.utc) - timedelta(seconds=settings.trending_settle_seconds)
+        read = 0
+        while True:
+            rows = db.execute(
+                select(Tweet.id, Tweet.created_at)
+                .where(Tweet.id > self.watermark)
+                .order_by(Tweet.id)
+                .limit(batch_size)
+            ).all()
+            # Se corta en el primer tweet demasiado reciente, en orden de id
+            minutes: Dict[int, int] = {}
+            last_id = None
+            for tweet_id, created_at in rows:
+                created_at = _as_utc(created_at)
+                if created_at > horizon:
+                    break
+                minutes[tweet_id] = _minute(created_at)
+                last_id = tweet_id
+            if last_id is None:
+                return read
+
+            by_minute: Dict[int, Dict[str, int]] = {}
+            tagged = db.execute(
+                select(tweet_hashtags.c.tweet_id, Hashtag.tag)
+                .join(Hashtag, Hashtag.id == tweet_hashtags.c.hashtag_id)
+                .where(tweet_hashtags.c.tweet_id > self.watermark, tweet_hashtags.c.tweet_id <= last_id)
+            )
+            for tweet_id, tag in tagged:
+                if tweet_id not in minutes:
+                    continue  # confirmado entre las dos queries: ya quedó atrás
+                counts = by_minute.setdefault(minutes[tweet_id], {})
+                counts[tag] = counts.get(tag, 0) + 1
+            for minute in sorted(by_minute):
+                self.counter.add(minute, by_minute[minute])
+
+            self.watermark = last_id
+            read += len(minutes)
+            if len(minutes) < batch_size:
+                return read
+
+    def refresh(self, db: Session) -> List[Trend]:
+        """Leer lo nuevo y recalcular el snapshot"""
+        with self._lock:
+            self.poll(db)
+            self.snapshot = self.counter.top(_minute(datetime.now(timezone.utc)), settings.trending_snapshot_size)
+            self.snapshot_at = time.time()
+            return self.snapshot
+
+    def track(self, db: Session, counts: Dict[str, int]):
+        """Usos de hashtags de tweets nuevos en `db` (acá no hace falta: se leen de la base)"""
+
+    def record(self, counts: Dict[str, int]):
+        """Contar usos confirmados (ver track)"""
+
+    def get_trending(self, limit: int = 10) -> List[Trend]:
+        """Hashtags en tendencia del último snapshot (sin tocar la base)"""
+        return self.snapshot[:limit]
+
+    def _tick(self):
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.refresh(db)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Error actualizando trending: {e}")
+            self._stop.wait(settings.trending_poll_seconds)
+
+    def start(self):
+        """Arrancar el hilo de actualización (uno por proceso)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trending", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.trending_poll_seconds + 1)
+            self._thread = None
+
+
+class SketchTrendingService(TrendingService):
+    """
+    Tendencias con SketchTrendCounter, para tasas de tweets altas: no lee
+    la base. HashtagService.process_tweets anota los usos de cada
+    transacción (track) y se cuentan al confirmarse (record), así que cada
+    worker cuenta solo los tweets que creó.
+
+    El hilo en segundo plano publica el sketch del worker en el SketchStore,
+    lo combina con los publicados por los demás y calcula el snapshot sobre
+    el total. Un worker que reinicia pierde lo que había contado.
+    """
+
+    def __init__(self, counter: SketchTrendCounter, store: SketchStore):
+        super().__init__(counter)
+        self.store = store
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # record() llega desde los hilos de las requests
+        self._counter_lock = threading.Lock()
+
+    def track(self, db: Session, counts: Dict[str, int]):
+        pending = db.info.setdefault(PENDING_TRENDING_KEY, {})
+        for tag, count in counts.items():
+            pending[tag] = pending.get(tag, 0) + count
+
+    def record(self, counts: Dict[str, int]):
+        minute = _minute(datetime.now(timezone.utc))
+        with self._counter_lock:
+            self.counter.add(minute, counts)
+
+    def refresh(self, db: Optional[Session] = None) -> List[Trend]:
+        minute = _minute(datetime.now(timezone.utc))
+        with self._lock:
+            with self._counter_lock:
+                self.counter.advance(minute)
+                merged = self.counter.copy()
+            self.store.publish(self.worker_id, merged.to_bytes())
+            for data in self.store.load_others(self.worker_id):
+                try:
+                    merged.merge(SketchTrendCounter.from_bytes(data))
+                except ValueError as e:
+                    # Otro worker con otras dimensiones (deploy a medias)
+                    print(f"Sketch de trending ignorado: {e}")
+            self.snapshot = merged.top(minute, settings.trending_snapshot_size)
+            self.snapshot_at = time.time()
+            return self.snapshot
+
+    def _tick(self):
+        self.refresh()
+
+
+def create_trending_service() -> TrendingService:
+    window = settings.trending_window_minutes
+    half_life = settings.trending_half_life_minutes
+    if settings.trending_backend == "exact":
+        return TrendingService(RingTrendCounter(window, half_life, settings.trending_min_count))
+    if settings.trending_backend == "sketch":
+        counter = SketchTrendCounter(
+            window, half_life, settings.trending_min_count,
+            settings.trending_sketch_width, settings.trending_sketch_depth, settings.trending_top_k
+        )
+        return SketchTrendingService(counter, create_sketch_store())
+    raise ValueError(f"Unknown trending backend: {settings.trending_backend}")
+
+
+trending_service = create_trending_service()
+
+
+@after_commit
+def _record_trending(session: Session):
+    counts = session.info.pop(PENDING_TRENDING_KEY, None)
+    if counts:
+        trending_service.record(counts)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_trending(session: Session):
+    session.info.pop(PENDING_TRENDING_KEY, None)
@@ -1,16 +1,44 @@
-from typing import List, Optional
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, event, func, insert, literal, select, update
 from app.models.tweet import Tweet
 from app.models.user import User
-from app.models.follow import Follow
 from app.schemas.tweet import TweetCreate, TweetUpdate
+from app.schemas.user import UserPublic
+from app.core.cache import TinyLFUCache
+from app.core.config import settings
+from app.core.pagination import Cursor, encode_cursor, keyset_paginate
+from app.core.conditional import read_versions
+from app.core.version_store import version_store
+from app.db.hooks import after_commit
+
+# Ancho de cada ID dentro de Tweet.path (ver models/tweet.py)
+PATH_SEGMENT_WIDTH = 10
+
+# Invalidaciones pendientes de una sesión, que se repiten al hacer commit
+PENDING_INVALIDATIONS_KEY = "tweet_cache_invalidations"
 
 class TweetService:
+    def __init__(self):
+        # Parte de cada tweet que no depende de quién lo mira, y autores como UserPublic
+        self.cache = TinyLFUCache(settings.tweet_cache_max_bytes, ttl_seconds=settings.tweet_cache_ttl_seconds)
+
 # En el método create, agregar después de crear el tweet:
 
     def create(self, db: Session, tweet_in: TweetCreate, author_id: int) -> Tweet:
+        """
+        Crear un tweet en una sola transacción: el INSERT, su camino en el
+        árbol, el contador del padre, los hashtags (upsert) y las menciones
+        se confirman juntos. El fan-out a los timelines va después del commit.
+        """
         # Verificar que reply_to_id existe si se proporciona
+        parent_tweet = None
         if tweet_in.reply_to_id:
             parent_tweet = db.query(Tweet).filter(Tweet.id == tweet_in.reply_to_id).first()
             if not parent_tweet:
@@ -23,190 +51,654 @@ class TweetService:
             reply_to_id=tweet_in.reply_to_id
         )
         db.add(db_tweet)
+        if tweet_in.reply_to_id:
+            self.increment_counter(db, tweet_in.reply_to_id, "replies_count")
+        db.flush()  # Para tener el ID antes de armar el camino
+        self._complete_new_tweet(db, db_tweet, parent_tweet)
         db.commit()
         db.refresh(db_tweet)
         
-        from app.services.hashtag import hashtag_service
-        hashtag_service.process_tweet_hashtags(db, db_tweet, tweet_in.content)
-        hashtag_service.process_tweet_mentions(db, db_tweet, tweet_in.content)
+        from app.services.search import search_service
+        from app.services.timeline import timeline_service
+        search_service.index_tweets([(db_tweet.id, db_tweet.content, db_tweet.created_at)])
+        timeline_service.push_tweet(db, db_tweet)
         
         return db_tweet
     
-    def get(self, db: Session, tweet_id: int, current_user_id: Optional[int] = None):
-        tweet = db.query(Tweet).options(
-            joinedload(Tweet.author),
-            joinedload(Tweet.reply_to).joinedload(Tweet.author)  # NUEVO: Cargar tweet padre
-        ).filter(Tweet.id == tweet_id).first()
+    async def create_async(self, db: AsyncSession, tweet_in: TweetCreate, author_id: int) -> Tweet:
+        """
+        Como create, sobre una AsyncSession: la transacción no bloquea el
+        event loop. El fan-out (que puede ir a Redis con un cliente
+        síncrono) corre después en el threadpool.
+        """
+        parent_tweet = None
+        if tweet_in.reply_to_id:
+            parent_tweet = await db.get(Tweet, tweet_in.reply_to_id)
+            if not parent_tweet:
+                raise ValueError("Parent tweet not found")
+        
+        db_tweet = Tweet(
+            content=tweet_in.content,
+            image_url=tweet_in.image_url,
+            author_id=author_id,
+            reply_to_id=tweet_in.reply_to_id
+        )
+        db.add(db_tweet)
+        if tweet_in.reply_to_id:
+            await db.run_sync(self.increment_counter, tweet_in.reply_to_id, "replies_count")
+        await db.flush()
+        await db.run_sync(self._complete_new_tweet, db_tweet, parent_tweet)
+        await db.commit()
+        await db.refresh(db_tweet)
+        
+        from app.services.search import search_service
+        search_service.index_tweets([(db_tweet.id, db_tweet.content, db_tweet.created_at)])
+        await run_in_threadpool(self.push_new_tweet, db_tweet)
+        
+        return db_tweet
+    
+    def _complete_new_tweet(self, db: Session, tweet: Tweet, parent: Optional[Tweet]):
+        """Camino en el árbol, hashtags y menciones de un tweet ya insertado (sin commit)"""
+        from app.services.hashtag import hashtag_service
+        self.set_reply_path(db, tweet, parent)
+        hashtag_service.process_tweets(db, [(tweet.id, tweet.author_id, tweet.content)])
+    
+    def push_new_tweet(self, tweet: Tweet):
+        """Fan-out de un tweet ya confirmado con una sesión propia, para correr en el threadpool"""
+        from app.db.session import SessionLocal
+        from app.services.timeline import timeline_service
+        with SessionLocal() as db:
+            timeline_service.push_tweet(db, tweet)
+    
+    def path_segment(self, tweet_id: int) -> str:
+        return str(tweet_id).zfill(PATH_SEGMENT_WIDTH)
+    
+    def set_reply_path(self, db: Session, tweet: Tweet, parent: Optional[Tweet] = None):
+        """Completar root_id, depth y path de un tweet recién insertado (sin commit)"""
+        tweet.root_id, tweet.depth, tweet.path = self.reply_path(db, tweet.id, parent)
+    
+    def reply_path(self, db: Session, tweet_id: int, parent: Optional[Tweet] = None) -> Tuple[int, int, str]:
+        """(root_id, depth, path) de un tweet nuevo con este padre (None: es raíz)"""
+        if parent is None:
+            return tweet_id, 0, self.path_segment(tweet_id)
+        
+        if parent.path is None:
+            # Padre anterior al backfill: reconstruir su camino con la CTE de ancestros
+            chain = self._get_ancestor_ids(db, parent.reply_to_id) + [parent.id]
+            parent_path = ".".join(self.path_segment(ancestor_id) for ancestor_id in chain)
+            root_id, parent_depth = chain[0], len(chain) - 1
+        else:
+            parent_path, root_id, parent_depth = parent.path, parent.root_id, parent.depth
+        
+        return root_id, parent_depth + 1, f"{parent_path}.{self.path_segment(tweet_id)}"
+    
+    def bulk_create(self, db: Session, items: List[Any], author_id: int, batch_size: Optional[int] = None) -> dict:
+        """
+        Ingesta masiva de tweets de un autor (migraciones, bots). Cada item se
+        valida por separado: los inválidos quedan en "errors" con su índice y
+        no frenan al resto. Por lote: un INSERT multi-fila, un UPDATE de
+        caminos, hashtags y menciones en bloque y un solo commit.
+        """
+        start = time.perf_counter()
+        ids: List[Optional[int]] = [None] * len(items)
+        errors: List[dict] = []
+        
+        valid = []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, item if isinstance(item, TweetCreate) else TweetCreate.model_validate(item)))
+            except ValidationError as e:
+                errors.append({"index": index, "error": "; ".join(error["msg"] for error in e.errors())})
         
-        if tweet:
-            return self._enrich_tweet(db, tweet, current_user_id)
+        batch_size = batch_size or settings.bulk_ingest_batch_size
+        for i in range(0, len(valid), batch_size):
+            self._ingest_batch(db, valid[i:i + batch_size], author_id, ids, errors)
+        
+        elapsed = time.perf_counter() - start
+        created = sum(1 for tweet_id in ids if tweet_id is not None)
+        errors.sort(key=lambda error: error["index"])
+        return {
+            "created": created,
+            "ids": ids,
+            "errors": errors,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "tweets_per_second": round(created / elapsed, 1) if elapsed else 0.0
+        }
+    
+    def _ingest_batch(self, db: Session, batch: List[Tuple[int, TweetCreate]], author_id: int, ids: List[Optional[int]], errors: List[dict]):
+        from app.services.hashtag import hashtag_service
+        from app.services.search import search_service
+        from app.services.timeline import timeline_service
+        
+        parent_ids = {tweet_in.reply_to_id for _, tweet_in in batch if tweet_in.reply_to_id}
+        parents = {}
+        if parent_ids:
+            parents = {parent.id: parent for parent in db.query(Tweet).filter(Tweet.id.in_(parent_ids))}
+        
+        rows = []
+        for index, tweet_in in batch:
+            if tweet_in.reply_to_id and tweet_in.reply_to_id not in parents:
+                errors.append({"index": index, "error": "Parent tweet not found"})
+            else:
+                rows.append((index, tweet_in))
+        if not rows:
+            return
+        
+        try:
+            inserted = db.execute(
+                insert(Tweet).returning(Tweet.id, Tweet.created_at, sort_by_parameter_order=True),
+                [
+                    {
+                        "content": tweet_in.content,
+                        "image_url": tweet_in.image_url,
+                        "author_id": author_id,
+                        "reply_to_id": tweet_in.reply_to_id
+                    }
+                    for _, tweet_in in rows
+                ]
+            ).all()
+            
+            paths = []
+            for (_, tweet_in), (tweet_id, _) in zip(rows, inserted):
+                root_id, depth, path = self.reply_path(db, tweet_id, parents.get(tweet_in.reply_to_id))
+                paths.append({"id": tweet_id, "root_id": root_id, "depth": depth, "path": path})
+            db.execute(update(Tweet), paths)
+            
+            for parent_id, amount in Counter(tweet_in.reply_to_id for _, tweet_in in rows if tweet_in.reply_to_id).items():
+                self.increment_counter(db, parent_id, "replies_count", amount)
+            
+            hashtag_service.process_tweets(db, [
+                (tweet_id, author_id, tweet_in.content)
+                for (_, tweet_in), (tweet_id, _) in zip(rows, inserted)
+            ])
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"[BULK] Error en lote de {len(rows)} tweets: {e}")
+            errors.extend({"index": index, "error": "Database error"} for index, _ in rows)
+            return
+        
+        for (index, _), (tweet_id, _) in zip(rows, inserted):
+            ids[index] = tweet_id
+        search_service.index_tweets(
+            (tweet_id, tweet_in.content, created_at)
+            for (_, tweet_in), (tweet_id, created_at) in zip(rows, inserted)
+        )
+        timeline_service.push_many(db, author_id, [
+            (tweet_id, created_at)
+            for (_, tweet_in), (tweet_id, created_at) in zip(rows, inserted)
+            if not tweet_in.reply_to_id
+        ])
+    
+    def get(self, db: Session, tweet_id: int, current_user_id: Optional[int] = None):
+        tweets = self.hydrate_ids(db, [tweet_id], current_user_id)
+        if tweets:
+            return tweets[0]
         return None
     
-    def get_by_user(self, db: Session, user_id: int, skip: int = 0, limit: int = 20, current_user_id: Optional[int] = None):
-        tweets = (
-            db.query(Tweet)
-            .options(
-                joinedload(Tweet.author),
-                joinedload(Tweet.reply_to).joinedload(Tweet.author)
-            )
+    async def get_async(self, db: AsyncSession, tweet_id: int, current_user_id: Optional[int] = None):
+        # La hidratación reutiliza el código síncrono sobre la conexión async
+        return await db.run_sync(self.get, tweet_id, current_user_id)
+    
+    def get_by_user(self, db: Session, user_id: int, skip: int = 0, limit: int = 20, current_user_id: Optional[int] = None, cursor: Optional[Cursor] = None):
+        query = (
+            db.query(Tweet.id)
             .filter(Tweet.author_id == user_id)
             .filter(Tweet.reply_to_id.is_(None))  # AGREGAR ESTE FILTRO
-            .order_by(Tweet.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
+        rows = keyset_paginate(query, Tweet.created_at, Tweet.id, cursor, skip, limit).all()
         
-        return [self._enrich_tweet(db, tweet, current_user_id) for tweet in tweets]
+        return self.hydrate_ids(db, [row.id for row in rows], current_user_id)
     
-    def get_feed(self, db: Session, user_id: int, skip: int = 0, limit: int = 20):
-        following_ids = db.query(Follow.followed_id).filter(Follow.follower_id == user_id).subquery()
-        
-        tweets = (
-            db.query(Tweet)
-            .options(
-                joinedload(Tweet.author),
-                joinedload(Tweet.reply_to).joinedload(Tweet.author)
-            )
-            .filter(
-                (Tweet.author_id.in_(following_ids)) | 
-                (Tweet.author_id == user_id)
-            )
-            .filter(Tweet.reply_to_id.is_(None))  # AGREGAR ESTE FILTRO
-            .order_by(Tweet.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+    def get_feed_ids(self, db: Session, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None) -> List[int]:
+        """IDs de una página del feed, sin hidratar"""
+        from app.services.timeline import timeline_service
+
+        # Camino rápido: timeline materializado
+        tweet_ids = timeline_service.get_page(db, user_id, skip=skip, limit=limit, cursor=cursor)
+        if tweet_ids is not None:
+            return tweet_ids
         
-        return [self._enrich_tweet(db, tweet, user_id) for tweet in tweets]
+        # Página más allá de lo materializado: leer de la base de datos
+        query = timeline_service.feed_query(db, user_id).with_entities(Tweet.id)
+        rows = keyset_paginate(query, Tweet.created_at, Tweet.id, cursor, skip, limit).all()
+        return [row.id for row in rows]
     
-    def get_all_public(self, db: Session, skip: int = 0, limit: int = 20, current_user_id: Optional[int] = None):
-        tweets = (
-            db.query(Tweet)
-            .options(
-                joinedload(Tweet.author),
-                joinedload(Tweet.reply_to).joinedload(Tweet.author)
-            )
+    def get_feed(self, db: Session, user_id: int, skip: int = 0, limit: int = 20, cursor: Optional[Cursor] = None):
+        tweet_ids = self.get_feed_ids(db, user_id, skip=skip, limit=limit, cursor=cursor)
+        return self.hydrate_ids(db, tweet_ids, user_id)
+    
+    def get_all_public(self, db: Session, skip: int = 0, limit: int = 20, current_user_id: Optional[int] = None, cursor: Optional[Cursor] = None):
+        query = (
+            db.query(Tweet.id)
             .filter(Tweet.reply_to_id.is_(None))  # AGREGAR ESTE FILTRO
-            .order_by(Tweet.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
         )
+        rows = keyset_paginate(query, Tweet.created_at, Tweet.id, cursor, skip, limit).all()
         
-        return [self._enrich_tweet(db, tweet, current_user_id) for tweet in tweets]
+        return self.hydrate_ids(db, [row.id for row in rows], current_user_id)
     
     # NUEVO: Obtener respuestas de un tweet
-    def get_replies(self, db: Session, tweet_id: int, skip: int = 0, limit: int = 50, current_user_id: Optional[int] = None):
+    def get_replies(self, db: Session, tweet_id: int, skip: int = 0, limit: int = 50, current_user_id: Optional[int] = None, cursor: Optional[Cursor] = None):
         """Obtener todas las respuestas directas a un tweet"""
-        replies = (
-            db.query(Tweet)
-            .options(joinedload(Tweet.author))
-            .filter(Tweet.reply_to_id == tweet_id)
-            .order_by(Tweet.created_at.asc())  # Más antiguas primero en replies
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = db.query(Tweet.id).filter(Tweet.reply_to_id == tweet_id)
+        # Más antiguas primero en replies
+        rows = keyset_paginate(query, Tweet.created_at, Tweet.id, cursor, skip, limit, ascending=True).all()
         
-        return [self._enrich_tweet(db, reply, current_user_id) for reply in replies]
+        return self.hydrate_ids(db, [row.id for row in rows], current_user_id)
     
     # NUEVO: Obtener un thread completo
-    def get_thread(self, db: Session, tweet_id: int, current_user_id: Optional[int] = None):
+    def get_thread(self, db: Session, tweet_id: int, current_user_id: Optional[int] = None, max_depth: int = 10, branch_limit: int = 20, max_replies: int = 500):
         """
         Obtener un thread completo:
         1. El tweet principal
         2. Todos los tweets padres (si es una respuesta)
         3. Todas las respuestas
+
+        Los ancestros salen de una CTE recursiva y los descendientes de una
+        query por nivel (_get_descendant_rows); se hidratan juntos en un solo
+        lote y el árbol se arma en memoria.
+        Cada nodo muestra como mucho `branch_limit` respuestas directas; si
+        tiene más, trae "replies_cursor" para seguir con GET /tweets/{id}/replies.
         """
-        # Obtener el tweet principal
-        main_tweet = db.query(Tweet).options(
-            joinedload(Tweet.author),
-            joinedload(Tweet.reply_to).joinedload(Tweet.author)
-        ).filter(Tweet.id == tweet_id).first()
+        # Obtener el tweet principal (del cache si está)
+        main_tweet = self._get_tweet_entries(db, [tweet_id], {}).get(tweet_id)
         
         if not main_tweet:
             return None
         
-        # Obtener la cadena de tweets padres (ir hacia arriba)
-        parent_chain = []
-        current_parent = main_tweet.reply_to
-        while current_parent:
-            parent_chain.insert(0, self._enrich_tweet(db, current_parent, current_user_id))
-            current_parent = current_parent.reply_to
+        if main_tweet["path"] is not None:
+            parent_ids = self.path_ids(main_tweet["path"])[:-1]
+        else:
+            parent_ids = self._get_ancestor_ids(db, main_tweet["reply_to_id"])
+        reply_rows = self._get_descendant_rows(db, tweet_id, max_depth, branch_limit, max_replies)
+        
+        tweet_ids = parent_ids + [tweet_id] + [row.id for row in reply_rows]
+        hydrated = {item["id"]: item for item in self.hydrate_ids(db, tweet_ids, current_user_id)}
         
-        # Obtener todas las respuestas (recursivamente)
-        replies = self._get_replies_recursive(db, tweet_id, current_user_id)
+        # Armar el árbol: las filas vienen por nivel y en orden dentro de cada rama
+        main_data = hydrated[tweet_id]
+        nodes = {tweet_id: main_data}
+        main_data["nested_replies"] = []
+        for row in reply_rows:
+            parent = nodes.get(row.reply_to_id)
+            reply = hydrated.get(row.id)
+            if parent is None or reply is None:
+                continue  # Rama recortada por max_replies o tweet borrado
+            reply["nested_replies"] = []
+            parent["nested_replies"].append(reply)
+            nodes[row.id] = reply
         
+        for node in nodes.values():
+            shown = node["nested_replies"]
+            node["has_more_replies"] = node["replies_count"] > len(shown)
+            node["replies_cursor"] = (
+                encode_cursor(shown[-1]["created_at"], shown[-1]["id"])
+                if shown and node["has_more_replies"] else None
+            )
+        
+        replies = main_data.pop("nested_replies")
         return {
-            "parent_chain": parent_chain,
-            "main_tweet": self._enrich_tweet(db, main_tweet, current_user_id),
+            "parent_chain": [hydrated[parent_id] for parent_id in parent_ids if parent_id in hydrated],
+            "main_tweet": main_data,
             "replies": replies,
-            "total_replies": len(replies)
+            "total_replies": main_data["replies_count"],
+            "total_subtree_replies": self.get_subtree_count(db, main_tweet["root_id"], main_tweet["path"]),
+            "has_more_replies": main_data.pop("has_more_replies"),
+            "replies_cursor": main_data.pop("replies_cursor")
         }
     
-    def _get_replies_recursive(self, db: Session, tweet_id: int, current_user_id: Optional[int] = None, max_depth: int = 10, current_depth: int = 0):
-        """Obtener respuestas recursivamente (con límite de profundidad)"""
-        if current_depth >= max_depth:
+    def path_ids(self, path: str) -> List[int]:
+        """IDs de un path materializado, desde la raíz"""
+        return [int(segment) for segment in path.split(".")]
+    
+    def _get_ancestor_ids(self, db: Session, reply_to_id: Optional[int]) -> List[int]:
+        """IDs de la cadena de padres (desde la raíz) con una CTE recursiva"""
+        if not reply_to_id:
             return []
         
-        direct_replies = (
-            db.query(Tweet)
-            .options(joinedload(Tweet.author))
-            .filter(Tweet.reply_to_id == tweet_id)
-            .order_by(Tweet.created_at.asc())
-            .all()
+        ancestors = (
+            select(Tweet.id, Tweet.reply_to_id, literal(1).label("depth"))
+            .where(Tweet.id == reply_to_id)
+            .cte("ancestors", recursive=True)
         )
-        
-        result = []
-        for reply in direct_replies:
-            enriched_reply = self._enrich_tweet(db, reply, current_user_id)
-            # Agregar respuestas anidadas
-            enriched_reply["nested_replies"] = self._get_replies_recursive(
-                db, reply.id, current_user_id, max_depth, current_depth + 1
+        ancestors = ancestors.union_all(
+            select(Tweet.id, Tweet.reply_to_id, ancestors.c.depth + 1)
+            .where(Tweet.id == ancestors.c.reply_to_id)
+        )
+        rows = db.execute(select(ancestors.c.id).order_by(ancestors.c.depth.desc())).all()
+        return [row.id for row in rows]
+    
+    def _get_descendant_rows(self, db: Session, tweet_id: int, max_depth: int, branch_limit: int, max_replies: int):
+        """
+        Respuestas (id, reply_to_id, depth) hasta max_depth, limitadas a
+        branch_limit por padre y ordenadas por nivel y por (created_at, id)
+        dentro de cada rama.
+
+        Se recorre nivel por nivel (una query por nivel, como mucho max_depth):
+        cada nivel numera las respuestas de cada padre (row_number por
+        reply_to_id) y solo se baja por las que quedaron. Una CTE recursiva
+        recorría el subárbol entero y recién después recortaba; así lo leído
+        depende de lo que se muestra y no del tamaño del thread.
+        """
+        rows = []
+        parent_ids = [tweet_id]
+        for depth in range(1, max_depth + 1):
+            remaining = max_replies - len(rows)
+            if not parent_ids or remaining <= 0:
+                break
+            ranked = (
+                select(
+                    Tweet.id,
+                    Tweet.reply_to_id,
+                    func.row_number().over(
+                        partition_by=Tweet.reply_to_id,
+                        order_by=(Tweet.created_at.asc(), Tweet.id.asc())
+                    ).label("position")
+                )
+                .where(Tweet.reply_to_id.in_(parent_ids))
+                .subquery()
             )
-            result.append(enriched_reply)
-        
+            level = db.execute(
+                select(ranked.c.id, ranked.c.reply_to_id, literal(depth).label("depth"))
+                .where(ranked.c.position <= branch_limit)
+                .order_by(ranked.c.reply_to_id, ranked.c.position)
+                .limit(remaining)
+            ).all()
+            rows.extend(level)
+            parent_ids = [row.id for row in level]
+        return rows
+    
+    def _subtree_filter(self, root_id: int, path: str):
+        """Descendientes de un tweet: un rango del índice (root_id, path)"""
+        return and_(Tweet.root_id == root_id, Tweet.path.like(f"{path}.%"))
+    
+    def get_subtree_count(self, db: Session, root_id: Optional[int], path: Optional[str]) -> int:
+        """Cantidad de respuestas en todo el subárbol del tweet con ese root_id/path"""
+        if path is None:
+            return 0
+        return db.query(func.count(Tweet.id)).filter(self._subtree_filter(root_id, path)).scalar()
+    
+    def get_conversation(self, db: Session, tweet: Tweet, skip: int = 0, limit: int = 50, current_user_id: Optional[int] = None) -> List[dict]:
+        """Todos los tweets de la conversación de un tweet, en orden de árbol (por path)"""
+        if tweet.path is None:
+            return []
+        rows = (
+            db.query(Tweet.id, Tweet.depth)
+            .filter(Tweet.root_id == tweet.root_id)
+            .order_by(Tweet.path)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        depths = {row.id: row.depth for row in rows}
+        result = self.hydrate_ids(db, [row.id for row in rows], current_user_id)
+        for item in result:
+            item["depth"] = depths[item["id"]]
         return result
     
+    def get_top_branches(self, db: Session, tweet: Tweet, limit: int = 5, current_user_id: Optional[int] = None) -> List[dict]:
+        """Respuestas directas de un tweet con más actividad debajo (tamaño de su subárbol)"""
+        if tweet.path is None:
+            return []
+        branch_path = func.substr(Tweet.path, 1, len(tweet.path) + 1 + PATH_SEGMENT_WIDTH).label("branch_path")
+        rows = (
+            db.query(branch_path, func.count(Tweet.id).label("size"))
+            .filter(self._subtree_filter(tweet.root_id, tweet.path))
+            .group_by(branch_path)
+            .order_by(func.count(Tweet.id).desc(), branch_path)
+            .limit(limit)
+            .all()
+        )
+        sizes = {int(row.branch_path[-PATH_SEGMENT_WIDTH:]): row.size for row in rows}
+        children = self.hydrate_ids(db, list(sizes), current_user_id)
+        return [
+            # El subárbol incluye a la propia respuesta
+            {"tweet": child, "branch_replies": sizes[child["id"]] - 1}
+            for child in children
+        ]
+    
     # NUEVO: Contar respuestas
     def get_replies_count(self, db: Session, tweet_id: int) -> int:
         return db.query(Tweet).filter(Tweet.reply_to_id == tweet_id).count()
     
-    def _enrich_tweet(self, db: Session, tweet: Tweet, current_user_id: Optional[int] = None):
-        """Enriquecer tweet con información adicional"""
-        from app.services.like import like_service
-        from app.services.retweet import retweet_service
+    def get_replies_counts(self, db: Session, tweet_ids: List[int]) -> Dict[int, int]:
+        """Contar respuestas de varios tweets en una sola query"""
+        if not tweet_ids:
+            return {}
+        rows = (
+            db.query(Tweet.reply_to_id, func.count(Tweet.id))
+            .filter(Tweet.reply_to_id.in_(tweet_ids))
+            .group_by(Tweet.reply_to_id)
+            .all()
+        )
+        return dict(rows)
+    
+    def increment_counter(self, db: Session, tweet_id: int, counter: str, amount: int = 1):
+        """
+        Actualizar un contador desnormalizado de forma atómica (x = x + amount).
+        No hace commit: se confirma junto con el like/retweet/reply que lo provoca.
+        """
+        column = getattr(Tweet, counter)
+        db.query(Tweet).filter(Tweet.id == tweet_id).update(
+            {column: column + amount}, synchronize_session=False
+        )
+        self.invalidate(db, [tweet_id])
+    
+    def invalidate(self, db: Optional[Session], tweet_ids: Iterable[int]):
+        """
+        Sacar tweets del cache y avanzar su versión (ETags). Con una sesión,
+        recién después del commit (app.db.hooks): antes no cambió nada que
+        otra request pueda leer, y lo que se cachee en el medio queda viejo
+        con el bump. En una AsyncSession eso corre en el threadpool, no
+        dentro del run_sync que cambió el contador.
+        """
+        keys = [("tweet", tweet_id) for tweet_id in tweet_ids]
+        if db is None:
+            self._invalidate_keys(keys)
+        else:
+            db.info.setdefault(PENDING_INVALIDATIONS_KEY, set()).update(keys)
+    
+    def invalidate_user(self, user_id: int):
+        """Sacar del cache el autor (nombre, avatar...) que se muestra en sus tweets"""
+        self._invalidate_keys([("user", user_id)])
+    
+    def _invalidate_keys(self, keys: List[tuple]):
+        self.cache.delete_many(keys)
+        version_store.bump_many(keys)
+    
+    def _cached(self, keys: List[tuple], peek: bool = False) -> Dict[tuple, dict]:
+        """
+        Entradas del cache que siguen vigentes. El cache es de cada proceso y
+        las invalidaciones de otros workers no le llegan: cada entrada guarda
+        la versión (version_store, compartido) leída antes de consultar la
+        base, y se descarta si la versión actual es otra.
+        """
+        found = self.cache.peek_many(keys) if peek else self.cache.get_many(keys)
+        if not found:
+            return {}
+        keys = list(found)
+        fresh = {}
+        stale = []
+        for key, version in zip(keys, version_store.get_many(keys)):
+            cached_version, entry = found[key]
+            if cached_version == version:
+                fresh[key] = entry
+            else:
+                stale.append(key)
+        if stale:
+            self.cache.delete_many(stale)
+        return fresh
+
+    def version_stamp(self, db: Session, tweet_ids: List[int]) -> Optional[list]:
+        """
+        Sello de versión de unos tweets tal como los devuelve hydrate_ids,
+        sin ir a la base de datos: versiones de cada tweet, de su autor y de
+        su padre (el snippet de reply_to). Los flags del lector cambian con
+        los contadores, que también avanzan la versión del tweet.
 
-        tweet_data = {
+        None si algún tweet no está en cache (no se conoce su autor): el
+        llamador responde completo y el siguiente pedido ya tiene sello.
+        hydrate_ids lee las versiones después que este sello, así que el
+        cuerpo nunca es más viejo que el ETag.
+        """
+        entries = self._cached([("tweet", tweet_id) for tweet_id in tweet_ids], peek=True)
+        keys = []
+        for tweet_id in tweet_ids:
+            entry = entries.get(("tweet", tweet_id))
+            if entry is None:
+                return None
+            keys.append(("tweet", tweet_id))
+            keys.append(("user", entry["author_id"]))
+            if entry["reply_to_id"]:
+                keys.append(("tweet", entry["reply_to_id"]))
+        versions = read_versions(db, keys)
+        return [tweet_ids, versions] if versions is not None else None
+    
+    def _tweet_entry(self, tweet: Tweet) -> dict:
+        return {
             "id": tweet.id,
             "content": tweet.content,
             "image_url": tweet.image_url,
             "author_id": tweet.author_id,
             "reply_to_id": tweet.reply_to_id,
             "created_at": tweet.created_at,
-            "author": tweet.author,
-            "likes_count": like_service.get_likes_count(db, tweet.id),
-            "retweets_count": retweet_service.get_retweets_count(db, tweet.id),
-            "replies_count": self.get_replies_count(db, tweet.id),
-            "is_liked_by_user": False,
-            "is_retweeted_by_user": False
+            "likes_count": tweet.likes_count,
+            "retweets_count": tweet.retweets_count,
+            "replies_count": tweet.replies_count,
+            # Posición en el árbol: se usa internamente, no va en la respuesta
+            "root_id": tweet.root_id,
+            "depth": tweet.depth,
+            "path": tweet.path
         }
+    
+    def _user_entry(self, user: User) -> dict:
+        return UserPublic.model_validate(user).model_dump()
+    
+    def _get_tweet_entries(self, db: Session, tweet_ids: List[int], users: Dict[int, dict], loaded: Iterable[Tweet] = ()) -> Dict[int, dict]:
+        """
+        Entradas cacheables de varios tweets: las ya cargadas (loaded), luego
+        el cache y el resto con una query IN que también trae a los autores
+        (se dejan en `users`, sin cachearlos: su versión no se leyó antes).
+        Las cargadas se usan pero no se cachean, por lo mismo.
+        """
+        entries = {}
+        for tweet in loaded:
+            entries[tweet.id] = self._tweet_entry(tweet)
+            if tweet.author_id not in users:
+                users[tweet.author_id] = self._user_entry(tweet.author)
+        
+        missing = [tweet_id for tweet_id in tweet_ids if tweet_id not in entries]
+        if missing:
+            cached = self._cached([("tweet", tweet_id) for tweet_id in missing])
+            entries.update({key[1]: entry for key, entry in cached.items()})
+            missing = [tweet_id for tweet_id in missing if tweet_id not in entries]
+        
+        if missing:
+            # Lo leído de una réplica puede venir atrasado: se usa, pero no se cachea
+            keys = [("tweet", tweet_id) for tweet_id in missing]
+            versions = dict(zip(keys, version_store.get_many(keys))) if not db.info.get("replica") else {}
+            # populate_existing: la sesión puede tener el tweet viejo (p. ej. una
+            # AsyncSession sin expire_on_commit tras incrementar un contador)
+            tweets = (
+                db.query(Tweet)
+                .options(joinedload(Tweet.author))
+                .filter(Tweet.id.in_(missing))
+                .populate_existing()
+                .all()
+            )
+            for tweet in tweets:
+                entries[tweet.id] = self._tweet_entry(tweet)
+                if versions:
+                    self.cache.set(("tweet", tweet.id), (versions[("tweet", tweet.id)], entries[tweet.id]))
+                if tweet.author_id not in users:
+                    users[tweet.author_id] = self._user_entry(tweet.author)
+        return entries
+    
+    def _get_user_entries(self, db: Session, user_ids: Iterable[int], users: Dict[int, dict]) -> Dict[int, dict]:
+        """Completar `users` con los autores que falten (cache y después una query IN)"""
+        missing = [user_id for user_id in set(user_ids) if user_id not in users]
+        if missing:
+            cached = self._cached([("user", user_id) for user_id in missing])
+            users.update({key[1]: entry for key, entry in cached.items()})
+            missing = [user_id for user_id in missing if user_id not in users]
+        
+        if missing:
+            keys = [("user", user_id) for user_id in missing]
+            versions = dict(zip(keys, version_store.get_many(keys))) if not db.info.get("replica") else {}
+            for user in db.query(User).filter(User.id.in_(missing)).populate_existing().all():
+                users[user.id] = self._user_entry(user)
+                if versions:
+                    self.cache.set(("user", user.id), (versions[("user", user.id)], users[user.id]))
+        return users
+    
+    def hydrate_ids(self, db: Session, tweet_ids: List[int], current_user_id: Optional[int] = None, loaded: Iterable[Tweet] = ()) -> List[dict]:
+        """
+        Tweets listos para la respuesta, en el orden de tweet_ids (omite los
+        que ya no existen). La parte común a todos los lectores (contenido,
+        contadores, autor y snippet de reply_to) sale del cache y solo se va a
+        la base de datos por lo que falta, en lotes; los flags del usuario
+        actual se consultan siempre (una query IN por flag).
+        """
+        from app.services.like import like_service
+        from app.services.retweet import retweet_service
+
+        if not tweet_ids:
+            return []
+
+        users: Dict[int, dict] = {}
+        entries = self._get_tweet_entries(db, tweet_ids, users, loaded)
+        parent_ids = {
+            entry["reply_to_id"] for entry in entries.values()
+            if entry["reply_to_id"] and entry["reply_to_id"] not in entries
+        }
+        parents = dict(entries)
+        parents.update(self._get_tweet_entries(db, list(parent_ids), users))
+        self._get_user_entries(db, [entry["author_id"] for entry in parents.values()], users)
+
+        found_ids = [tweet_id for tweet_id in tweet_ids if tweet_id in entries]
+        liked_ids = set()
+        retweeted_ids = set()
+        if current_user_id and found_ids:
+            liked_ids = like_service.get_liked_tweet_ids(db, found_ids, current_user_id)
+            retweeted_ids = retweet_service.get_retweeted_tweet_ids(db, found_ids, current_user_id)
 
-        if tweet.reply_to:
-            tweet_data["reply_to"] = {
-                "id": tweet.reply_to.id,
-                "content": tweet.reply_to.content,
-                "author": tweet.reply_to.author,
-                "created_at": tweet.reply_to.created_at
+        result = []
+        for tweet_id in found_ids:
+            entry = entries[tweet_id]
+            tweet_data = {
+                "id": entry["id"],
+                "content": entry["content"],
+                "image_url": entry["image_url"],
+                "author_id": entry["author_id"],
+                "reply_to_id": entry["reply_to_id"],
+                "created_at": entry["created_at"],
+                "author": dict(users[entry["author_id"]]),
+                "likes_count": entry["likes_count"],
+                "retweets_count": entry["retweets_count"],
+                "replies_count": entry["replies_count"],
+                "is_liked_by_user": tweet_id in liked_ids,
+                "is_retweeted_by_user": tweet_id in retweeted_ids
             }
 
-        if current_user_id:
-            tweet_data["is_liked_by_user"] = like_service.is_liked_by_user(db, tweet.id, current_user_id)
-            tweet_data["is_retweeted_by_user"] = retweet_service.is_retweeted_by_user(db, tweet.id, current_user_id)
+            parent = parents.get(entry["reply_to_id"])
+            if parent:
+                tweet_data["reply_to"] = {
+                    "id": parent["id"],
+                    "content": parent["content"],
+                    "author": dict(users[parent["author_id"]]),
+                    "created_at": parent["created_at"]
+                }
+
+            result.append(tweet_data)
 
-        return tweet_data
+        return result
+    
+    def hydrate_tweets(self, db: Session, tweets: List[Tweet], current_user_id: Optional[int] = None) -> List[dict]:
+        """
+        Como hydrate_ids, para tweets ya cargados (con author precargado):
+        se usan sus valores sin volver a pedirlos.
+        """
+        return self.hydrate_ids(db, [tweet.id for tweet in tweets], current_user_id, loaded=tweets)
     
     def update(self, db: Session, db_tweet: Tweet, tweet_in: TweetUpdate) -> Tweet:
         update_data = tweet_in.dict(exclude_unset=True)
@@ -215,6 +707,10 @@ class TweetService:
         db.add(db_tweet)
         db.commit()
         db.refresh(db_tweet)
+        self.invalidate(None, [db_tweet.id])
+        if "content" in update_data:
+            from app.services.search import search_service
+            search_service.index_tweets([(db_tweet.id, db_tweet.content, db_tweet.created_at)], edited=True)
         return db_tweet
     
     def delete(self, db: Session, tweet_id: int, user_id: int) -> bool:
@@ -226,8 +722,27 @@ class TweetService:
         if not tweet:
             return False
         
+        if tweet.reply_to_id:
+            self.increment_counter(db, tweet.reply_to_id, "replies_count", -1)
         db.delete(tweet)
         db.commit()
+        self.invalidate(None, [tweet_id])
+        from app.services.search import search_service
+        search_service.remove_tweets([tweet_id])
+        
+        if not tweet.reply_to_id:
+            from app.services.timeline import timeline_service
+            timeline_service.remove_tweet(db, tweet_id, user_id)
         return True
 
-tweet_service = TweetService()
\ No newline at end of file
+tweet_service = TweetService()
+
+@after_commit
+def _apply_pending_invalidations(session: Session):
+    keys = session.info.pop(PENDING_INVALIDATIONS_KEY, None)
+    if keys:
+        tweet_service._invalidate_keys(list(keys))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session: Session):
+    session.info.pop(PENDING_INVALIDATIONS_KEY, None)
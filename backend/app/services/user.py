@@ -1,12 +1,33 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import time
+from typing import Dict, Iterable, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy import select
+from app.core.cache import TinyLFUCache
+from app.core.config import settings
+from app.core.version_store import version_store
 from app.models.user import User
 from app.models.follow import Follow
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import get_password_hash, verify_password
+from app.services.timeline import timeline_service
+from app.services.tweet import tweet_service
 
 class UserService:
+    def __init__(self):
+        # token -> columnas del usuario. El cache es de cada proceso: cada
+        # entrada guarda la versión ("principal", id) del version_store
+        # (compartido entre workers) con la que se leyó, e invalidar un usuario
+        # avanza esa versión y deja viejas a las entradas de todos sus tokens
+        self.principal_cache = TinyLFUCache(settings.principal_cache_max_bytes, ttl_seconds=settings.principal_cache_ttl_seconds)
+        # username -> id, para resolver menciones sin ir a la base de datos
+        self.username_cache = TinyLFUCache(
+            settings.username_cache_max_bytes,
+            ttl_seconds=settings.username_cache_ttl_seconds,
+            expected_entry_size=128
+        )
+    
     def get(self, db: Session, id: int) -> Optional[User]:
         return db.query(User).filter(User.id == id).first()
     
@@ -16,6 +37,20 @@ class UserService:
     def get_by_username(self, db: Session, username: str) -> Optional[User]:
         return db.query(User).filter(User.username == username).first()
     
+    def get_ids_by_usernames(self, db: Session, usernames: Iterable[str]) -> Dict[str, int]:
+        """IDs de varios usernames (los que no existen no aparecen): del cache y una query IN para el resto"""
+        usernames = set(usernames)
+        found = self.username_cache.get_many(usernames)
+        missing = usernames - found.keys()
+        if missing:
+            for username, user_id in db.query(User.username, User.id).filter(User.username.in_(missing)).all():
+                found[username] = user_id
+                self.username_cache.set(username, user_id)
+        return found
+    
+    async def get_by_username_async(self, db: AsyncSession, username: str) -> Optional[User]:
+        return await db.scalar(select(User).where(User.username == username))
+    
     def create(self, db: Session, user_in: UserCreate) -> User:
         hashed_password = get_password_hash(user_in.password)
         db_user = User(
@@ -30,14 +65,95 @@ class UserService:
         return db_user
     
     def update(self, db: Session, db_user: User, user_in: UserUpdate) -> User:
+        old_username = db_user.username
         update_data = user_in.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_user, field, value)
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        tweet_service.invalidate_user(db_user.id)
+        self.invalidate_principal(db_user.id)
+        if db_user.username != old_username:
+            self.username_cache.delete(old_username)
+        # Las listas de conversaciones muestran el perfil del otro usuario
+        version_store.bump("profiles")
+        return db_user
+    
+    def deactivate(self, db: Session, db_user: User) -> User:
+        db_user.is_active = False
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        self.invalidate_principal(db_user.id)
         return db_user
     
+    def _principal_key(self, user_id: int) -> tuple:
+        return ("principal", user_id)
+    
+    def _cached_principal(self, token: str) -> Optional[User]:
+        """Usuario (desadjuntado) de un token ya validado, armado desde las columnas cacheadas"""
+        cached = self.principal_cache.get(token)
+        if cached is None:
+            return None
+        user_id = cached["columns"]["id"]
+        if cached["expires_at"] <= time.time() or cached["version"] != version_store.get(self._principal_key(user_id)):
+            self.principal_cache.delete(token)
+            return None
+        
+        user = User(**cached["columns"])
+        make_transient_to_detached(user)
+        return user
+    
+    def _cache_principal(self, token: str, user: User, version: int, expires_at: Optional[float]):
+        self.principal_cache.set(token, {
+            "version": version,
+            "expires_at": expires_at if expires_at is not None else float("inf"),
+            "columns": {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        })
+    
+    def get_cached_principal(self, db: Session, token: str) -> Optional[User]:
+        """
+        Usuario de un token ya validado, sin ir a la base de datos: se
+        adjunta a la sesión con merge(load=False), que no hace SELECT.
+        """
+        user = self._cached_principal(token)
+        if user is None:
+            return None
+        return db.merge(user, load=False)
+    
+    async def get_cached_principal_async(self, db: AsyncSession, token: str) -> Optional[User]:
+        # La versión puede estar en Redis (cliente síncrono): fuera del event loop
+        user = await run_in_threadpool(self._cached_principal, token)
+        if user is None:
+            return None
+        return await db.merge(user, load=False)
+    
+    def load_principal(self, db: Session, token: str, username: str, expires_at: Optional[float] = None) -> Optional[User]:
+        """
+        Cargar el usuario de un token recién decodificado y cachearlo hasta su
+        exp. El id se conoce recién al leerlo: la versión se toma después y la
+        fila se vuelve a leer (refresh), así lo cacheado nunca es anterior a
+        su versión aunque otro worker lo invalide en el medio.
+        """
+        user = self.get_by_username(db, username=username)
+        if user is not None:
+            version = version_store.get(self._principal_key(user.id))
+            db.refresh(user)
+            self._cache_principal(token, user, version, expires_at)
+        return user
+    
+    async def load_principal_async(self, db: AsyncSession, token: str, username: str, expires_at: Optional[float] = None) -> Optional[User]:
+        user = await self.get_by_username_async(db, username)
+        if user is not None:
+            version = await run_in_threadpool(version_store.get, self._principal_key(user.id))
+            await db.refresh(user)
+            self._cache_principal(token, user, version, expires_at)
+        return user
+    
+    def invalidate_principal(self, user_id: int):
+        version_store.bump(self._principal_key(user_id))
+    
     def authenticate(self, db: Session, username: str, password: str) -> Optional[User]:
         user = self.get_by_username(db, username=username)
         if not user:
@@ -46,6 +162,23 @@ class UserService:
             return None
         return user
     
+    def _update_follow_counts(self, db: Session, follower_id: int, followed_id: int, amount: int):
+        """
+        Contadores desnormalizados de un follow/unfollow (x = x + amount), en
+        la misma transacción que la fila de follows. Ver reconcile_follow_counts.
+        """
+        db.query(User).filter(User.id == followed_id).update(
+            {User.followers_count: User.followers_count + amount}, synchronize_session=False
+        )
+        db.query(User).filter(User.id == follower_id).update(
+            {User.following_count: User.following_count + amount}, synchronize_session=False
+        )
+    
+    def _invalidate_follow_counts(self, follower_id: int, followed_id: int):
+        for user_id in (follower_id, followed_id):
+            tweet_service.invalidate_user(user_id)
+            self.invalidate_principal(user_id)
+    
     def get_followers_count(self, db: Session, user_id: int) -> int:
         return db.query(Follow).filter(Follow.followed_id == user_id).count()
     
@@ -65,7 +198,24 @@ class UserService:
         
         follow = Follow(follower_id=follower_id, followed_id=followed_id)
         db.add(follow)
+        self._update_follow_counts(db, follower_id, followed_id, 1)
         db.commit()
+        self._invalidate_follow_counts(follower_id, followed_id)
+        # Se reconstruye en la próxima lectura, ya con los tweets del nuevo seguido
+        timeline_service.invalidate(follower_id)
+        return True
+    
+    async def follow_user_async(self, db: AsyncSession, follower_id: int, followed_id: int) -> bool:
+        """Como follow_user, sobre una AsyncSession (no bloquea el event loop)"""
+        if await db.run_sync(self.is_following, follower_id, followed_id):
+            return False
+        
+        db.add(Follow(follower_id=follower_id, followed_id=followed_id))
+        await db.run_sync(self._update_follow_counts, follower_id, followed_id, 1)
+        await db.commit()
+        # El version_store y el store de timelines pueden ser Redis (cliente síncrono)
+        await run_in_threadpool(self._invalidate_follow_counts, follower_id, followed_id)
+        await run_in_threadpool(timeline_service.invalidate, follower_id)
         return True
     
     def unfollow_user(self, db: Session, follower_id: int, followed_id: int) -> bool:
@@ -78,7 +228,10 @@ class UserService:
             return False
         
         db.delete(follow)
+        self._update_follow_counts(db, follower_id, followed_id, -1)
         db.commit()
+        self._invalidate_follow_counts(follower_id, followed_id)
+        timeline_service.remove_author(db, follower_id, followed_id)
         return True
 
 user_service = UserService()
\ No newline at end of file
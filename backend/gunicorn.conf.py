@@ -0,0 +1,20 @@
+"""
+Configuración de gunicorn (se lee sola al lanzarlo desde backend/):
+
+    gunicorn app.main:app
+
+Los workers salen de WEB_CONCURRENCY, la misma variable que lee Settings
+para rechazar los backends "memory" con más de un proceso. Si se pasa -w en
+la línea de comandos, on_starting publica el valor real antes de que los
+workers importen la aplicación (con preload_app la aplicación se importa
+antes: usar WEB_CONCURRENCY).
+"""
+import os
+
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+
+def on_starting(server):
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
@@ -0,0 +1,73 @@
+"""
+Configuración común de los tests: base SQLite temporal (antes de importar
+la aplicación, que lee settings y crea las tablas al importarse) y el
+directorio backend en sys.path para importar `app`.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="twitter-tests-")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(TEST_DIR, "test.db"))
+
+
+@pytest.fixture
+def db():
+    """Sesión sobre tablas recién creadas (vacías en cada test)"""
+    from app.main import app  # noqa: F401 (registra los modelos y crea el índice de búsqueda)
+    from app.models import retweet  # noqa: F401
+    from app.db.base import Base
+    from app.db.database import engine
+    from app.db.search_index import ensure_search_index
+    from app.db.session import SessionLocal
+    from app.services.tweet import tweet_service
+    from app.services.user import user_service
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    tweet_service.cache.clear()
+    user_service.principal_cache.clear()
+    user_service.username_cache.clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Clientes de app.core.redis sobre un Redis falso compartido"""
+    fakeredis = pytest.importorskip("fakeredis")
+    import app.core.redis as redis_module
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis_module, "_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(redis_module, "_binary_client", fakeredis.FakeRedis(server=server))
+    return redis_module.get_redis()
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(client):
+    """Registrar un usuario y devolver los headers con su token"""
+    def login(username: str) -> dict:
+        client.post("/api/v1/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": "secret"
+        })
+        response = client.post("/api/v1/auth/login", data={"username": username, "password": "secret"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return login
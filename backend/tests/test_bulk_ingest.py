@@ -0,0 +1,113 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from app.db.upsert import insert_for_dialect
+from app.models.hashtag import Hashtag, tweet_hashtags
+from app.models.mention import Mention
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services import hashtag as hashtag_module
+from app.services.tweet import tweet_service
+
+
+@pytest.fixture
+def users(db):
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    bob = User(username="bob", email="bob@example.com", hashed_password="x")
+    db.add_all([author, bob])
+    db.commit()
+    return author, bob
+
+
+def tags_by_tweet(db):
+    rows = db.execute(
+        select(tweet_hashtags.c.tweet_id, Hashtag.tag).join(Hashtag, Hashtag.id == tweet_hashtags.c.hashtag_id)
+    )
+    found = {}
+    for tweet_id, tag in rows:
+        found.setdefault(tweet_id, set()).add(tag)
+    return found
+
+
+def test_upsert_rejects_dialects_without_on_conflict():
+    with pytest.raises(ValueError, match="mysql"):
+        insert_for_dialect("mysql")
+
+
+def test_batches_are_split_and_ids_keep_the_input_order(db, users, monkeypatch):
+    author, _ = users
+    batches = []
+    ingest_batch = tweet_service._ingest_batch
+    monkeypatch.setattr(
+        tweet_service, "_ingest_batch",
+        lambda db, batch, *args: batches.append([index for index, _ in batch]) or ingest_batch(db, batch, *args)
+    )
+
+    result = tweet_service.bulk_create(db, [{"content": f"tweet {i}"} for i in range(5)], author.id, batch_size=2)
+    assert batches == [[0, 1], [2, 3], [4]]
+    assert result["created"] == 5
+    assert result["errors"] == []
+    assert [db.get(Tweet, tweet_id).content for tweet_id in result["ids"]] == [f"tweet {i}" for i in range(5)]
+
+
+def test_per_row_errors_do_not_stop_the_rest(db, users):
+    author, _ = users
+    parent = Tweet(content="parent", author_id=author.id)
+    db.add(parent)
+    db.commit()
+
+    result = tweet_service.bulk_create(db, [
+        {"content": "ok"},
+        {"content": "   "},
+        {"content": "x" * 281},
+        {"content": "orphan", "reply_to_id": 999999},
+        {"content": "reply", "reply_to_id": parent.id},
+        {"nothing": "here"},
+    ], author.id)
+    assert result["created"] == 2
+    assert [error["index"] for error in result["errors"]] == [1, 2, 3, 5]
+    assert result["errors"][2]["error"] == "Parent tweet not found"
+    assert [tweet_id is not None for tweet_id in result["ids"]] == [True, False, False, False, True, False]
+
+    reply = db.get(Tweet, result["ids"][4])
+    assert reply.reply_to_id == parent.id
+    db.refresh(parent)
+    assert parent.replies_count == 1
+
+
+def test_a_failed_batch_is_rolled_back_alone(db, users, monkeypatch):
+    author, _ = users
+    process_tweets = hashtag_module.hashtag_service.process_tweets
+
+    def failing(db, tweets):
+        tweets = list(tweets)
+        if any("boom" in content for _, _, content in tweets):
+            raise OperationalError("INSERT", {}, Exception("disk I/O error"))
+        process_tweets(db, tweets)
+
+    monkeypatch.setattr(hashtag_module.hashtag_service, "process_tweets", failing)
+    result = tweet_service.bulk_create(
+        db, [{"content": "a"}, {"content": "b"}, {"content": "boom"}, {"content": "c"}], author.id, batch_size=2
+    )
+    assert result["created"] == 2
+    assert result["errors"] == [{"index": 2, "error": "Database error"}, {"index": 3, "error": "Database error"}]
+    assert result["ids"][2:] == [None, None]
+    assert sorted(content for content, in db.query(Tweet.content)) == ["a", "b"]
+
+
+def test_hashtags_and_mentions_follow_the_returning_ids(db, users):
+    author, bob = users
+    result = tweet_service.bulk_create(db, [
+        {"content": "#Python y @bob"},
+        {"content": "sin entidades"},
+        {"content": "#python #FastAPI @author @nadie"},
+        {"content": "@Bob @bob #fastapi"},
+    ], author.id, batch_size=3)
+    first, plain, second, third = result["ids"]
+
+    assert tags_by_tweet(db) == {first: {"python"}, second: {"python", "fastapi"}, third: {"fastapi"}}
+    assert {tag: count for tag, count in db.query(Hashtag.tag, Hashtag.count)} == {"python": 2, "fastapi": 2}
+    # Sin menciones a sí mismo, a usuarios inexistentes ni repetidas en un tweet
+    mentions = sorted((mention.tweet_id, mention.mentioned_user_id) for mention in db.query(Mention))
+    assert mentions == [(first, bob.id), (third, bob.id)]
@@ -0,0 +1,30 @@
+from app.core.config import Settings
+
+
+def test_documented_env_names_apply(monkeypatch):
+    monkeypatch.setenv("SEARCH_BACKEND", "embedded")
+    monkeypatch.setenv("DB_POOL_SIZE", "9")
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    monkeypatch.setenv("TIMELINE_BACKEND", "memory")
+    monkeypatch.setenv("VERSION_STORE_BACKEND", "redis")
+    monkeypatch.setenv("READ_YOUR_WRITES_BACKEND", "redis")
+    settings = Settings()
+    assert settings.search_backend == "embedded"
+    assert settings.db_pool_size == 9
+    assert settings.db_pgbouncer is True
+    assert settings.timeline_backend == "memory"
+    assert settings.version_store_backend == "redis"
+    assert settings.read_your_writes_backend == "redis"
+
+
+def test_field_names_still_apply(monkeypatch):
+    monkeypatch.setenv("db_max_overflow", "3")
+    assert Settings().db_max_overflow == 3
+
+
+def test_postgres_scheme_is_normalized(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgres://u:p@h/db")
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", '["postgres://u:p@r/db"]')
+    settings = Settings()
+    assert settings.database_url == "postgresql://u:p@h/db"
+    assert settings.database_replica_urls == ["postgresql://u:p@r/db"]
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from app.db.session import AsyncSessionLocal
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.schemas.tweet import TweetCreate
+from app.scripts import reconcile_counters, reconcile_follow_counts
+from app.services.like import like_service
+from app.services.retweet import retweet_service
+from app.services.tweet import tweet_service
+from app.services.user import user_service
+
+
+@pytest.fixture
+def users(db):
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    fan = User(username="fan", email="fan@example.com", hashed_password="x")
+    db.add_all([author, fan])
+    db.commit()
+    return author, fan
+
+
+def counters(db, tweet_id):
+    """Contadores tal como los ve un lector (cache incluido)"""
+    tweet = tweet_service.get(db, tweet_id)
+    return tweet["likes_count"], tweet["retweets_count"], tweet["replies_count"]
+
+
+def assert_in_sync(db):
+    drift = reconcile_counters.reconcile(db, dry_run=True)
+    assert drift["tweets"] == 0, drift
+
+
+def test_writes_keep_the_counters_in_sync(db, users):
+    author, fan = users
+    tweet = tweet_service.create(db, TweetCreate(content="hola"), author.id)
+    assert counters(db, tweet.id) == (0, 0, 0)
+
+    assert like_service.like_tweet(db, fan.id, tweet.id) is not None
+    assert like_service.like_tweet(db, fan.id, tweet.id) is None
+    assert retweet_service.retweet(db, fan.id, tweet.id) is not None
+    reply = tweet_service.create(db, TweetCreate(content="respuesta", reply_to_id=tweet.id), fan.id)
+    assert counters(db, tweet.id) == (1, 1, 1)
+    assert_in_sync(db)
+
+    assert like_service.unlike_tweet(db, fan.id, tweet.id)
+    assert not like_service.unlike_tweet(db, fan.id, tweet.id)
+    assert retweet_service.unretweet(db, fan.id, tweet.id)
+    assert tweet_service.delete(db, reply.id, fan.id)
+    assert counters(db, tweet.id) == (0, 0, 0)
+    assert_in_sync(db)
+
+
+def test_reconcile_repairs_drift(db, users):
+    author, fan = users
+    tweets = [tweet_service.create(db, TweetCreate(content=f"tweet {i}"), author.id) for i in range(5)]
+    like_service.like_tweet(db, fan.id, tweets[0].id)
+    tweet_service.create(db, TweetCreate(content="respuesta", reply_to_id=tweets[3].id), fan.id)
+
+    # Drift: escrituras que no pasaron por los servicios
+    db.query(Tweet).filter(Tweet.id == tweets[0].id).update({Tweet.likes_count: 7})
+    db.query(Tweet).filter(Tweet.id == tweets[3].id).update({Tweet.replies_count: 0, Tweet.retweets_count: -2})
+    db.commit()
+    assert counters(db, tweets[0].id) == (7, 0, 0)
+
+    dry_run = reconcile_counters.reconcile(db, chunk_size=2, dry_run=True)
+    assert dry_run == {"likes_count": 1, "retweets_count": 1, "replies_count": 1, "tweets": 2, "scanned": 6}
+    assert counters(db, tweets[0].id) == (7, 0, 0)
+
+    assert reconcile_counters.reconcile(db, chunk_size=2) == dry_run
+    # También lo que ya estaba cacheado
+    assert counters(db, tweets[0].id) == (1, 0, 0)
+    assert counters(db, tweets[3].id) == (0, 0, 1)
+    assert_in_sync(db)
+
+
+def follow_counts(db, *users):
+    for user in users:
+        db.refresh(user)
+    return [(user.followers_count, user.following_count) for user in users]
+
+
+def test_follows_keep_the_follow_counts_in_sync(db, users):
+    author, fan = users
+    assert user_service.follow_user(db, fan.id, author.id)
+    assert not user_service.follow_user(db, fan.id, author.id)
+
+    async def follow_back():
+        async with AsyncSessionLocal() as session:
+            assert await user_service.follow_user_async(session, author.id, fan.id)
+            assert not await user_service.follow_user_async(session, author.id, fan.id)
+
+    asyncio.run(follow_back())
+    assert follow_counts(db, author, fan) == [(1, 1), (1, 1)]
+    assert reconcile_follow_counts.reconcile(db, dry_run=True)["users"] == 0
+
+    assert user_service.unfollow_user(db, fan.id, author.id)
+    assert not user_service.unfollow_user(db, fan.id, author.id)
+    assert follow_counts(db, author, fan) == [(0, 1), (1, 0)]
+    assert reconcile_follow_counts.reconcile(db, dry_run=True)["users"] == 0
+
+
+def test_reconcile_follow_counts_repairs_drift(db, users):
+    author, fan = users
+    others = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x") for i in range(3)]
+    db.add_all(others)
+    db.commit()
+    for other in others:
+        user_service.follow_user(db, other.id, author.id)
+
+    db.query(User).filter(User.id == author.id).update({User.followers_count: 0})
+    db.query(User).filter(User.id == fan.id).update({User.following_count: 5})
+    db.commit()
+
+    dry_run = reconcile_follow_counts.reconcile(db, chunk_size=2, dry_run=True)
+    assert dry_run == {"followers_count": 1, "following_count": 1, "users": 2, "scanned": 5}
+    assert reconcile_follow_counts.reconcile(db, chunk_size=2) == dry_run
+    assert follow_counts(db, author, fan) == [(3, 0), (0, 0)]
+    assert reconcile_follow_counts.reconcile(db, dry_run=True)["users"] == 0
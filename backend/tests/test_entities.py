@@ -0,0 +1,82 @@
+import unicodedata
+
+import pytest
+
+from app.core.entities import (
+    CASHTAG, HASHTAG, MENTION, URL, extract_entities, entity_values, hashtags_and_mentions
+)
+
+
+def values(text, kind):
+    found = [entity.value for entity in extract_entities(text) if entity.kind == kind]
+    # Los tres extractores tienen que coincidir
+    assert entity_values(text)[kind] == list(dict.fromkeys(found))
+    if kind in (HASHTAG, MENTION):
+        assert hashtags_and_mentions(text)[kind == MENTION] == list(dict.fromkeys(found))
+    return found
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hola @bob", ["bob"]),
+    ("escribile a a@b.com", []),
+    ("john.doe@example.com", []),
+    (".@bob tiene razón", ["bob"]),
+    ("+@bob", ["bob"]),
+    ("-@bob", ["bob"]),
+    ("(@bob)", ["bob"]),
+    ("@@bob", []),
+    ("@BoB y @bob", ["bob", "bob"]),
+    ("＠bob", ["bob"]),
+])
+def test_mention_boundaries(text, expected):
+    assert values(text, MENTION) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("#Python", ["python"]),
+    ("pagina#ancla", []),
+    ("page#anchor", []),
+    ("#123", []),
+    ("#2024elecciones", ["2024elecciones"]),
+    ("&#39;", []),
+    ("##doble", []),
+    ("＃tag", ["tag"]),
+])
+def test_hashtag_boundaries(text, expected):
+    assert values(text, HASHTAG) == expected
+
+
+def test_hashtags_are_normalized_to_nfc():
+    composed = "#café"
+    decomposed = unicodedata.normalize("NFD", composed)
+    assert decomposed != composed
+    assert values(decomposed, HASHTAG) == values(composed, HASHTAG) == ["café"]
+    entity, = extract_entities("x " + decomposed)
+    assert (entity.start, entity.end) == (2, 2 + len(decomposed))
+
+
+def test_url_swallows_fragment_and_mentions():
+    text = "mirá https://example.com/page#anchor?u=@bob."
+    assert values(text, URL) == ["https://example.com/page#anchor?u=@bob"]
+    assert values(text, HASHTAG) == []
+    assert values(text, MENTION) == []
+    assert values("(ver https://en.wikipedia.org/wiki/Foo_(bar))", URL) == ["https://en.wikipedia.org/wiki/Foo_(bar)"]
+    assert values("www.example.com/a, y más", URL) == ["www.example.com/a"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$aapl sube", ["AAPL"]),
+    ("$BRK.A y $RDS_B", ["BRK.A", "RDS_B"]),
+    ("cuesta $100", []),
+    ("a$b", []),
+    ("$TOOLONGX", []),
+])
+def test_cashtags(text, expected):
+    assert values(text, CASHTAG) == expected
+
+
+def test_positions_include_the_prefix():
+    text = "@ana #tag $XYZ"
+    assert [(e.kind, text[e.start:e.end]) for e in extract_entities(text)] == [
+        (MENTION, "@ana"), (HASHTAG, "#tag"), (CASHTAG, "$XYZ")
+    ]
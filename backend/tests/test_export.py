@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from app.models.like import Like
+from app.models.message import Conversation, Message
+from app.models.retweet import Retweet
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.export import export_service
+
+
+def records(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    body = response.content.decode()
+    assert body.endswith("\n")
+    lines = body.split("\n")[:-1]
+    return [json.loads(line) for line in lines]
+
+
+@pytest.fixture
+def archive(client, login, db, monkeypatch):
+    # Lotes chicos: varias partes del stream por sección
+    monkeypatch.setattr(export_service, "BATCH_SIZE", 2)
+    headers = login("alice")
+    login("bob")
+    alice = db.query(User).filter_by(username="alice").one()
+    bob = db.query(User).filter_by(username="bob").one()
+    tweets = [Tweet(content=f'tweet {i} "con comillas"\nen dos líneas', author_id=alice.id) for i in range(5)]
+    bob_tweet = Tweet(content="de bob", author_id=bob.id)
+    db.add_all(tweets + [bob_tweet])
+    db.flush()
+    db.add_all([
+        Retweet(user_id=alice.id, tweet_id=bob_tweet.id, comment="mirá"),
+        Like(user_id=alice.id, tweet_id=bob_tweet.id),
+        Like(user_id=alice.id, tweet_id=tweets[0].id),
+    ])
+    conversation = Conversation(user1_id=bob.id, user2_id=alice.id)
+    db.add(conversation)
+    db.flush()
+    db.add_all([
+        Message(conversation_id=conversation.id, sender_id=bob.id, content="hola"),
+        Message(conversation_id=conversation.id, sender_id=alice.id, content="chau"),
+    ])
+    db.commit()
+    return headers, alice, [tweet.id for tweet in tweets]
+
+
+def test_my_export_is_valid_and_complete(client, archive):
+    headers, alice, tweet_ids = archive
+    response = client.get("/api/v1/users/me/export", headers={**headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    lines = records(response)
+
+    assert lines[0]["type"] == "user"
+    assert lines[0]["username"] == "alice"
+    assert [line["type"] for line in lines[1:]] == ["tweet"] * 5 + ["retweet"] + ["like"] * 2 + ["message"] * 2
+    tweets = [line for line in lines if line["type"] == "tweet"]
+    assert [tweet["id"] for tweet in tweets] == tweet_ids
+    assert tweets[0]["content"] == 'tweet 0 "con comillas"\nen dos líneas'
+    assert [line["content"] for line in lines if line["type"] == "message"] == ["hola", "chau"]
+    assert {line["with_username"] for line in lines if line["type"] == "message"} == {"bob"}
+
+
+def test_gzip_export_has_the_same_lines(client, archive):
+    headers, _, _ = archive
+    plain = records(client.get("/api/v1/users/me/export", headers={**headers, "Accept-Encoding": "identity"}))
+    # httpx descomprime el cuerpo
+    response = client.get("/api/v1/users/me/export", headers={**headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    compressed = records(response)
+    assert [line for line in compressed if line["type"] != "user"] == [line for line in plain if line["type"] != "user"]
+
+
+def test_public_export_and_sections(client, archive, login):
+    _, _, tweet_ids = archive
+    carol = login("carol")
+    lines = records(client.get("/api/v1/users/alice/export", headers=carol))
+    assert [line["type"] for line in lines] == ["user"] + ["tweet"] * 5 + ["retweet"]
+
+    lines = records(client.get("/api/v1/users/alice/export", params={"sections": "retweets"}, headers=carol))
+    assert [line["type"] for line in lines] == ["user", "retweet"]
+
+    assert client.get("/api/v1/users/alice/export", params={"sections": "likes"}, headers=carol).status_code == 400
+    assert client.get("/api/v1/users/nobody/export", headers=carol).status_code == 404
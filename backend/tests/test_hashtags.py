@@ -0,0 +1,87 @@
+import unicodedata
+
+import pytest
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.models.hashtag import Hashtag, tweet_hashtags
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.hashtag import hashtag_service
+
+
+@pytest.fixture
+def tweets(db):
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    db.add(author)
+    db.flush()
+    rows = [Tweet(content=f"tweet {i}", author_id=author.id) for i in range(3)]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def counts(db):
+    return dict(db.query(Hashtag.tag, Hashtag.count))
+
+
+def links(db):
+    return sorted(db.execute(select(tweet_hashtags.c.tweet_id, Hashtag.tag).join(Hashtag)).all())
+
+
+def test_tags_are_case_folded_and_counted_once_per_tweet(db, tweets):
+    first, second, _ = tweets
+    hashtag_service.process_tweets(db, [
+        (first.id, first.author_id, "#Python #PYTHON #python"),
+        (second.id, second.author_id, "#pYtHoN"),
+    ])
+    db.commit()
+    assert counts(db) == {"python": 2}
+    assert links(db) == [(first.id, "python"), (second.id, "python")]
+
+
+def test_nfd_and_nfc_spellings_are_the_same_tag(db, tweets):
+    first, second, _ = tweets
+    hashtag_service.process_tweets(db, [
+        (first.id, first.author_id, "#Café"),
+        (second.id, second.author_id, unicodedata.normalize("NFD", "#café")),
+    ])
+    db.commit()
+    assert counts(db) == {"café": 2}
+
+
+def test_upsert_adds_to_existing_tags_and_keeps_their_ids(db, tweets):
+    ids = hashtag_service.upsert_hashtags(db, {"python": 1, "fastapi": 2})
+    db.commit()
+    again = hashtag_service.upsert_hashtags(db, {"python": 3, "sqlalchemy": 1})
+    db.commit()
+    assert again["python"] == ids["python"]
+    assert counts(db) == {"python": 4, "fastapi": 2, "sqlalchemy": 1}
+    assert hashtag_service.upsert_hashtags(db, {}) == {}
+
+
+def test_concurrent_upserts_of_a_new_tag(db, tweets):
+    first, second, _ = tweets
+    with SessionLocal() as other:
+        # Las dos transacciones ven que el tag no existe
+        assert other.query(Hashtag).count() == 0
+        assert db.query(Hashtag).count() == 0
+        mine = hashtag_service.upsert_hashtags(db, {"python": 1})
+        hashtag_service.link_hashtags(db, [(first.id, mine["python"])])
+        db.commit()
+        # La segunda choca con la fila recién confirmada: suma, no falla
+        theirs = hashtag_service.upsert_hashtags(other, {"python": 1})
+        hashtag_service.link_hashtags(other, [(second.id, theirs["python"])])
+        other.commit()
+    assert theirs == mine
+    assert counts(db) == {"python": 2}
+    assert links(db) == [(first.id, "python"), (second.id, "python")]
+
+
+def test_repeated_links_are_ignored(db, tweets):
+    first, _, _ = tweets
+    tag_id = hashtag_service.upsert_hashtags(db, {"python": 1})["python"]
+    hashtag_service.link_hashtags(db, [(first.id, tag_id), (first.id, tag_id)])
+    hashtag_service.link_hashtags(db, [(first.id, tag_id)])
+    db.commit()
+    assert db.scalar(select(func.count()).select_from(tweet_hashtags)) == 1
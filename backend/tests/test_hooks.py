@@ -0,0 +1,51 @@
+import asyncio
+
+from app.db.session import AsyncSessionLocal
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.like import like_service
+from app.services.tweet import tweet_service
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def test_async_commit_runs_hooks_off_the_event_loop(db, monkeypatch):
+    user = User(username="alice", email="alice@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    tweet = Tweet(content="hello", author_id=user.id)
+    db.add(tweet)
+    db.commit()
+
+    calls = []
+    monkeypatch.setattr(tweet_service, "_invalidate_keys", lambda keys: calls.append((_on_event_loop(), keys)))
+
+    async def like():
+        async with AsyncSessionLocal() as session:
+            assert await like_service.like_tweet_async(session, user.id, tweet.id) is not None
+            # Nada corre dentro del commit, ni antes
+            assert calls == [(False, [("tweet", tweet.id)])]
+
+    asyncio.run(like())
+    db.refresh(tweet)
+    assert tweet.likes_count == 1
+
+
+def test_sync_commit_runs_hooks_inside_the_commit(db, monkeypatch):
+    user = User(username="alice", email="alice@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    tweet = Tweet(content="hello", author_id=user.id)
+    db.add(tweet)
+    db.commit()
+
+    calls = []
+    monkeypatch.setattr(tweet_service, "_invalidate_keys", calls.append)
+    assert like_service.like_tweet(db, user.id, tweet.id) is not None
+    assert calls == [[("tweet", tweet.id)]]
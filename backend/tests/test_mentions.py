@@ -0,0 +1,57 @@
+import pytest
+
+from app.models.mention import Mention
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.hashtag import hashtag_service
+from app.services.user import user_service
+
+
+@pytest.fixture
+def users(db):
+    author, bob, ana = (
+        User(username=name, email=f"{name}@example.com", hashed_password="x") for name in ("author", "bob", "ana")
+    )
+    db.add_all([author, bob, ana])
+    db.commit()
+    return author, bob, ana
+
+
+def tweet(db, author):
+    row = Tweet(content="x", author_id=author.id)
+    db.add(row)
+    db.commit()
+    return row
+
+
+def mentioned(db):
+    return sorted((mention.tweet_id, mention.mentioned_user_id) for mention in db.query(Mention))
+
+
+def test_duplicate_mentions_in_one_tweet_make_one_row(db, users):
+    author, bob, ana = users
+    first, second = tweet(db, author), tweet(db, author)
+    hashtag_service.process_tweets(db, [
+        (first.id, author.id, "@bob @BOB @Bob ＠bob @ana"),
+        (second.id, author.id, "@bob"),
+    ])
+    db.commit()
+    assert mentioned(db) == sorted([(first.id, bob.id), (first.id, ana.id), (second.id, bob.id)])
+
+
+def test_repeated_and_self_mentions_are_skipped(db, users):
+    author, bob, _ = users
+    first = tweet(db, author)
+    hashtag_service.add_mentions(db, [(first.id, author.id, "bob"), (first.id, author.id, "author")])
+    # Otra vez la misma mención (reintento): ON CONFLICT DO NOTHING
+    hashtag_service.add_mentions(db, [(first.id, author.id, "bob"), (first.id, author.id, "ghost")])
+    db.commit()
+    assert mentioned(db) == [(first.id, bob.id)]
+
+
+def test_usernames_are_resolved_from_the_cache(db, users, monkeypatch):
+    _, bob, _ = users
+    assert user_service.get_ids_by_usernames(db, ["bob", "ghost"]) == {"bob": bob.id}
+    # Ya resuelto: no vuelve a la base
+    monkeypatch.setattr(db, "query", lambda *args: pytest.fail("query to the database"))
+    assert user_service.get_ids_by_usernames(db, ["bob"]) == {"bob": bob.id}
@@ -0,0 +1,17 @@
+from app.core.config import settings
+
+
+def test_metrics_are_hidden_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"X-Metrics-Token": ""}).status_code == 404
+
+
+def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"X-Metrics-Token": "wrong"}).status_code == 403
+
+    response = client.get("/metrics", headers={"X-Metrics-Token": "s3cret"})
+    assert response.status_code == 200
+    assert {"tweet_cache", "principal_cache", "db_pool", "search"} <= response.json().keys()
@@ -0,0 +1,90 @@
+import itertools
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core import dependencies
+from app.db import read_your_writes, session as session_module
+from app.db.database import engine, engine_options
+from app.db.read_your_writes import RecentWrites, RedisRecentWrites, create_recent_writes
+from app.models.tweet import Tweet
+from app.models.user import User
+
+from conftest import TEST_DIR
+
+
+class Replica:
+    """Réplica en otro archivo SQLite: solo ve lo escrito en el primario hasta el último sync()"""
+
+    def __init__(self, url: str):
+        self.path = make_url(url).database
+        self.engine = create_engine(make_url(url), **engine_options(make_url(url)))
+
+    def sync(self):
+        primary = sqlite3.connect(engine.url.database)
+        replica = sqlite3.connect(self.path)
+        try:
+            primary.backup(replica)
+        finally:
+            primary.close()
+            replica.close()
+
+
+@pytest.fixture
+def replica(db, monkeypatch):
+    url = "sqlite:///" + os.path.join(TEST_DIR, "replica.db")
+    replica = Replica(url)
+    replica.sync()
+    monkeypatch.setattr(settings, "database_replica_urls", [url])
+    monkeypatch.setattr(session_module, "replica_engines", [replica.engine])
+    monkeypatch.setattr(session_module, "_next_replica", itertools.cycle([replica.engine]))
+    yield replica
+    replica.engine.dispose()
+
+
+def contents(client, headers):
+    response = client.get("/api/v1/tweets/", headers=headers)
+    assert response.status_code == 200
+    return sorted(tweet["content"] for tweet in response.json())
+
+
+def test_reads_use_the_replica_until_the_user_writes(client, login, db, replica, monkeypatch):
+    recent_writes = RecentWrites(settings.read_your_writes_seconds)
+    monkeypatch.setattr(read_your_writes, "recent_writes", recent_writes)
+    monkeypatch.setattr(dependencies, "recent_writes", recent_writes)
+    alice, bob = login("alice"), login("bob")
+    replica.sync()
+
+    # En el primario y todavía no en la réplica (lag)
+    db.add(Tweet(content="lagging", author_id=db.query(User).filter_by(username="bob").one().id))
+    db.commit()
+    assert contents(client, alice) == []
+
+    # Escribir fija a alice en el primario; bob sigue leyendo de la réplica
+    assert client.post("/api/v1/tweets/", json={"content": "mine"}, headers=alice).status_code == 200
+    assert contents(client, alice) == ["lagging", "mine"]
+    assert contents(client, bob) == []
+
+    # Pasada la ventana, alice vuelve a la réplica
+    monkeypatch.setattr(recent_writes, "window_seconds", 0)
+    assert contents(client, alice) == []
+    replica.sync()
+    assert contents(client, alice) == ["lagging", "mine"]
+
+
+def test_memory_backend_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "read_your_writes_backend", "memory")
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        create_recent_writes()
+
+
+def test_redis_marks_are_shared_between_workers(fake_redis):
+    worker_a, worker_b = RedisRecentWrites(5), RedisRecentWrites(5)
+    worker_a.mark(7)
+    assert worker_b.is_recent(7)
+    assert not worker_b.is_recent(8)
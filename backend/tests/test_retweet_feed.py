@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from app.core.pagination import decode_cursor
+from app.models.follow import Follow
+from app.models.retweet import Retweet
+from app.models.tweet import Tweet
+from app.models.user import User
+
+START = datetime(2024, 1, 1)
+
+
+def user_id(db, username: str) -> int:
+    return db.query(User).filter_by(username=username).one().id
+
+
+def test_feed_mixes_tweets_and_retweets_with_cursor_paging(client, login, db):
+    headers = login("alice")
+    login("bob")
+    login("carol")
+    alice, bob, carol = user_id(db, "alice"), user_id(db, "bob"), user_id(db, "carol")
+    db.add(Follow(follower_id=alice, followed_id=bob))
+    tweets = [
+        Tweet(content=f"{author} {i}", author_id=author_id, created_at=START + timedelta(minutes=i))
+        for i in range(4) for author, author_id in (("alice", alice), ("bob", bob), ("carol", carol))
+    ]
+    db.add_all(tweets)
+    db.flush()
+    # bob retweetea un tweet de carol (que alice no sigue); carol, uno de bob
+    carol_tweet = next(tweet for tweet in tweets if tweet.content == "carol 0")
+    db.add(Retweet(user_id=bob, tweet_id=carol_tweet.id, comment="look", created_at=START + timedelta(minutes=10)))
+    db.add(Retweet(user_id=carol, tweet_id=tweets[1].id, created_at=START + timedelta(minutes=11)))
+    db.commit()
+
+    items, cursor = [], None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/retweets/feed", params=params, headers=headers)
+        assert response.status_code == 200
+        items += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert [(item["type"], item["tweet"]["content"]) for item in items] == [("retweet", "carol 0")] + [
+        ("tweet", f"{author} {i}") for i in reversed(range(4)) for author in ("bob", "alice")
+    ]
+    assert items[0]["retweet_author"]["username"] == "bob"
+    assert items[0]["retweet_comment"] == "look"
+    assert client.get("/api/v1/retweets/feed", params={"cursor": "nope"}, headers=headers).status_code == 400
+
+
+def _reader_with_feed(db):
+    reader = User(username="reader", email="reader@example.com", hashed_password="x")
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    db.add_all([reader, author])
+    db.flush()
+    db.add(Follow(follower_id=reader.id, followed_id=author.id))
+    tweets = [Tweet(content=f"tweet {i}", author_id=author.id, created_at=START + timedelta(minutes=i)) for i in range(6)]
+    db.add_all(tweets)
+    db.commit()
+    return reader, author, tweets
+
+
+def test_retweets_of_deleted_tweets_do_not_shorten_pages(db):
+    from app.services.retweet import retweet_service
+
+    reader, author, tweets = _reader_with_feed(db)
+    gone = Tweet(content="gone", author_id=reader.id, created_at=START)
+    db.add(gone)
+    db.flush()
+    # Retweets más nuevos que todo, de un tweet borrado sin pasar por el ORM (sin cascade)
+    db.add(Retweet(user_id=author.id, tweet_id=gone.id, created_at=START + timedelta(hours=1)))
+    db.commit()
+    db.execute(Tweet.__table__.delete().where(Tweet.id == gone.id))
+    db.commit()
+
+    page = retweet_service.get_feed_with_retweets(db, reader.id, limit=3)
+    assert [item["tweet"]["content"] for item in page] == ["tweet 5", "tweet 4", "tweet 3"]
+
+
+def test_items_deleted_before_hydration_are_refilled(db, monkeypatch):
+    from app.services.retweet import retweet_service
+    from app.services.tweet import tweet_service
+
+    reader, author, tweets = _reader_with_feed(db)
+    hydrate_ids = tweet_service.hydrate_ids
+    deleted = {tweets[4].id, tweets[3].id}
+    monkeypatch.setattr(
+        tweet_service, "hydrate_ids",
+        lambda db, ids, *args: hydrate_ids(db, [tweet_id for tweet_id in ids if tweet_id not in deleted], *args)
+    )
+
+    page = retweet_service.get_feed_with_retweets(db, reader.id, limit=3)
+    assert [item["tweet"]["content"] for item in page] == ["tweet 5", "tweet 2", "tweet 1"]
+    rest = retweet_service.get_feed_with_retweets(db, reader.id, limit=3, cursor=decode_cursor(page[-1]["cursor"]))
+    assert [item["tweet"]["content"] for item in rest] == ["tweet 0"]
+    assert [item["tweet"]["content"] for item in retweet_service.get_feed_with_retweets(db, reader.id, skip=1, limit=2)] == [
+        "tweet 2", "tweet 1"
+    ]
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.core.search_changes import RedisSearchChangeFeed, create_search_change_feed
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.search import EmbeddedSearchBackend, SearchBackend
+
+from conftest import TEST_DIR
+
+
+@pytest.fixture
+def tweets(db):
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    db.add(author)
+    db.flush()
+    created_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    rows = [Tweet(content=content, author_id=author.id, created_at=created_at) for content in ("apple pie", "apple tart", "banana")]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def search(backend, db, q):
+    return [tweet_id for tweet_id, _ in backend.search_tweets(db, q, datetime.now(timezone.utc))]
+
+
+def worker(db, snapshot_path=""):
+    backend = EmbeddedSearchBackend(snapshot_path, RedisSearchChangeFeed(1000))
+    backend.load(db)
+    return backend
+
+
+def test_search_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SearchBackend()
+
+
+def test_edits_and_deletes_reach_other_workers(fake_redis, db, tweets):
+    worker_a, worker_b = worker(db), worker(db)
+    pie, tart, banana = tweets
+
+    # El worker A confirma una edición y un borrado
+    tart.content = "cherry tart"
+    db.commit()
+    worker_a.index_tweets([(tart.id, tart.content, tart.created_at)], edited=True)
+    db.delete(banana)
+    db.commit()
+    worker_a.remove_tweets([banana.id])
+
+    assert sorted(search(worker_b, db, "apple")) == sorted([pie.id, tart.id])
+    assert worker_b.apply_changes() == 2
+    for backend in (worker_a, worker_b):
+        assert search(backend, db, "apple") == [pie.id]
+        assert search(backend, db, "cherry") == [tart.id]
+        assert search(backend, db, "banana") == []
+
+
+def test_last_edit_wins_on_every_worker(fake_redis, db, tweets):
+    worker_a, worker_b = worker(db), worker(db)
+    pie = tweets[0]
+    # Dos workers editan el mismo tweet: cada uno lo aplica enseguida, el feed decide el orden
+    worker_a.index_tweets([(pie.id, "plum pie", pie.created_at)], edited=True)
+    worker_b.index_tweets([(pie.id, "pear pie", pie.created_at)], edited=True)
+    for backend in (worker_a, worker_b):
+        backend.apply_changes()
+        assert search(backend, db, "pear") == [pie.id]
+        assert search(backend, db, "plum") == []
+
+
+def test_snapshot_resumes_from_its_feed_position(fake_redis, db, tweets):
+    path = os.path.join(TEST_DIR, "search.idx")
+    worker_a = worker(db, path)
+    worker_a.save_snapshot()
+    # Después del snapshot: un worker nuevo lo carga y aplica lo publicado desde entonces
+    pie = tweets[0]
+    worker_a.remove_tweets([pie.id])
+    worker_c = worker(db, path)
+    assert search(worker_c, db, "apple") == [tweets[1].id]
+
+
+def test_memory_feed_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "search_changes_backend", "memory")
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        create_search_change_feed()
@@ -0,0 +1,154 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from app.core.config import settings
+from app.core.sketch import CountMinSketch, TopK
+from app.core.trending import RingTrendCounter, SketchTrendCounter, create_sketch_store
+
+START_MINUTE = 28_000_000
+MINUTES = 240
+HALF_LIFE = 15
+MIN_COUNT = 2
+
+
+def zipf_tags(events: int, tags: int, seed: int = 7):
+    rng = random.Random(seed)
+    names = [f"tag{rank}" for rank in range(tags)]
+    weights = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(tags)))
+    return rng.choices(names, cum_weights=weights, k=events)
+
+
+def make_stream(events: int = 40_000, tags: int = 3000, bursts=(("burst1", 60), ("burst2", 30), ("burst3", 15))):
+    """(minuto, tag) repartidos en MINUTES minutos, con ráfagas de tags nuevos (usos por minuto) al final"""
+    per_minute = events / MINUTES
+    stream = [(START_MINUTE + int(i / per_minute), tag) for i, tag in enumerate(zipf_tags(events, tags))]
+    last = START_MINUTE + MINUTES - 1
+    for tag, rate in bursts:
+        stream += [(minute, tag) for minute in range(last - 9, last + 1) for _ in range(rate)]
+    stream.sort(key=lambda event: event[0])
+    return stream
+
+
+def feed(counter, stream):
+    for minute, tag in stream:
+        counter.add(minute, {tag: 1})
+    return counter
+
+
+def sketch_counter(width: int = 1024, depth: int = 4, top_k: int = 100) -> SketchTrendCounter:
+    return SketchTrendCounter(MINUTES, HALF_LIFE, MIN_COUNT, width, depth, top_k)
+
+
+def test_count_min_never_undercounts_and_respects_the_bound():
+    sketch = CountMinSketch.for_error(0.01, 0.01)
+    true_counts = Counter(zipf_tags(50_000, 5000))
+    for tag, count in true_counts.items():
+        sketch.add(tag, count)
+    assert sketch.total == 50_000
+    errors = [sketch.estimate(tag) - count for tag, count in true_counts.items()]
+    assert min(errors) >= 0
+    # Cada estimación supera la cota con probabilidad <= delta: sobre 5000
+    # tags, a lo sumo una fracción delta (con margen por la varianza)
+    over_bound = sum(1 for error in errors if error > sketch.epsilon * sketch.total)
+    assert over_bound <= 2 * sketch.delta * len(errors)
+
+
+def test_count_min_merge_equals_a_single_sketch():
+    tags = zipf_tags(20_000, 2000)
+    single = CountMinSketch(512, 4)
+    shards = [CountMinSketch(512, 4) for _ in range(3)]
+    for i, tag in enumerate(tags):
+        single.add(tag)
+        shards[i % 3].add(tag)
+    merged = shards[0].copy()
+    for shard in shards[1:]:
+        merged.merge(shard)
+    assert merged.counts == single.counts
+    assert merged.total == single.total
+    with pytest.raises(ValueError):
+        merged.merge(CountMinSketch(256, 4))
+
+
+def test_topk_recall_of_the_heaviest_tags():
+    tags = zipf_tags(50_000, 5000)
+    sketch = CountMinSketch(1024, 4)
+    candidates = TopK(100)
+    for tag in tags:
+        candidates.offer(tag, sketch.add(tag))
+    heavy = [tag for tag, _ in Counter(tags).most_common(20)]
+    assert set(heavy) <= set(candidates.counts)
+    assert [tag for tag, _ in candidates.items()[:5]] == heavy[:5]
+
+
+def test_serialized_round_trip():
+    counter = feed(sketch_counter(), make_stream(events=10_000))
+    copy = SketchTrendCounter.from_bytes(counter.to_bytes())
+    assert copy.recent.counts == counter.recent.counts
+    assert copy.baseline.counts == counter.baseline.counts
+    assert (copy.recent.total, copy.baseline.total) == (counter.recent.total, counter.baseline.total)
+    # Los candidatos se recalculan con las estimaciones actuales (refill)
+    assert set(copy.candidates.counts) == set(counter.candidates.counts)
+    assert (copy.landmark, copy.minute) == (counter.landmark, counter.minute)
+    assert copy.top(counter.minute, 10) == counter.top(counter.minute, 10)
+    assert copy.to_bytes() == counter.to_bytes()
+
+
+def test_merge_of_serialized_shards_equals_a_single_sketch():
+    stream = make_stream()
+    now = stream[-1][0]
+    single = feed(sketch_counter(), stream)
+    shards = [sketch_counter() for _ in range(4)]
+    for i, (minute, tag) in enumerate(stream):
+        shards[i % 4].add(minute, {tag: 1})
+    merged = SketchTrendCounter.from_bytes(shards[0].to_bytes())
+    for shard in shards[1:]:
+        merged.merge(SketchTrendCounter.from_bytes(shard.to_bytes()))
+
+    assert merged.landmark == single.landmark
+    for combined, expected in zip(merged.recent.counts, single.recent.counts):
+        assert combined == pytest.approx(expected, rel=1e-9, abs=1e-9)
+    for combined, expected in zip(merged.baseline.counts, single.baseline.counts):
+        assert combined == pytest.approx(expected, rel=1e-9, abs=1e-9)
+    # Los candidatos combinados son la unión de los top-K de cada worker: los
+    # tags que están en los dos tops tienen el mismo puntaje
+    single_scores = {trend["tag"]: trend["score"] for trend in single.top(now, 10)}
+    merged_top = merged.top(now, 10)
+    assert [trend["tag"] for trend in merged_top[:3]] == ["burst1", "burst2", "burst3"]
+    for trend in merged_top:
+        if trend["tag"] in single_scores:
+            assert trend["score"] == pytest.approx(single_scores[trend["tag"]], abs=1e-3)
+
+
+def test_exact_and_sketch_agree_on_clear_trends():
+    """
+    Divergencia esperada entre el conteo exacto y el aproximado: los tags
+    que de verdad se disparan salen en el mismo orden en los dos; el resto
+    del top (tags del flujo normal, con puntajes cercanos a 0) depende del
+    ruido del sketch y de que el aproximado no tiene corte duro de ventana,
+    así que puede coincidir poco (3/10 en benchmark_trending con 1M de usos).
+    Los puntajes tampoco son comparables entre los dos (el baseline con
+    decaimiento no es el de la ventana), pero sí sus proporciones.
+    """
+    stream = make_stream()
+    now = stream[-1][0]
+    exact_top = feed(RingTrendCounter(MINUTES, HALF_LIFE, MIN_COUNT), stream).top(now, 10)
+    sketch_top = feed(sketch_counter(), stream).top(now, 10)
+    bursts = ["burst1", "burst2", "burst3"]
+    assert [trend["tag"] for trend in exact_top[:3]] == bursts
+    assert [trend["tag"] for trend in sketch_top[:3]] == bursts
+    for top in (exact_top, sketch_top):
+        assert max(trend["score"] for trend in top[3:]) < top[2]["score"] / 4
+    for first, second in ((0, 1), (1, 2)):
+        assert sketch_top[first]["score"] / sketch_top[second]["score"] == pytest.approx(
+            exact_top[first]["score"] / exact_top[second]["score"], rel=0.1
+        )
+
+
+def test_memory_sketch_store_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "trending_sketch_store", "memory")
+    monkeypatch.setattr(settings, "web_concurrency", 3)
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        create_sketch_store()
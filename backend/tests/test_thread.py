@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.tweet import tweet_service
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def thread(db):
+    """
+    root con 8 respuestas (r0..r7); r0 tiene 8 (c0..c7) y r7 5; c0 tiene 2 (d0, d1).
+    Devuelve {contenido: id}.
+    """
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    db.add(author)
+    db.flush()
+    ids = {}
+    clock = iter(range(1000))
+
+    def add(content, parent=None):
+        tweet = Tweet(
+            content=content, author_id=author.id, reply_to_id=ids.get(parent),
+            created_at=START + timedelta(minutes=next(clock))
+        )
+        db.add(tweet)
+        db.flush()
+        ids[content] = tweet.id
+
+    add("root")
+    for i in range(8):
+        add(f"r{i}", "root")
+    for i in range(8):
+        add(f"c{i}", "r0")
+    for i in range(5):
+        add(f"x{i}", "r7")
+    for i in range(2):
+        add(f"d{i}", "c0")
+    db.commit()
+    return ids
+
+
+def names(ids, rows):
+    by_id = {tweet_id: content for content, tweet_id in ids.items()}
+    return [(by_id[row.id], by_id[row.reply_to_id], row.depth) for row in rows]
+
+
+def test_descendants_only_walk_the_branches_that_are_shown(db, thread):
+    rows = tweet_service._get_descendant_rows(db, thread["root"], max_depth=10, branch_limit=3, max_replies=100)
+    assert names(thread, rows) == [
+        ("r0", "root", 1), ("r1", "root", 1), ("r2", "root", 1),
+        ("c0", "r0", 2), ("c1", "r0", 2), ("c2", "r0", 2),
+        ("d0", "c0", 3), ("d1", "c0", 3),
+    ]
+
+
+def test_descendants_stop_at_max_depth_and_max_replies(db, thread):
+    rows = tweet_service._get_descendant_rows(db, thread["root"], max_depth=2, branch_limit=3, max_replies=100)
+    assert max(row.depth for row in rows) == 2
+    assert len(rows) == 6
+    rows = tweet_service._get_descendant_rows(db, thread["root"], max_depth=10, branch_limit=3, max_replies=5)
+    assert [content for content, _, _ in names(thread, rows)] == ["r0", "r1", "r2", "c0", "c1"]
+
+
+def test_get_thread_builds_the_tree(db, thread):
+    result = tweet_service.get_thread(db, thread["root"], branch_limit=3)
+    assert [reply["content"] for reply in result["replies"]] == ["r0", "r1", "r2"]
+    r0 = result["replies"][0]
+    assert [reply["content"] for reply in r0["nested_replies"]] == ["c0", "c1", "c2"]
+    assert [reply["content"] for reply in r0["nested_replies"][0]["nested_replies"]] == ["d0", "d1"]
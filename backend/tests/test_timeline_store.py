@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.core.timeline_store import (
+    InMemoryTimelineStore, RedisTimelineStore, TimelineStore, create_timeline_store
+)
+from app.models.follow import Follow
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.services.timeline import timeline_service
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryTimelineStore(max_size=5)
+    request.getfixturevalue("fake_redis")
+    return RedisTimelineStore(max_size=5, ttl_seconds=60)
+
+
+def ids(entries):
+    return [tweet_id for _, tweet_id in entries]
+
+
+def test_timeline_store_is_abstract():
+    with pytest.raises(TypeError):
+        TimelineStore(10)
+
+
+def test_push_only_reaches_existing_timelines(store):
+    store.replace(1, [(1.0, 10)])
+    store.push([1, 2], 11, 2.0)
+    assert ids(store.range(1)) == [11, 10]
+    assert not store.exists(2)
+    # Un push repetido no duplica
+    store.push([1], 11, 2.0)
+    assert store.size(1) == 2
+
+
+def test_push_caps_to_newest(store):
+    store.replace(1, [(float(score), score) for score in range(1, 9)])
+    assert ids(store.range(1, limit=10)) == [8, 7, 6, 5, 4]
+    store.push([1], 9, 9.0)
+    assert ids(store.range(1, limit=10)) == [9, 8, 7, 6, 5]
+    assert store.size(1) == 5
+
+
+def test_trimmed_flag_survives_removes(store):
+    store.replace(1, [(float(score), score) for score in range(1, 6)])
+    assert not store.is_trimmed(1)
+    store.push([1], 6, 6.0)
+    assert store.is_trimmed(1)
+    store.remove([1], [6, 5])
+    assert store.size(1) < store.max_size
+    assert store.is_trimmed(1)
+
+    store.replace(2, [(float(score), score) for score in range(1, 7)])
+    assert store.is_trimmed(2)
+    store.delete(2)
+    assert not store.is_trimmed(2)
+    store.replace(2, [(1.0, 1)])
+    assert not store.is_trimmed(2)
+
+
+def test_remove(store):
+    store.replace(1, [(1.0, 10), (2.0, 11), (3.0, 12)])
+    store.replace(2, [(2.0, 11)])
+    store.remove([1, 2], [11])
+    assert ids(store.range(1)) == [12, 10]
+    assert ids(store.range(2)) == []
+
+
+def test_range_pages_by_entry_with_ties(store):
+    store.replace(1, [(1.0, 10), (2.0, 11), (2.0, 12), (3.0, 13)])
+    first = store.range(1, limit=2)
+    assert ids(first) == [13, 12]
+    assert ids(store.range(1, before=first[-1], limit=2)) == [11, 10]
+    assert ids(store.range(1, offset=1, limit=2)) == [12, 11]
+    assert store.range(1, before=(1.0, 10)) == []
+
+
+def test_memory_backend_refuses_several_workers(monkeypatch):
+    monkeypatch.setattr(settings, "timeline_backend", "memory")
+    monkeypatch.setattr(settings, "web_concurrency", 4)
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        create_timeline_store()
+    monkeypatch.setattr(settings, "web_concurrency", 1)
+    assert isinstance(create_timeline_store(), InMemoryTimelineStore)
+
+
+def _feed(db, tweets=12):
+    """Lector que sigue a un autor, con `tweets` tweets de cada uno, un minuto entre sí"""
+    reader = User(username="reader", email="reader@example.com", hashed_password="x")
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    db.add_all([reader, author])
+    db.flush()
+    db.add(Follow(follower_id=reader.id, followed_id=author.id))
+    start = datetime(2024, 1, 1)
+    for i in range(tweets):
+        for user in (reader, author):
+            db.add(Tweet(content=f"{user.username} {i}", author_id=user.id, created_at=start + timedelta(minutes=i)))
+    db.commit()
+    expected = [
+        tweet.id for tweet in
+        timeline_service.feed_query(db, reader.id).order_by(Tweet.created_at.desc(), Tweet.id.desc())
+    ]
+    return reader, expected
+
+
+def test_get_page_cursor_paging(db, monkeypatch):
+    monkeypatch.setattr(timeline_service, "store", InMemoryTimelineStore(max_size=100))
+    reader, expected = _feed(db)
+
+    seen, cursor = [], None
+    while True:
+        page = timeline_service.get_page(db, reader.id, limit=5, cursor=cursor)
+        seen += page
+        if len(page) < 5:
+            break
+        last = db.get(Tweet, page[-1])
+        cursor = (last.created_at, last.id)
+    assert seen == expected
+
+    # Un tweet nuevo empujado aparece primero; uno borrado desaparece
+    new = Tweet(content="new", author_id=reader.id, created_at=datetime(2024, 2, 1))
+    db.add(new)
+    db.commit()
+    timeline_service.push_tweet(db, new)
+    timeline_service.remove_tweet(db, expected[0], db.get(Tweet, expected[0]).author_id)
+    assert timeline_service.get_page(db, reader.id, limit=3) == [new.id] + expected[1:3]
+
+
+def test_get_page_past_the_cap_falls_back(db, monkeypatch):
+    monkeypatch.setattr(timeline_service, "store", InMemoryTimelineStore(max_size=10))
+    reader, expected = _feed(db)
+    assert timeline_service.get_page(db, reader.id, limit=5) == expected[:5]
+    assert timeline_service.get_page(db, reader.id, skip=8, limit=5) is None
+
+
+def test_get_page_after_a_remove_from_a_trimmed_timeline_falls_back(db, monkeypatch):
+    monkeypatch.setattr(timeline_service, "store", InMemoryTimelineStore(max_size=10))
+    reader, expected = _feed(db)
+    assert timeline_service.get_page(db, reader.id, limit=5) == expected[:5]
+    timeline_service.remove_tweet(db, expected[0], db.get(Tweet, expected[0]).author_id)
+    # 9 entradas materializadas de 23: la página que pasa el final no termina el feed
+    assert timeline_service.get_page(db, reader.id, skip=5, limit=5) is None
+
+
+def test_get_page_of_a_complete_timeline_at_the_cap(db, monkeypatch):
+    monkeypatch.setattr(timeline_service, "store", InMemoryTimelineStore(max_size=24))
+    reader, expected = _feed(db)
+    assert len(expected) == 24
+    assert timeline_service.get_page(db, reader.id, skip=20, limit=10) == expected[20:]
@@ -0,0 +1,23 @@
+import pytest
+
+from app.core.trending import RingTrendCounter, TrendCounter
+
+MINUTE = 28_000_000
+
+
+def test_trend_counter_is_abstract():
+    with pytest.raises(TypeError):
+        TrendCounter(60, 15, 2)
+
+
+def test_ring_counter_drops_minutes_that_leave_the_window():
+    counter = RingTrendCounter(window_minutes=10, half_life_minutes=2, min_count=2)
+    counter.add(MINUTE, {"old": 5})
+    counter.add(MINUTE + 5, {"old": 1, "new": 3})
+    assert counter.totals == {"old": 6, "new": 3}
+    counter.advance(MINUTE + 10)
+    assert counter.totals == {"old": 1, "new": 3}
+    # Solo compiten los tags con al menos min_count usos dentro del horizonte del decaimiento
+    assert [trend["tag"] for trend in counter.top(MINUTE + 10, 5)] == ["new"]
+    counter.advance(MINUTE + 30)
+    assert counter.totals == {}
@@ -0,0 +1,60 @@
+import pytest
+
+from app.core import conditional
+from app.core.version_store import RedisVersionStore
+from app.models.tweet import Tweet
+from app.models.user import User
+from app.schemas.tweet import TweetUpdate
+from app.services import tweet as tweet_module
+from app.services.tweet import TweetService, tweet_service
+
+
+@pytest.fixture
+def shared_versions(fake_redis, monkeypatch):
+    """Un version_store compartido entre "workers", como con VERSION_STORE_BACKEND=redis"""
+    store = RedisVersionStore()
+    monkeypatch.setattr(tweet_module, "version_store", store)
+    monkeypatch.setattr(conditional, "version_store", store)
+    return store
+
+
+@pytest.fixture
+def tweet(db):
+    author = User(username="author", email="author@example.com", hashed_password="x")
+    db.add(author)
+    db.flush()
+    tweet = Tweet(content="first", author_id=author.id)
+    db.add(tweet)
+    db.commit()
+    return tweet
+
+
+def test_writes_on_another_worker_invalidate_the_local_cache(db, shared_versions, tweet):
+    # worker_b es el singleton: los hooks de commit invalidan solo su cache
+    worker_a, worker_b = TweetService(), tweet_service
+    assert worker_a.hydrate_ids(db, [tweet.id])[0]["content"] == "first"
+    assert worker_a.hydrate_ids(db, [tweet.id])[0]["content"] == "first"
+    hits = worker_a.cache.hits
+
+    worker_b.update(db, tweet, TweetUpdate(content="second"))
+    worker_b.increment_counter(db, tweet.id, "likes_count")
+    db.commit()
+
+    hydrated = worker_a.hydrate_ids(db, [tweet.id])[0]
+    assert (hydrated["content"], hydrated["likes_count"]) == ("second", 1)
+    # La entrada vieja se encontró, pero con otra versión: se descartó
+    assert worker_a.cache.hits == hits + 1
+
+
+def test_version_stamp_is_never_newer_than_the_body(db, shared_versions, tweet):
+    worker_a, worker_b = TweetService(), tweet_service
+    worker_a.hydrate_ids(db, [tweet.id])
+    before = worker_a.version_stamp(db, [tweet.id])
+    assert before is not None
+
+    worker_b.update(db, tweet, TweetUpdate(content="second"))
+    # La entrada local quedó vieja: sin sello hasta volver a hidratar
+    assert worker_a.version_stamp(db, [tweet.id]) is None
+    assert worker_a.hydrate_ids(db, [tweet.id])[0]["content"] == "second"
+    after = worker_a.version_stamp(db, [tweet.id])
+    assert after is not None and after != before
@@ -0,0 +1,35 @@
+from app.core.version_store import RedisVersionStore
+from app.models.user import User
+from app.services import user as user_module
+from app.services.user import UserService, user_service
+
+
+def test_deactivate_me_revokes_cached_tokens(client, login):
+    headers = login("alice")
+    # La primera request deja el usuario en el cache de principals
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert client.delete("/api/v1/users/me", headers=headers).status_code == 200
+
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Inactive user"
+    login_again = client.post("/api/v1/auth/login", data={"username": "alice", "password": "secret"})
+    assert login_again.status_code == 401
+
+
+def test_deactivating_on_another_worker_revokes_cached_tokens(db, fake_redis, monkeypatch):
+    monkeypatch.setattr(user_module, "version_store", RedisVersionStore())
+    alice = User(username="alice", email="alice@example.com", hashed_password="x")
+    db.add(alice)
+    db.commit()
+
+    # worker_a cachea el principal; worker_b (el singleton) atiende el DELETE
+    worker_a = UserService()
+    assert worker_a.load_principal(db, "token", "alice") is not None
+    assert worker_a.get_cached_principal(db, "token").is_active
+    user_service.deactivate(db, db.get(User, alice.id))
+    assert worker_a.get_cached_principal(db, "token") is None
+
+    # Al volver a cargarlo queda cacheado ya desactivado
+    assert not worker_a.load_principal(db, "token", "alice").is_active
+    assert not worker_a.get_cached_principal(db, "token").is_active
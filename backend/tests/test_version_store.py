@@ -0,0 +1,59 @@
+import pytest
+
+from app.core.config import settings
+from app.core.conditional import make_etag
+from app.core.version_store import InMemoryVersionStore, RedisVersionStore, VersionStore, create_version_store
+
+KEY = ("notifications", 1)
+
+
+def stamp(store):
+    return store.generation, store.get(KEY)
+
+
+def test_per_process_stores_serve_stale_stamps():
+    # Dos workers con "memory": el cambio lo atiende A y B sigue con el sello
+    # viejo, así que respondería 304 a quien ya tenía la versión anterior
+    worker_a, worker_b = InMemoryVersionStore(), InMemoryVersionStore()
+    before = stamp(worker_b)
+    worker_a.bump(KEY)
+    assert stamp(worker_b) == before
+
+
+def test_redis_stores_share_versions(fake_redis):
+    worker_a, worker_b = RedisVersionStore(), RedisVersionStore()
+    assert worker_a.generation == worker_b.generation
+    before = stamp(worker_b)
+    worker_a.bump(KEY)
+    assert stamp(worker_b) != before
+    # Crece aunque dos workers cambien la misma clave en el mismo milisegundo
+    versions = []
+    for worker in (worker_a, worker_b, worker_a):
+        worker.bump(KEY)
+        versions.append(worker_b.get(KEY))
+    assert versions == sorted(set(versions))
+
+
+def test_memory_backend_refuses_several_workers(fake_redis, monkeypatch):
+    monkeypatch.setattr(settings, "version_store_backend", "memory")
+    monkeypatch.setattr(settings, "web_concurrency", 2)
+    with pytest.raises(ValueError, match="WEB_CONCURRENCY"):
+        create_version_store()
+    monkeypatch.setattr(settings, "version_store_backend", "redis")
+    assert isinstance(create_version_store(), RedisVersionStore)
+
+
+def test_etag_changes_with_the_version(fake_redis, monkeypatch):
+    from app.core import conditional
+
+    store = RedisVersionStore()
+    monkeypatch.setattr(conditional, "version_store", store)
+    first = make_etag(1, store.get_many([KEY]))
+    assert make_etag(1, store.get_many([KEY])) == first
+    store.bump(KEY)
+    assert make_etag(1, store.get_many([KEY])) != first
+
+
+def test_version_store_is_abstract():
+    with pytest.raises(TypeError):
+        VersionStore()
@@ -4,6 +4,7 @@ export interface TrendingHashtag {
   tag: string;
   count: number;
   tweets_count: number;
+  score: number;
 }
 
 export const trendingService = {